@@ -0,0 +1,14 @@
+"""
+Performance benchmarks. Run them from the repository root:
+- `python -m benchmarks` times every stage on synthetic pages (see `benchmarks.suite`)
+  and compares the results with `benchmarks/baseline.json`, failing on regressions
+  (`--save-baseline` records a new baseline, `--help` lists the other options);
+- `python -m benchmarks.startup` times `import umriss` and the first `trace()` call in fresh interpreters;
+- `python -m benchmarks.open_contours` times tracing pages with many edge-touching glyphs;
+- `python -m benchmarks.simplification` compares the per-contour OpenCV Douglas—Peucker
+  with the vectorized simplifications;
+- `python -m benchmarks.cubic_fit` compares the curves of `CubicFit` with the polygons;
+- `python -m benchmarks.contour_cache` times approximating pages one by one with and without a `ContourCache`;
+- `python -m benchmarks.background_writer` times saving SVGZ files with and without the background thread.
+The synthetic pages are generated by `benchmarks.synthetic`.
+"""
@@ -0,0 +1,66 @@
+import json
+import platform
+import sys
+from argparse import ArgumentParser
+from os import path
+
+import numpy as np
+import cv2 as cv
+
+from .suite import StageResult, compare_with_baseline, results_to_json, run_suite
+
+
+def parse_resolution(value: str) -> tuple[int, int]:
+    width, height = value.split('x')
+    return int(width), int(height)
+
+
+def print_result(name: str, result: StageResult) -> None:
+    print(
+        f'{name:<46} {result.seconds:9.3f} s {result.pages_per_second:8.2f} pages/s '
+        f'{result.contours_per_second:12.0f} contours/s {result.bytes_out:10} bytes '
+        f'{result.peak_memory / (1 << 20):8.1f} MiB peak'
+    )
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(
+        prog='python -m benchmarks',
+        description='Times every stage of the pipeline on synthetic pages and compares the results with a baseline.'
+    )
+    parser.add_argument('--resolutions', type=parse_resolution, nargs='+', default=[(850, 1100), (1700, 2200)],
+        metavar='WIDTHxHEIGHT', help='page sizes (default: 850x1100 1700x2200)')
+    parser.add_argument('--pages', type=int, default=3, help='pages per resolution (default: 3)')
+    parser.add_argument('--repeat', type=int, default=3, help='timing repetitions, the best one is taken (default: 3)')
+    parser.add_argument('--baseline', default=path.join(path.dirname(__file__), 'baseline.json'),
+        help='baseline results file (default: benchmarks/baseline.json)')
+    parser.add_argument('--save-baseline', action='store_true', help='save the results as the new baseline')
+    parser.add_argument('--time-threshold', type=float, default=0.25,
+        help='allowed slowdown relative to the baseline (default: 0.25, i.e. 25%%)')
+    parser.add_argument('--memory-threshold', type=float, default=0.25,
+        help='allowed peak memory growth relative to the baseline (default: 0.25)')
+    args = parser.parse_args()
+    
+    results = run_suite(args.resolutions, args.pages, args.repeat, print_result)
+    
+    if args.save_baseline:
+        machine = {
+            'platform': platform.platform(),
+            'processor': platform.processor(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'opencv': cv.__version__,
+        }
+        with open(args.baseline, 'w') as file:
+            json.dump({ 'machine': machine, 'results': results_to_json(results) }, file, indent=2)
+        print(f'Saved the baseline into {args.baseline}')
+    elif path.exists(args.baseline):
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        regressions = compare_with_baseline(results, baseline['results'], args.time_threshold, args.memory_threshold)
+        print(f'Compared with the baseline from {baseline["machine"]["platform"]}')
+        for regression in regressions:
+            print(f'  regression: {regression}')
+        if len(regressions) > 0:
+            sys.exit(1)
+        print('  no regressions')
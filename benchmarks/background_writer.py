@@ -0,0 +1,71 @@
+"""
+Measures how much of the SVGZ compression the background mode of `OutputFormat` overlaps with tracing:
+times tracing and approximating the pages alone, compressing and writing them alone,
+and both in turn with and without the background thread.
+Checks that both modes write the same SVG text (the compressed bytes differ, as `zlib` gets the text in other chunks).
+The overlap needs a spare CPU core.
+"""
+import gzip
+import os
+import tempfile
+from timeit import default_timer
+from typing import Any
+
+from umriss import unify_identical_glyphs
+from umriss.bitmap import Bitmap, GrayPixels
+from umriss.document import Document, LineDocument
+from umriss.tracing import BinarizedPolygon
+from umriss.approximation import DouglasPeuckerPolygon
+from umriss.svg import OutputFormat, SvgWriter, save_page_svg
+from .synthetic import generate_page
+
+
+def trace_page(pixels: GrayPixels) -> Document[Any]:
+    page = BinarizedPolygon().trace_bitmap(Bitmap.from_pixels(pixels))
+    return DouglasPeuckerPolygon(1.0).approximate_document(unify_identical_glyphs(LineDocument([page]), use_shared=False))
+
+
+def trace_and_save(
+        pages: list[GrayPixels],
+        output_directory: str,
+        output_format: OutputFormat|None,
+        traced: list[Document[Any]]|None=None
+) -> float:
+    """
+    Traces the `pages` (unless they are already `traced`) and saves every one before tracing the next one,
+    unless `output_format` is `None`. Returns the time taken.
+    """
+    start = default_timer()
+    with SvgWriter(output_directory, output_format or OutputFormat()) as writer:
+        for index, pixels in enumerate(pages):
+            document = trace_page(pixels) if traced is None else traced[index]
+            if output_format is not None:
+                save_page_svg(document, document.pages[0], index, writer)
+    return default_timer() - start
+
+
+def read_files(directory: str) -> dict[str, bytes]:
+    files: dict[str, bytes] = {}
+    for name in sorted(os.listdir(directory)):
+        with gzip.open(os.path.join(directory, name), 'rb') as file:
+            files[name] = file.read()
+    return files
+
+
+if __name__ == '__main__':
+    pages = [generate_page(3400, 4400, seed) for seed in range(4)]
+    traced = [trace_page(pixels) for pixels in pages]
+    print(f'{len(pages)} synthetic pages 3400×4400 traced and saved as SVGZ one by one, {os.cpu_count()} CPU cores')
+    
+    with tempfile.TemporaryDirectory() as sequential_directory, tempfile.TemporaryDirectory() as background_directory:
+        tracing_time = trace_and_save(pages, sequential_directory, None)
+        writing_time = trace_and_save(pages, sequential_directory, OutputFormat(compressed=True), traced)
+        sequential_time = trace_and_save(pages, sequential_directory, OutputFormat(compressed=True))
+        background_time = trace_and_save(pages, background_directory, OutputFormat(compressed=True, background=True))
+        is_same = read_files(sequential_directory) == read_files(background_directory)
+
+    print(f'  tracing alone           {tracing_time:8.2f} s')
+    print(f'  saving alone            {writing_time:8.2f} s')
+    print(f'  sequential              {sequential_time:8.2f} s')
+    print(f'  background              {background_time:8.2f} s   {sequential_time - background_time:.2f} s overlapped')
+    print(f'  same SVG text: {is_same}')
@@ -0,0 +1,71 @@
+"""
+Measures what a `ContourCache` saves when the pages of a document are approximated one by one,
+as in the streaming and incremental modes: the time with and without the cache, and the hits and misses.
+Checks that the cache does not change the output: counts the contours approximated differently
+and the largest difference of their points.
+"""
+from timeit import default_timer
+from typing import Any
+import numpy as np
+
+from umriss import unify_identical_glyphs
+from umriss.bitmap import Bitmap
+from umriss.document import Document, LineDocument
+from umriss.glyph import GlyphInstance
+from umriss.packing import ContourPack
+from umriss.tracing import BinarizedPolygon
+from umriss.approximation import Approximation, ContourCache, DouglasPeuckerPolygon, VisvalingamPolygon, CubicFit
+from .synthetic import generate_page
+
+
+def approximate_pages(
+        approximation: Approximation[Any],
+        pages: list[LineDocument],
+        contour_cache: ContourCache|None
+) -> tuple[float, list[Document[Any]]]:
+    start = default_timer()
+    approximated = [approximation.approximate_document(page, contour_cache) for page in pages]
+    return default_timer() - start, approximated
+
+
+def compare_documents(documents: list[Document[Any]], other_documents: list[Document[Any]]) -> tuple[int, float]:
+    """
+    Returns the number of the contours differing between the documents and the largest difference of their points.
+    """
+    different_count, max_difference = 0, 0.0
+    for document, other_document in zip(documents, other_documents):
+        contours, other_contours = get_contours(document), get_contours(other_document)
+        for data, other_data in zip(contours, other_contours):
+            if data.shape != other_data.shape:
+                different_count += 1
+                max_difference = float('inf')
+            elif not np.array_equal(data, other_data):
+                different_count += 1
+                max_difference = max(max_difference, float(np.abs(data - other_data).max()))
+    return different_count, max_difference
+
+
+def get_contours(document: Document[Any]) -> ContourPack:
+    glyphs = list(document.shared_glyphs)
+    for page in document.pages:
+        glyphs.extend(o.glyph for o in page.glyph_occurrences if isinstance(o, GlyphInstance))
+        glyphs.extend(page.referenced_glyphs)
+    return ContourPack.from_contours([c for g in glyphs for c in g.contours])
+
+
+if __name__ == '__main__':
+    traced = [BinarizedPolygon().trace_bitmap(Bitmap.from_pixels(generate_page(1700, 2200, seed))) for seed in range(5)]
+    pages = [unify_identical_glyphs(LineDocument([page]), use_shared=True) for page in traced]
+    approximations: list[Approximation[Any]] = [DouglasPeuckerPolygon(1.0), VisvalingamPolygon(1.0), CubicFit(1.0)]
+    print(f'{len(pages)} synthetic pages 1700×2200 approximated one by one')
+    
+    for approximation in approximations:
+        contour_cache = ContourCache()
+        uncached_time, uncached = approximate_pages(approximation, pages, None)
+        cached_time, cached = approximate_pages(approximation, pages, contour_cache)
+        different_count, max_difference = compare_documents(uncached, cached)
+        print(
+            f'  {type(approximation).__name__:<22} without cache {uncached_time * 1000:8.1f} ms   '
+            f'with cache {cached_time * 1000:8.1f} ms   {contour_cache.hits} hits {contour_cache.misses} misses   '
+            f'{different_count} contours differ (by up to {max_difference:.2g})'
+        )
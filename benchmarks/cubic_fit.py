@@ -0,0 +1,66 @@
+"""
+Compares the curves of `CubicFit` with the polygons of `DouglasPeuckerPolygon` on a synthetic page:
+time, nodes (points of polygons, cubic nodes of curves), and the size of the SVG and SVGZ files.
+"""
+import os
+import tempfile
+from timeit import default_timer
+from typing import Any
+
+from umriss import save_as_svg
+from umriss.bitmap import Bitmap
+from umriss.contour import Contour, LineContour
+from umriss.document import Document, LineDocument
+from umriss.drawing import Drawing
+from umriss.glyph import GlyphInstance
+from umriss.tracing import BinarizedPolygon
+from umriss.approximation import Approximation, Exact, DouglasPeuckerPolygon, CubicFit
+from umriss.svg import OutputFormat
+from .synthetic import generate_page
+
+
+def get_saved_size(document: Document[Any], output_format: OutputFormat) -> int:
+    with tempfile.TemporaryDirectory() as directory:
+        save_as_svg(document, directory, output_format=output_format)
+        return sum(entry.stat().st_size for entry in os.scandir(directory))
+
+
+def count_nodes(document: Document[Any]) -> int:
+    """
+    Counts the points of the polygons or the nodes of the curves on all the pages of the `document`.
+    """
+    return sum(_count_contour_nodes(c) for page in document.pages for c in _get_drawing_contours(page))
+
+
+def _get_drawing_contours(drawing: Drawing[Any]) -> list[Contour]:
+    glyphs = [o.glyph for o in drawing.glyph_occurrences if isinstance(o, GlyphInstance)] + drawing.referenced_glyphs
+    return [c for g in glyphs for c in g.contours]
+
+
+def _count_contour_nodes(contour: Contour) -> int:
+    return len(contour.points) if isinstance(contour, LineContour) else len(contour.nodes)
+
+
+if __name__ == '__main__':
+    approximations: list[Approximation[Any]] = [
+        Exact(),
+        DouglasPeuckerPolygon(0.5),
+        DouglasPeuckerPolygon(1.0),
+        DouglasPeuckerPolygon(2.0),
+        CubicFit(0.5),
+        CubicFit(1.0),
+        CubicFit(2.0),
+    ]
+    document = LineDocument([BinarizedPolygon().trace_bitmap(Bitmap.from_pixels(generate_page(1700, 2200)))])
+    print(f'BinarizedPolygon 1700×2200: {count_nodes(document)} points')
+    
+    for approximation in approximations:
+        elapsed = float('inf')
+        for _ in range(3):
+            start = default_timer()
+            approximated = approximation.approximate_document(document)
+            elapsed = min(elapsed, default_timer() - start)
+        svg_size = get_saved_size(approximated, OutputFormat())
+        svgz_size = get_saved_size(approximated, OutputFormat(compressed=True))
+        name = f'{type(approximation).__name__}({getattr(approximation, "max_distance", "")})'
+        print(f'  {name:<28} {elapsed * 1000:8.1f} ms {count_nodes(approximated):8} nodes {svg_size:10} B SVG {svgz_size:9} B SVGZ')
@@ -0,0 +1,35 @@
+from timeit import default_timer
+import numpy as np
+
+from umriss.bitmap import GrayPixels
+from umriss.tracing import GrayscalePolygon
+
+
+def get_edge_page(size: int, period: int, is_inverted: bool) -> GrayPixels:
+    """
+    A square page with `4 * size / period` small glyphs touching the edges.
+    The glyphs are black on white, so that every glyph is a separate chain of open contours.
+    If `is_inverted`, they are white on black, and all the open contours form a single chain around the page.
+    """
+    background, foreground = (0, 255) if is_inverted else (255, 0)
+    pixels = np.full((size, size), background, dtype=np.uint8)
+    for edge in (slice(None, 2), slice(-2, None)):
+        for offset in (1, 2):
+            pixels[edge, offset:-1:period] = foreground
+            pixels[offset:-1:period, edge] = foreground
+    return pixels
+
+
+if __name__ == '__main__':
+    tracing = GrayscalePolygon()
+    
+    for size in [1000, 2000, 4000]:
+        for is_inverted in [False, True]:
+            pixels = get_edge_page(size, 4, is_inverted)
+            
+            start = default_timer()
+            glyph_count = sum(1 for _ in tracing.get_glyphs(pixels))
+            end = default_timer()
+            
+            elapsed_ms = (end - start) * 1000
+            print(f'{size}×{size} px, {"inverted" if is_inverted else "normal"}: {glyph_count} glyphs, {elapsed_ms:.3f} ms')
@@ -0,0 +1,64 @@
+"""
+Compares the per-contour OpenCV Douglas—Peucker with the vectorized simplifications
+of a whole page's contours: time, kept points, and the maximum distance from the original contours.
+"""
+from timeit import default_timer
+from typing import Callable
+import numpy as np
+
+from umriss.bitmap import Bitmap, GrayPixels
+from umriss.packing import ContourPack
+from umriss.tracing import BinarizedPolygon
+from umriss.approximation import DouglasPeuckerPolygon
+from umriss.approximation.simplification import simplify_douglas_peucker, simplify_visvalingam
+from .synthetic import generate_page, draw_noise
+
+
+def get_max_distance(original: ContourPack, simplified: ContourPack) -> float:
+    """
+    The maximum distance from the points of the `original` contours to the `simplified` polygons.
+    """
+    max_distance = 0.0
+    for points, polygon in zip(original, simplified):
+        starts = polygon.astype(np.float64)
+        directions = np.roll(starts, -1, axis=0) - starts
+        offsets = points[:, np.newaxis, :] - starts[np.newaxis, :, :]
+        squared_lengths = np.maximum(np.sum(directions ** 2, axis=1), 1e-12)
+        projections = np.clip(np.sum(offsets * directions, axis=2) / squared_lengths, 0, 1)
+        distances = np.linalg.norm(offsets - projections[:, :, np.newaxis] * directions, axis=2).min(axis=1)
+        max_distance = max(max_distance, float(distances.max()))
+    return max_distance
+
+
+def get_noise_page(width: int, height: int, density: float) -> GrayPixels:
+    """
+    A page of tiny specks, e.g. a noisy or halftone scan.
+    """
+    pixels = np.full((height, width), 255, dtype=np.uint8)
+    draw_noise(pixels, np.random.default_rng(0), density)
+    return pixels
+
+
+if __name__ == '__main__':
+    max_distance = 1.0
+    simplifications: dict[str, Callable[[ContourPack], ContourPack]] = {
+        'OpenCV per contour': DouglasPeuckerPolygon(max_distance).approximate_contours,
+        'vectorized Douglas—Peucker': lambda c: simplify_douglas_peucker(c, max_distance),
+        'vectorized Visvalingam': lambda c: simplify_visvalingam(c, max_distance),
+    }
+    pages = {
+        'text 1700×2200': generate_page(1700, 2200),
+        'noise 1700×2200': get_noise_page(1700, 2200, 0.02),
+    }
+    
+    for page_name, pixels in pages.items():
+        contours = BinarizedPolygon().trace_bitmap_packed(Bitmap.from_pixels(pixels)).contours
+        print(f'{page_name}: {len(contours)} contours, {len(contours.points)} points')
+        for name, simplify in simplifications.items():
+            elapsed = float('inf')
+            for _ in range(3):
+                start = default_timer()
+                simplified = simplify(contours)
+                elapsed = min(elapsed, default_timer() - start)
+            distance = get_max_distance(contours, simplified)
+            print(f'  {name:<28} {elapsed * 1000:8.1f} ms {len(simplified.points):8} points, max distance {distance:.3f}')
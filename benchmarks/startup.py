@@ -0,0 +1,81 @@
+"""
+Measures the startup cost paid by short jobs and by every worker process:
+the time of `import umriss` and of the first `trace()` call, each in a fresh interpreter.
+"""
+import json
+import os
+import subprocess
+import sys
+from argparse import ArgumentParser
+from dataclasses import dataclass
+from statistics import median
+
+
+@dataclass
+class StartupResult:
+    """
+    The time of `import umriss` and of the first `trace()` call in seconds,
+    and the heavy dependencies loaded by the import.
+    """
+    import_time: float
+    trace_time: float
+    heavy_modules: list[str]
+
+
+def measure_startup(tracing: str, width: int, height: int) -> StartupResult:
+    """
+    Runs a fresh interpreter, which imports `umriss` and traces a synthetic page of the given size
+    with the `tracing` (a class name from `umriss.tracing`) and the `Exact` approximation.
+    """
+    output = subprocess.run(
+        [sys.executable, '-c', _child_script, tracing, str(width), str(height)],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        check=True, capture_output=True, text=True
+    ).stdout
+    return StartupResult(**json.loads(output))
+
+
+_child_script = '''
+import json, sys, tempfile
+from timeit import default_timer
+
+start = default_timer()
+import umriss
+import_time = default_timer() - start
+heavy_modules = sorted({ m.split('.')[0] for m in sys.modules } & { 'nptyping', 'skimage', 'scipy' })
+
+from umriss.bitmap import Bitmap
+from umriss.approximation import Exact
+import umriss.tracing
+from benchmarks.synthetic import generate_page
+
+tracing = getattr(umriss.tracing, sys.argv[1])()
+bitmap = Bitmap.from_pixels(generate_page(int(sys.argv[2]), int(sys.argv[3]), 0))
+with tempfile.TemporaryDirectory() as directory:
+    start = default_timer()
+    umriss.trace([bitmap], directory, tracing, Exact())
+    trace_time = default_timer() - start
+
+print(json.dumps({ 'import_time': import_time, 'trace_time': trace_time, 'heavy_modules': heavy_modules }))
+'''
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(
+        prog='python -m benchmarks.startup',
+        description='Times `import umriss` and the first `trace()` call in fresh interpreters.'
+    )
+    parser.add_argument('--runs', type=int, default=5, help='interpreters per tracing, the median is taken (default: 5)')
+    parser.add_argument('--width', type=int, default=850, help='page width (default: 850)')
+    parser.add_argument('--height', type=int, default=1100, help='page height (default: 1100)')
+    args = parser.parse_args()
+    
+    for tracing in ['BinarizedExact', 'BinarizedPolygon', 'GrayscalePolygon']:
+        results = [measure_startup(tracing, args.width, args.height) for _ in range(args.runs)]
+        import_time = median(r.import_time for r in results)
+        trace_time = median(r.trace_time for r in results)
+        heavy_modules = ', '.join(results[0].heavy_modules) or 'none'
+        print(
+            f'{tracing:<18} import umriss {import_time * 1000:8.1f} ms   first trace() {trace_time * 1000:8.1f} ms   '
+            f'heavy modules after import: {heavy_modules}'
+        )
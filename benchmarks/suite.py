@@ -0,0 +1,176 @@
+"""
+Times every stage of the pipeline on synthetic pages and compares the results with a baseline.
+"""
+from __future__ import annotations
+import os
+import tempfile
+import tracemalloc
+from dataclasses import asdict, dataclass
+from timeit import default_timer
+from typing import Any, Callable, Sequence, TypeVar
+
+from umriss import save_as_svg, unify_identical_glyphs
+from umriss.bitmap import Bitmap
+from umriss.document import Document, LineDocument
+from umriss.drawing import Drawing
+from umriss.glyph import GlyphInstance
+from umriss.tracing import Tracing, BinarizedExact, BinarizedPolygon, GrayscalePolygon
+from umriss.approximation import Approximation, Exact, DouglasPeuckerPolygon, VisvalingamPolygon, CubicFit
+from .synthetic import generate_page
+
+
+@dataclass
+class StageResult:
+    """
+    The best time of a stage over the repetitions,
+    the number of pages and contours it produced, the output size in bytes (for saving),
+    and the peak memory allocated while it ran, measured by `tracemalloc` in a separate run.
+    """
+    seconds: float
+    pages: int
+    contours: int
+    bytes_out: int
+    peak_memory: int
+    
+    @property
+    def pages_per_second(self) -> float:
+        return self.pages / self.seconds
+    
+    @property
+    def contours_per_second(self) -> float:
+        return self.contours / self.seconds
+
+
+def run_suite(
+        resolutions: Sequence[tuple[int, int]],
+        page_count: int=3,
+        repeat: int=3,
+        report: Callable[[str, StageResult], None]=lambda name, result: None
+) -> dict[str, StageResult]:
+    """
+    Runs every stage on `page_count` synthetic pages of every resolution `(width, height)`.
+    Each stage is timed on its own, its input being prepared by the previous stages:
+    the tracings, `unify_identical_glyphs` on the `BinarizedPolygon` pages,
+    every approximation of the unified document, and `save_as_svg` of every approximated document.
+    The results are keyed by `'{width}x{height}/{stage}'` and passed to `report` as soon as they are ready.
+    """
+    results: dict[str, StageResult] = {}
+    
+    def run_stage(name: str, stage: Callable[[], T], count: Callable[[T], tuple[int, int, int]]) -> T:
+        result, seconds, peak_memory = _measure(stage, repeat)
+        pages, contours, bytes_out = count(result)
+        results[name] = StageResult(seconds, pages, contours, bytes_out, peak_memory)
+        report(name, results[name])
+        return result
+    
+    for width, height in resolutions:
+        prefix = f'{width}x{height}'
+        bitmaps = [Bitmap.from_pixels(generate_page(width, height, seed)) for seed in range(page_count)]
+        
+        traced: dict[str, LineDocument] = {}
+        for tracing in _tracings:
+            name = type(tracing).__name__
+            traced[name] = run_stage(f'{prefix}/{name}', _trace(tracing, bitmaps), _count_document)
+        
+        unified = run_stage(
+            f'{prefix}/unify_identical_glyphs',
+            lambda: unify_identical_glyphs(traced['BinarizedPolygon'], use_shared=True),
+            _count_document
+        )
+        
+        for approximation in _approximations:
+            name = type(approximation).__name__
+            approximated = run_stage(f'{prefix}/{name}', _approximate(approximation, unified), _count_document)
+            with tempfile.TemporaryDirectory() as directory:
+                run_stage(
+                    f'{prefix}/save_as_svg/{name}',
+                    _save(approximated, directory),
+                    lambda _: (*_count_document(approximated)[:2], _get_directory_size(directory))
+                )
+    
+    return results
+
+
+def compare_with_baseline(
+        results: dict[str, StageResult],
+        baseline: dict[str, Any],
+        time_threshold: float=0.25,
+        memory_threshold: float=0.25
+) -> list[str]:
+    """
+    Returns the regressions: the stages that are slower than in the `baseline`
+    by more than `time_threshold` (a fraction, e.g. 0.25 is 25%), take more memory
+    by more than `memory_threshold`, or produce more bytes.
+    """
+    regressions: list[str] = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if result.seconds > base['seconds'] * (1 + time_threshold):
+            regressions.append(f'{name}: {result.seconds:.3f} s, baseline {base["seconds"]:.3f} s')
+        if result.peak_memory > base['peak_memory'] * (1 + memory_threshold):
+            regressions.append(f'{name}: {_mib(result.peak_memory)} MiB peak, baseline {_mib(base["peak_memory"])} MiB')
+        if result.bytes_out > base['bytes_out']:
+            regressions.append(f'{name}: {result.bytes_out} bytes out, baseline {base["bytes_out"]}')
+    return regressions
+
+
+def results_to_json(results: dict[str, StageResult]) -> dict[str, Any]:
+    return { name: asdict(result) for name, result in results.items() }
+
+
+T = TypeVar('T')
+
+def _measure(stage: Callable[[], T], repeat: int) -> tuple[T, float, int]:
+    seconds = float('inf')
+    for _ in range(repeat):
+        start = default_timer()
+        result = stage()
+        seconds = min(seconds, default_timer() - start)
+    
+    tracemalloc.start()
+    try:
+        stage()
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, seconds, peak_memory
+
+
+def _trace(tracing: Tracing, bitmaps: list[Bitmap]) -> Callable[[], LineDocument]:
+    return lambda: LineDocument([tracing.trace_bitmap(b) for b in bitmaps])
+
+
+def _approximate(approximation: Approximation[Any], document: LineDocument) -> Callable[[], Document[Any]]:
+    return lambda: approximation.approximate_document(document)
+
+
+def _save(document: Document[Any], directory: str) -> Callable[[], None]:
+    return lambda: save_as_svg(document, directory)
+
+
+def _count_document(document: Document[Any]) -> tuple[int, int, int]:
+    """
+    Counts the pages and the contours of the `document`, every shared or referenced glyph once.
+    """
+    contours = sum(_count_drawing_contours(p) for p in document.pages) + sum(len(g.contours) for g in document.shared_glyphs)
+    return len(document.pages), contours, 0
+
+
+def _count_drawing_contours(drawing: Drawing[Any]) -> int:
+    instance_contours = sum(len(o.glyph.contours) for o in drawing.glyph_occurrences if isinstance(o, GlyphInstance))
+    return instance_contours + sum(len(g.contours) for g in drawing.referenced_glyphs)
+
+
+def _get_directory_size(directory: str) -> int:
+    return sum(entry.stat().st_size for entry in os.scandir(directory))
+
+
+def _mib(size: int) -> str:
+    return f'{size / (1 << 20):.1f}'
+
+
+_tracings: list[Tracing] = [BinarizedExact(), BinarizedPolygon(), GrayscalePolygon()]
+
+_approximations: list[Approximation[Any]] = [Exact(), DouglasPeuckerPolygon(1.0), VisvalingamPolygon(1.0), CubicFit(1.0)]
@@ -0,0 +1,91 @@
+"""
+Deterministic synthetic pages for the benchmarks.
+"""
+import numpy as np
+import cv2 as cv
+
+from umriss.bitmap import GrayPixels
+
+
+def generate_page(width: int, height: int, seed: int=0) -> GrayPixels:
+    """
+    Generates an anti-aliased grayscale page with a field of text-like glyphs,
+    some large blobs, shapes touching the page edges, and specks of noise.
+    The same arguments always give the same page.
+    """
+    rng = np.random.default_rng(seed)
+    pixels = np.full((height, width), 255, dtype=np.uint8)
+    draw_text_field(pixels, rng)
+    draw_blobs(pixels, rng)
+    draw_edge_shapes(pixels, rng)
+    draw_noise(pixels, rng)
+    return pixels
+
+
+def draw_text_field(pixels: GrayPixels, rng: np.random.Generator, columns: int=70) -> None:
+    """
+    Draws lines of random words, about `columns` characters wide, using a Hershey font.
+    The same letters at integer positions give identical glyphs, like in a real scan.
+    """
+    height, width = pixels.shape
+    margin = width // 12
+    font_scale = (width - 2 * margin) / columns / 20
+    thickness = max(1, round(2 * font_scale))
+    (_, letter_height), _ = cv.getTextSize('x', cv.FONT_HERSHEY_SIMPLEX, font_scale, thickness)
+    line_height = round(3 * letter_height)
+    
+    for y in range(margin + line_height, height - margin, line_height):
+        x = margin
+        while True:
+            word = ''.join(rng.choice(list(_letters), rng.integers(1, 10)))
+            (word_width, _), _ = cv.getTextSize(word, cv.FONT_HERSHEY_SIMPLEX, font_scale, thickness)
+            if x + word_width > width - margin:
+                break
+            cv.putText(pixels, word, (x, y), cv.FONT_HERSHEY_SIMPLEX, font_scale, 0, thickness, cv.LINE_AA)
+            x += word_width + line_height // 2
+
+
+def draw_blobs(pixels: GrayPixels, rng: np.random.Generator, count: int=4) -> None:
+    """
+    Draws large filled ellipses with holes, like illustrations.
+    """
+    height, width = pixels.shape
+    for _ in range(count):
+        center = (int(rng.integers(0, width)), int(rng.integers(0, height)))
+        axes = (int(rng.integers(width // 20, width // 6)), int(rng.integers(height // 20, height // 6)))
+        angle = float(rng.uniform(0, 180))
+        cv.ellipse(pixels, center, axes, angle, 0, 360, 0, -1, cv.LINE_AA)
+        cv.ellipse(pixels, center, (axes[0] // 2, axes[1] // 3), angle, 0, 360, 255, -1, cv.LINE_AA)
+
+
+def draw_edge_shapes(pixels: GrayPixels, rng: np.random.Generator, count: int=200) -> None:
+    """
+    Draws small circles on the page edges, like the dark borders of a scan.
+    """
+    height, width = pixels.shape
+    radius = max(2, width // 300)
+    for _ in range(count):
+        position = int(rng.integers(0, 2 * (width + height)))
+        if position < width:
+            center = (position, 0)
+        elif position < width + height:
+            center = (width - 1, position - width)
+        elif position < 2 * width + height:
+            center = (position - width - height, height - 1)
+        else:
+            center = (0, position - 2 * width - height)
+        cv.circle(pixels, center, int(rng.integers(radius, 3 * radius)), 0, -1, cv.LINE_AA)
+
+
+def draw_noise(pixels: GrayPixels, rng: np.random.Generator, density: float=0.0005) -> None:
+    """
+    Darkens random pixels, like dust on a scan.
+    """
+    height, width = pixels.shape
+    count = int(density * width * height)
+    ys = rng.integers(0, height, count)
+    xs = rng.integers(0, width, count)
+    pixels[ys, xs] = rng.integers(0, 128, count).astype(np.uint8)
+
+
+_letters = 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789'
@@ -1,41 +1,95 @@
-from typing import TypeVar
+from typing import Iterable, TypeVar
 
+from .version import __version__
 from .contour import Contour
 from .drawing import Drawing, LineDrawing, CubicDrawing
-from .bitmap import Bitmap
-from .svg import save_as_svg
+from .bitmap import Bitmap, BitmapPage, PageSource, read_bitmaps
+from .cache import TraceCache
+from .instrumentation import Instrumentation, StageRecord, JsonLinesSink, PrintSink
+from .svg import save_as_svg, OutputFormat
 from .tracing import Tracing
-from .approximation import Approximation
+from .approximation import Approximation, ContourCache
 from .unification import unify_identical_glyphs
+from .similarity import unify_similar_glyphs
 from .document import LineDocument
+from .parallel import trace_pages
+from .streaming import trace_streaming, approximate_recorded
+from .incremental import trace_incremental
 
 TContour = TypeVar('TContour', bound=Contour)
 
 def trace(
-        input_bitmap_files: list[str],
+        input_bitmaps: Iterable[str|PageSource],
         output_directory: str,
         tracing: Tracing,
         approximation: Approximation[TContour],
-        scale: float=1.0
+        scale: float=1.0,
+        jobs: int|None=1,
+        streaming: bool=False,
+        output_format: OutputFormat=OutputFormat(),
+        max_glyph_mismatch: float|None=None,
+        cache: TraceCache|None=None,
+        incremental: bool=False,
+        instrumentation: Instrumentation=Instrumentation(),
+        contour_cache: ContourCache|None=None,
+        state_directory: str|None=None
 ) -> None:
     """
-    Traces the `input_bitmap_files` using the given `tracing` method,
+    Traces the `input_bitmaps` using the given `tracing` method,
     then, uses the given contour `approximation`,
     renders the result as SVG files, and saves them into `output_directory`.
     `scale` affects only the coordinates in paths (e.g. to make them integer),
     it is cancelled out by a group transform.
+    `input_bitmaps` can be image files, all of whose pages are traced (e.g. multi-page TIFFs),
+    `Bitmap`s, or `BitmapPage`s; image pages are decoded one at a time (see `read_bitmaps`).
+    `jobs` is the number of processes tracing the pages in parallel,
+    `None` meaning the number of CPU cores.
+    If `streaming` is set, the pages are traced twice, see `trace_streaming`,
+    so that the memory usage does not grow with the number of pages.
+    `output_format` defines whether the files are saved as SVG or SVGZ.
+    If `max_glyph_mismatch` is given, similar glyphs differing in no more than
+    this part of their pixels are unified too, see `unify_similar_glyphs`.
+    Lossy unification is not supported in the streaming mode.
+    If a `cache` is given (see `TraceCache`), the pages traced before
+    with the same `tracing` are loaded from it instead of being traced again.
+    If `incremental` is set, the output of a previous run in `output_directory` is updated,
+    see `trace_incremental`: only the changed pages are traced,
+    and only the files whose contents changed are rewritten.
+    Its index and traced pages are kept in `state_directory`, by default the `.umriss` subdirectory of `output_directory`.
+    Like the streaming mode, it keeps no more than one traced page in memory besides the changed ones.
+    If a `contour_cache` is given (see `ContourCache`), every distinct contour shape is approximated once,
+    which pays off with the slower approximations, and in the streaming and incremental modes
+    where the pages are approximated one by one.
+    The progress, time, memory, and counts of every stage and page are reported to the `instrumentation`
+    (e.g. `Instrumentation(JsonLinesSink('trace.jsonl'))`), nothing is reported by default.
     """
-    print('tracing')
-    pages: list[LineDrawing] = []
-    for file in input_bitmap_files:
-        print(f'  {file}')
-        bitmap = Bitmap(file)
-        pages.append(tracing.trace_bitmap(bitmap))
+    if incremental:
+        if max_glyph_mismatch is not None:
+            raise ValueError('Similar glyphs cannot be unified in the incremental mode')
+        trace_incremental(
+            input_bitmaps, output_directory, tracing, approximation, scale, jobs, output_format, cache, instrumentation,
+            contour_cache, state_directory
+        )
+        return
+    
+    if streaming:
+        if max_glyph_mismatch is not None:
+            raise ValueError('Similar glyphs cannot be unified in the streaming mode')
+        trace_streaming(
+            input_bitmaps, output_directory, tracing, approximation, scale, jobs, output_format, cache, instrumentation,
+            contour_cache
+        )
+        return
+    
+    pages: list[LineDrawing] = list(trace_pages(input_bitmaps, tracing, jobs, cache=cache, instrumentation=instrumentation))
     traced = LineDocument(pages)
-    print('unifying glyphs')
-    traced = unify_identical_glyphs(traced, use_shared=True)
-    print('approximating')
-    approximated = approximation.approximate_document(traced)
-    print('saving')
+    with instrumentation.stage('unify') as record:
+        if max_glyph_mismatch is None:
+            traced = unify_identical_glyphs(traced, use_shared=True)
+        else:
+            traced = unify_similar_glyphs(traced, use_shared=True, max_mismatch=max_glyph_mismatch)
+        if instrumentation.is_enabled:
+            record.count_document(traced)
+    approximated = approximate_recorded(approximation, traced, None, instrumentation, contour_cache)
     
-    save_as_svg(approximated, output_directory, scale)
+    save_as_svg(approximated, output_directory, scale, output_format, instrumentation)
@@ -1,30 +1,209 @@
+import os
+import sys
+from argparse import ArgumentParser, Namespace
+from glob import glob
 from timeit import default_timer
-from os import listdir, path
+from typing import Any
 
 from . import trace
-from .tracing import BinarizedExact, BinarizedPolygon, GrayscalePolygon
-from .approximation import Exact, DouglasPeuckerPolygon, SillyCubic
+from .cache import TraceCache
+from .instrumentation import Instrumentation, JsonLinesSink, PrintSink
+from .binarization import Binarization, Threshold, Otsu, Niblack, Sauvola
+from .tracing import Tracing, BinarizedExact, BinarizedPolygon, GrayscalePolygon, Tiled
+from .approximation import Approximation, ContourCache, Exact, DouglasPeuckerPolygon, VisvalingamPolygon, CubicFit
+from .svg import OutputFormat
 
 
-if __name__ == '__main__':
-    # TODO: add CLI
+def main(arguments: list[str]|None=None) -> None:
+    parser = create_parser()
+    args = parser.parse_args(arguments)
     
-    input_directory = 'tmp/input_ku'
-    input_bitmap_files = [path.join(input_directory, f) for f in sorted(listdir(input_directory))]
+    input_bitmap_files = expand_inputs(args.inputs)
+    if len(input_bitmap_files) == 0:
+        parser.error('no input files found')
+    if args.max_glyph_mismatch is not None and (args.streaming or args.incremental):
+        parser.error('--max-glyph-mismatch cannot be used with --streaming or --incremental')
+    if args.state is not None and not args.incremental:
+        parser.error('--state can only be used with --incremental')
+    try:
+        tracing = create_tracing(args)
+        approximation = create_approximation(args)
+        output_format = OutputFormat(args.svgz, args.compression_level, args.background)
+        cache = None if args.cache is None else TraceCache(args.cache, args.cache_size << 20)
+        contour_cache = None if args.contour_cache is None else ContourCache(args.contour_cache << 20)
+    except (ValueError, TypeError) as error:
+        parser.error(str(error))
     
-    # input_bitmap_files = [
-    #     'tmp/input_ku/173.tif',
-    #     'tmp/input_ku/174.tif',
-    #     'tmp/input_ku/175.tif',
-    # ]
-    output_directory = 'tmp/out'
-    tracing = BinarizedPolygon()
-    approximation = Exact() # DouglasPeuckerPolygon(0.5)
-    scale = 1.0
+    os.makedirs(args.output, exist_ok=True)
+    sinks: list[Any] = [] if args.quiet else [PrintSink()]
+    metrics = None if args.metrics is None else JsonLinesSink(args.metrics)
+    if metrics is not None:
+        sinks.append(metrics)
+    instrumentation = Instrumentation(*sinks, trace_memory=args.trace_memory)
     
     start = default_timer()
-    trace(input_bitmap_files, output_directory, tracing, approximation, scale)
+    try:
+        trace(
+            input_bitmap_files, args.output, tracing, approximation, args.scale,
+            jobs=args.jobs or None,
+            streaming=args.streaming,
+            output_format=output_format,
+            max_glyph_mismatch=args.max_glyph_mismatch,
+            cache=cache,
+            incremental=args.incremental,
+            instrumentation=instrumentation,
+            contour_cache=contour_cache,
+            state_directory=args.state
+        )
+    except (ValueError, OSError) as error:
+        parser.exit(1, f'{parser.prog}: error: {error}\n')
+    finally:
+        if metrics is not None:
+            metrics.close()
     end = default_timer()
     
-    elapsed_ms = (end - start) * 1000
-    print(f'Elapsed {elapsed_ms:.3f} ms')
+    if not args.quiet:
+        print(f'Traced {len(input_bitmap_files)} files in {end - start:.3f} s', file=sys.stderr)
+
+
+def create_parser() -> ArgumentParser:
+    parser = ArgumentParser(
+        prog='python -m umriss',
+        description='Traces black-and-white or grayscale bitmaps into SVG files, a file for every page.'
+    )
+    parser.add_argument('inputs', nargs='+', metavar='INPUT',
+        help='input image files or glob patterns (e.g. "scans/*.tif"); all the pages of multi-page files are traced')
+    parser.add_argument('-o', '--output', required=True, metavar='DIRECTORY',
+        help='output directory, created if missing')
+    
+    group = parser.add_argument_group('tracing')
+    group.add_argument('-t', '--tracing', choices=_tracings, default='polygon',
+        help='tracing method: `BinarizedExact`, `BinarizedPolygon`, or `GrayscalePolygon` (default: polygon)')
+    group.add_argument('--max-slope-ratio', type=int, help='`BinarizedPolygon` maximum slope ratio (default: 10)')
+    group.add_argument('--corner-offset', type=float, help='`BinarizedPolygon` corner offset (default: 0.25)')
+    group.add_argument('--binarization', choices=_binarizations, default='threshold',
+        help='binarization method of the binarized tracings (default: threshold)')
+    group.add_argument('--threshold', type=float,
+        help='threshold of the `threshold` binarization and of the grayscale tracing (default: 128)')
+    group.add_argument('--window-size', type=int, help='window size of the adaptive binarizations (default: 25)')
+    group.add_argument('-k', type=float, help='`k` of the adaptive binarizations (default: 0.2 for sauvola, -0.2 for niblack)')
+    group.add_argument('--in-place', action='store_true', help='binarize over the pixels of the loaded bitmap')
+    group.add_argument('--strip-height', type=int,
+        help='trace the binarized bitmaps in strips of this many rows to save memory (see `Tiled`)')
+    
+    group = parser.add_argument_group('approximation')
+    group.add_argument('-a', '--approximation', choices=_approximations, default='exact',
+        help='contour approximation: `Exact`, `DouglasPeuckerPolygon`, `VisvalingamPolygon`, or `CubicFit` (default: exact)')
+    group.add_argument('--max-distance', type=float, help='polygon and curve approximations maximum distance (default: 1.0)')
+    group.add_argument('--vectorized', action='store_true',
+        help='simplify all the contours of a page at once in `DouglasPeuckerPolygon`')
+    group.add_argument('--corner-angle', type=float, help='`CubicFit` minimum turn of a corner in degrees (default: 60)')
+    group.add_argument('--contour-cache', type=int, metavar='MIB',
+        help='approximate every distinct contour shape once, keeping up to this many MiB of approximated contours in memory')
+    group.add_argument('--max-glyph-mismatch', type=float,
+        help='unify similar glyphs differing in no more than this part of their pixels')
+    
+    group = parser.add_argument_group('output')
+    group.add_argument('-s', '--scale', type=float, default=1.0, help='scale of the path coordinates (default: 1.0)')
+    group.add_argument('-z', '--svgz', action='store_true', help='save gzip-compressed SVGZ files')
+    group.add_argument('--compression-level', type=int, default=9, help='SVGZ compression level, 0 to 9 (default: 9)')
+    group.add_argument('--background', action='store_true', help='compress and write the files in a background thread, overlapping with tracing the next page')
+    
+    group = parser.add_argument_group('execution')
+    group.add_argument('-j', '--jobs', type=int, default=1,
+        help='number of processes tracing the pages in parallel, 0 meaning the number of CPU cores (default: 1)')
+    group.add_argument('--streaming', action='store_true',
+        help='trace the pages twice to keep the memory usage independent of the page count')
+    group.add_argument('--incremental', action='store_true',
+        help='update the output of a previous run, tracing only the changed pages')
+    group.add_argument('--state', metavar='DIRECTORY',
+        help='keep the index and the traced pages of the incremental mode in this directory (default: OUTPUT/.umriss)')
+    group.add_argument('--cache', metavar='DIRECTORY', help='cache the traced pages in this directory')
+    group.add_argument('--cache-size', type=int, default=1024, metavar='MIB',
+        help='maximum cache size in MiB (default: 1024)')
+    
+    group = parser.add_argument_group('progress')
+    group.add_argument('-q', '--quiet', action='store_true', help='do not print the progress')
+    group.add_argument('--metrics', metavar='FILE', help='write the metrics of every stage and page as JSON lines')
+    group.add_argument('--trace-memory', action='store_true', help='measure the memory allocations (slow)')
+    return parser
+
+
+def expand_inputs(inputs: list[str]) -> list[str]:
+    """
+    Expands the glob patterns keeping the order of the `inputs`. The matches of every pattern are sorted.
+    Existing files are taken as they are, even if their names look like patterns.
+    Warns about the patterns that match no files.
+    """
+    input_files: list[str] = []
+    for pattern in inputs:
+        if os.path.isfile(pattern):
+            input_files.append(pattern)
+            continue
+        matches = [f for f in sorted(glob(pattern, recursive=True)) if os.path.isfile(f)]
+        if len(matches) == 0:
+            print(f'warning: no files match "{pattern}"', file=sys.stderr)
+        input_files.extend(matches)
+    return input_files
+
+
+def create_tracing(args: Namespace) -> Tracing:
+    tracing: Tracing
+    if args.tracing == 'grayscale':
+        tracing = GrayscalePolygon(**_given(threshold=args.threshold))
+    else:
+        binarization = create_binarization(args)
+        if args.tracing == 'exact':
+            tracing = BinarizedExact(binarization, args.in_place)
+        else:
+            tracing = BinarizedPolygon(
+                **_given(max_slope_ratio=args.max_slope_ratio, corner_offset=args.corner_offset),
+                binarization=binarization,
+                in_place=args.in_place
+            )
+    
+    if args.strip_height is not None:
+        tracing = Tiled(tracing, args.strip_height)
+    return tracing
+
+
+def create_binarization(args: Namespace) -> Binarization:
+    binarization: type[Binarization] = _binarizations[args.binarization]
+    if binarization is Threshold:
+        return Threshold(**_given(threshold=args.threshold))
+    if binarization is Otsu:
+        return Otsu()
+    return binarization(**_given(window_size=args.window_size, k=args.k))
+
+
+def create_approximation(args: Namespace) -> Approximation[Any]:
+    if args.approximation == 'douglas-peucker':
+        return DouglasPeuckerPolygon(**_given(max_distance=args.max_distance), vectorized=args.vectorized)
+    if args.approximation == 'visvalingam':
+        return VisvalingamPolygon(**_given(max_distance=args.max_distance))
+    if args.approximation == 'cubic':
+        return CubicFit(**_given(max_distance=args.max_distance, corner_angle=args.corner_angle))
+    return Exact()
+
+
+def _given(**parameters: Any) -> dict[str, Any]:
+    """
+    Drops the parameters not given in the command line, so that the defaults are used.
+    """
+    return { name: value for name, value in parameters.items() if value is not None }
+
+
+_tracings = ['exact', 'polygon', 'grayscale']
+
+_binarizations: dict[str, type[Binarization]] = {
+    'threshold': Threshold,
+    'otsu': Otsu,
+    'sauvola': Sauvola,
+    'niblack': Niblack,
+}
+
+_approximations = ['exact', 'douglas-peucker', 'visvalingam', 'cubic']
+
+
+if __name__ == '__main__':
+    main()
@@ -1,12 +1,18 @@
 from .abstract import Approximation
+from .contour_cache import ContourCache
 from .exact import Exact
 from .douglas_peucker import DouglasPeuckerPolygon
+from .visvalingam import VisvalingamPolygon
 from .silly_cubic import SillyCubic
+from .cubic_fit import CubicFit
 
 # reexport from inner modules
 __all__ = [
     'Approximation',
+    'ContourCache',
     'Exact',
     'DouglasPeuckerPolygon',
+    'VisvalingamPolygon',
     'SillyCubic',
+    'CubicFit',
 ]
@@ -1,10 +1,12 @@
 from abc import ABC, abstractmethod
-from typing import Generic, TypeVar
+from typing import Generic, Iterable, Iterator, Sequence, TypeVar, get_args, get_origin
 
 from umriss.contour import Contour, LineContour
 from umriss.document import Document, LineDocument
 from umriss.drawing import Drawing, LineDrawing
 from umriss.glyph import GlyphOccurrence, GlyphInstance, GlyphReference, Glyph
+from umriss.packing import ContourPack
+from .contour_cache import ContourCache
 
 
 TContour = TypeVar('TContour', bound=Contour)
@@ -14,6 +16,12 @@ class Approximation(ABC, Generic[TContour]):
     Abstract generic base class for approximation algorithms.
     The type parameter `TContour` defines the type of approximated contours.
     In the descendants, the `DrawingType` type should inherit `Drawing[TContour]`.
+    `ContourType`, the type of the approximated contours, is taken from `DocumentType` unless overridden.
+    
+    All the contours of a document or a drawing are approximated in one batch
+    by `approximate_contours`. Descendants can override it with a vectorized implementation,
+    otherwise, `approximate_contour` is called for every contour.
+    With a `contour_cache` (see `ContourCache`), only the contour shapes not approximated before are.
     """
     
     @property
@@ -26,43 +34,98 @@ class Approximation(ABC, Generic[TContour]):
     def DrawingType(self) -> type:
         pass
     
+    @property
+    def ContourType(self) -> type:
+        """
+        `TContour`, as the type argument of the `Document` that `DocumentType` inherits.
+        """
+        for base in getattr(self.DocumentType, '__orig_bases__', ()):
+            if get_origin(base) is Document:
+                contour_type: type = get_args(base)[0]
+                return contour_type
+        raise TypeError('`DocumentType` should inherit `Document[TContour]`, or `ContourType` should be defined')
+    
     
-    def approximate_document(self, document: LineDocument) -> Document[TContour]:
-        approximated_shared_glyphs = [
-            Glyph[TContour]([self.approximate_contour(c) for c in glyph.contours])
-            for glyph in document.shared_glyphs
-        ]
-        approximated_pages = [self.approximate_drawing(page) for page in document.pages]
+    def approximate_document(self, document: LineDocument, contour_cache: ContourCache|None=None) -> Document[TContour]:
+        glyphs = list(document.shared_glyphs)
+        for page in document.pages:
+            glyphs.extend(_get_drawing_glyphs(page))
+        approximated = iter(self.approximate_glyphs(glyphs, contour_cache))
+        
+        approximated_shared_glyphs = [next(approximated) for _ in document.shared_glyphs]
+        approximated_pages = [self._rebuild_drawing(page, approximated) for page in document.pages]
         
         return self.DocumentType(approximated_pages, approximated_shared_glyphs)
     
     
-    def approximate_drawing(self, drawing: LineDrawing) -> Drawing[TContour]:
-        approximated_glyphs: list[GlyphOccurrence[TContour]] = []
+    def approximate_drawing(self, drawing: LineDrawing, contour_cache: ContourCache|None=None) -> Drawing[TContour]:
+        approximated = iter(self.approximate_glyphs(list(_get_drawing_glyphs(drawing)), contour_cache))
+        return self._rebuild_drawing(drawing, approximated)
+    
+    
+    def approximate_glyphs(
+            self,
+            glyphs: Sequence[Glyph[LineContour]],
+            contour_cache: ContourCache|None=None
+    ) -> list[Glyph[TContour]]:
+        """
+        Approximates the contours of all the `glyphs` in one batch.
+        """
+        contours = ContourPack.from_arrays([c.points for g in glyphs for c in g.contours])
+        packed = self.approximate_contours(contours) if contour_cache is None else contour_cache.approximate_contours(self, contours)
+        approximated = [self.ContourType(data) for data in packed]
+        
+        approximated_glyphs: list[Glyph[TContour]] = []
+        start = 0
+        for glyph in glyphs:
+            end = start + len(glyph.contours)
+            approximated_glyphs.append(Glyph[TContour](approximated[start:end]))
+            start = end
+        return approximated_glyphs
+    
+    
+    def approximate_contours(self, contours: ContourPack) -> ContourPack:
+        """
+        Approximates all the `contours` at once.
+        Returns the packed approximated contours: points of polygons or nodes of cubic splines.
+        """
+        return ContourPack.from_contours([self.approximate_contour(LineContour(p)) for p in contours])
+    
+    
+    @abstractmethod
+    def approximate_contour(self, exact_contour: LineContour) -> TContour:
+        pass
+    
+    
+    def _rebuild_drawing(self, drawing: LineDrawing, approximated_glyphs: Iterator[Glyph[TContour]]) -> Drawing[TContour]:
+        """
+        Builds an approximated drawing taking the approximated glyphs
+        in the order of `_get_drawing_glyphs`.
+        """
+        approximated_occurrences: list[GlyphOccurrence[TContour]] = []
         for occurrence in drawing.glyph_occurrences:
             match occurrence:
                 case GlyphInstance():
-                    approximated_glyphs.append(GlyphInstance[TContour](
+                    approximated_occurrences.append(GlyphInstance[TContour](
                         occurrence.position,
-                        Glyph[TContour]([self.approximate_contour(c) for c in occurrence.glyph.contours])
+                        next(approximated_glyphs)
                     ))
                 case GlyphReference():
-                    approximated_glyphs.append(occurrence)
+                    approximated_occurrences.append(occurrence)
                 case _:
                     raise TypeError('Unsupported glyph occurrence type')
         
-        approximated_referenced_glyphs = [
-            Glyph[TContour]([self.approximate_contour(c) for c in glyph.contours])
-            for glyph in drawing.referenced_glyphs
-        ]
+        approximated_referenced_glyphs = [next(approximated_glyphs) for _ in drawing.referenced_glyphs]
         approximated_drawing = self.DrawingType(
             drawing.width, drawing.height,
-            approximated_glyphs,
+            approximated_occurrences,
             approximated_referenced_glyphs
         )
         return approximated_drawing
-    
-    
-    @abstractmethod
-    def approximate_contour(self, exact_contour: LineContour) -> TContour:
-        pass
+
+
+def _get_drawing_glyphs(drawing: LineDrawing) -> Iterable[Glyph[LineContour]]:
+    for occurrence in drawing.glyph_occurrences:
+        if isinstance(occurrence, GlyphInstance):
+            yield occurrence.glyph
+    yield from drawing.referenced_glyphs
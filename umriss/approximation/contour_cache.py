@@ -0,0 +1,118 @@
+from __future__ import annotations
+import hashlib
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any
+import numpy as np
+import numpy.typing as npt
+
+from umriss.cache import describe_parameters
+from umriss.packing import ContourPack
+
+if TYPE_CHECKING:
+    from .abstract import Approximation
+
+
+class ContourCache:
+    """
+    An in-memory cache of approximated contours, so that every distinct contour shape is approximated once,
+    e.g. the same hole in different letters, or the contours of a glyph repeated on many pages.
+    
+    A contour is keyed by its points, in their order, translated by whole numbers to put the first one near the origin,
+    together with the approximation and its parameters (see `describe_parameters`),
+    so that a cache can be shared by several approximations.
+    The translated contour is approximated and its approximation is moved back.
+    A contour is only translated if that is exact (always, for the coordinates of the binarized tracings),
+    so the approximations computing with the differences of the points, e.g. all the polygonal ones,
+    or relative to whole-pixel origins, like `CubicFit`, give the same results as without the cache.
+    
+    When the total size of the cached contours exceeds `max_size` bytes, the least recently used ones are evicted.
+    `hits` and `misses` count the contours found in the cache (or earlier in the same batch) and approximated.
+    """
+    def __init__(self, max_size: int=64 << 20):
+        if max_size < 0:
+            raise ValueError('`max_size` should be >= 0')
+        self.max_size = max_size
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[bytes, npt.NDArray[Any]] = OrderedDict()
+    
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    
+    def approximate_contours(self, approximation: Approximation[Any], contours: ContourPack) -> ContourPack:
+        """
+        Approximates the translated `contours` not found in the cache with `approximation` in one batch,
+        and returns the approximations of all the `contours` moved back to their positions.
+        """
+        if len(contours) == 0:
+            return approximation.approximate_contours(contours)
+        
+        # the same shapes can come as integers or floats, so they are keyed as floats
+        points = contours.points.astype(np.float64)
+        origins = _get_origins(points, contours)
+        translated = ContourPack(points - np.repeat(origins, contours.lengths, axis=0), contours.offsets)
+        base_digest = hashlib.blake2b(f'{describe_parameters(approximation)}\n'.encode(), digest_size=16)
+        data = memoryview(translated.points.tobytes())
+        point_size = translated.points.itemsize * 2
+        keys: list[bytes] = []
+        for start, end in zip(translated.offsets[:-1].tolist(), translated.offsets[1:].tolist()):
+            digest = base_digest.copy()
+            digest.update(data[start * point_size:end * point_size])
+            keys.append(digest.digest())
+        
+        found: dict[bytes, npt.NDArray[Any]] = {}
+        missing: dict[bytes, int] = {}
+        for index, key in enumerate(keys):
+            if key in found or key in missing:
+                continue
+            approximated = self._entries.get(key)
+            if approximated is None:
+                missing[key] = index
+            else:
+                self._entries.move_to_end(key)
+                found[key] = approximated
+        self.misses += len(missing)
+        self.hits += len(keys) - len(missing)
+        
+        if len(missing) > 0:
+            approximated_missing = approximation.approximate_contours(ContourPack.from_arrays([translated[i] for i in missing.values()]))
+            for key, approximated in zip(missing, approximated_missing):
+                # a copy does not keep the whole batch alive
+                found[key] = approximated.copy()
+                self._store(key, found[key])
+        
+        approximated_contours = ContourPack.from_arrays([found[key] for key in keys])
+        # the origins are added to the points of polygons and to every point of the nodes of curves
+        approximated_points = approximated_contours.points
+        origins = origins.reshape((len(origins),) + (1,) * (approximated_points.ndim - 2) + (2,))
+        moved = approximated_points + np.repeat(origins, approximated_contours.lengths, axis=0)
+        return ContourPack(moved, approximated_contours.offsets)
+    
+    
+    def clear(self) -> None:
+        self._entries.clear()
+        self.size = 0
+    
+    
+    def _store(self, key: bytes, approximated: npt.NDArray[Any]) -> None:
+        self._entries[key] = approximated
+        self.size += len(key) + approximated.nbytes
+        while self.size > self.max_size and len(self._entries) > 0:
+            evicted_key, evicted = self._entries.popitem(last=False)
+            self.size -= len(evicted_key) + evicted.nbytes
+
+
+def _get_origins(points: npt.NDArray[np.float64], contours: ContourPack) -> npt.NDArray[np.float64]:
+    """
+    Returns the first point of every contour rounded down to whole numbers, which keeps the pixel grid,
+    or zero if translating the contour by it is not exact, so that the translated contours can be moved back to the same `points`.
+    """
+    starts = contours.offsets[:-1]
+    origins: npt.NDArray[np.float64] = np.floor(points[starts])
+    repeated = np.repeat(origins, contours.lengths, axis=0)
+    is_exact = np.logical_and.reduceat(((points - repeated) + repeated == points).all(axis=1), starts)
+    origins[~is_exact] = 0
+    return origins
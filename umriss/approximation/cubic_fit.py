@@ -0,0 +1,590 @@
+from __future__ import annotations
+import math
+import numpy as np
+import numpy.typing as npt
+
+from umriss.contour import LineContour, CubicContour
+from umriss.document import CubicDocument
+from umriss.drawing import CubicDrawing
+from umriss.packing import ContourPack, Offsets
+from umriss.utils import normalize
+from .abstract import Approximation
+from .simplification import close_contours, get_first_indices, get_inner_indices
+
+
+_Floats = npt.NDArray[np.float64]
+_Curves = tuple[_Floats, _Floats, _Floats, _Floats]
+
+
+class CubicFit(Approximation[CubicContour]):
+    """
+    Approximates contours with cubic Bézier splines using Schneider's algorithm:
+    the contours are split at the corners (the points turning by more than `corner_angle` degrees),
+    and every piece is fitted with a straight segment, or else with a cubic curve by least squares.
+    A piece fits if all its points are within `max_distance` of the curve,
+    and the curve stays within `max_distance` of the contour between every two points.
+    A piece which does not fit is reparameterized by Newton's method a few times, then split at the farthest point.
+    The curves joining at a split point have a common tangent.
+    
+    A cubic node takes about four times the bytes of a line node in an SVGZ file,
+    so every piece between two corners is also fitted with a polygon, split like `DouglasPeuckerPolygon`,
+    and the curves are only kept where they are shorter.
+    Then, neighbouring pieces are merged while the merged piece fits,
+    which removes the nodes between collinear segments, at smooth joins, and at shallow corners.
+    
+    The nodes and the control points are on a grid of `grid_step` pixels,
+    the largest power of two not exceeding `max_distance` (whole pixels by default),
+    so that the SVG paths have few decimals.
+    Every contour is fitted relative to its smallest point rounded down,
+    so contours differing by a translation by whole pixels give the same curves (see `ContourCache`).
+    
+    All the pieces of all the contours of a page are fitted at once, round after round.
+    The polygons traced by `BinarizedPolygon` give smoother curves than the pixel contours.
+    """
+    DocumentType = CubicDocument
+    DrawingType = CubicDrawing
+    ContourType = CubicContour
+    
+    
+    def __init__(self, max_distance: float=1.0, corner_angle: float=60.0):
+        if max_distance <= 0:
+            raise ValueError('`max_distance` should be positive')
+        self.max_distance = max_distance
+        self.grid_step = 2.0 ** math.floor(math.log2(max_distance))
+        
+        if not 0 < corner_angle < 180:
+            raise ValueError('`corner_angle` should be between 0 and 180')
+        self.corner_angle = corner_angle
+    
+    
+    def approximate_contours(self, contours: ContourPack) -> ContourPack:
+        if len(contours) == 0:
+            return ContourPack(np.zeros((0, 3, 2)), contours.offsets)
+        
+        # every contour is fitted relative to its origin, the rounded down smallest point
+        origins: _Floats = np.floor(contours.points[get_first_indices(contours)].astype(np.float64))
+        local_contours = ContourPack(contours.points - np.repeat(origins, contours.lengths, axis=0), contours.offsets)
+        
+        points, offsets = close_contours(local_contours)
+        is_corner = _find_corners(points, offsets, math.cos(math.radians(self.corner_angle)))
+        is_break = is_corner.copy()
+        is_break[offsets[:-1]] = True
+        is_break[offsets[1:] - 1] = True
+        
+        # the pieces between the breaks, and the tangents at their ends pointing inside the pieces
+        breaks = np.flatnonzero(is_break)
+        is_piece_start = np.ones(len(breaks), dtype=bool)
+        is_piece_start[np.searchsorted(breaks, offsets[1:] - 1)] = False
+        starts = breaks[is_piece_start]
+        ends = breaks[np.flatnonzero(is_piece_start) + 1]
+        start_tangents, end_tangents = _get_tangents(points, offsets, starts, ends, is_corner)
+        
+        # every piece is fitted with a polygon, and with a spline if the polygon costs more than a cubic node,
+        # then the cheaper one is kept
+        fitter = _PieceFitter(points, self.max_distance, self.grid_step)
+        polygon = fitter.fit(starts, ends, start_tangents, end_tangents, 0, with_curves=False)
+        polygon_costs = np.bincount(polygon[0], minlength=len(starts))
+        spline_pieces = np.flatnonzero(polygon_costs > _cubic_cost)
+        spline = fitter.fit(
+            starts[spline_pieces], ends[spline_pieces],
+            start_tangents[spline_pieces], end_tangents[spline_pieces], _max_attempts
+        )
+        spline_costs = np.bincount(spline[0], np.where(spline[-1], 1.0, _cubic_cost), minlength=len(spline_pieces))
+        is_spline = np.zeros(len(starts), dtype=bool)
+        is_spline[spline_pieces] = spline_costs < polygon_costs[spline_pieces]
+        is_kept_polygon, is_kept_spline = ~is_spline[polygon[0]], is_spline[spline_pieces[spline[0]]]
+        starts, ends, start_tangents, end_tangents, nodes, is_line = (
+            np.concatenate((p[is_kept_polygon], s[is_kept_spline])) for p, s in zip(polygon[1:], spline[1:])
+        )
+        order = np.argsort(starts)
+        starts, ends, start_tangents, end_tangents, nodes, is_line = (
+            a[order] for a in (starts, ends, start_tangents, end_tangents, nodes, is_line)
+        )
+        starts, nodes = _merge_pieces(fitter, offsets, starts, ends, start_tangents, end_tangents, nodes, is_line)
+        
+        contour_indices = np.searchsorted(offsets, starts, side='right') - 1
+        node_offsets: Offsets = np.zeros(len(contours) + 1, dtype=np.intp)
+        np.cumsum(np.bincount(contour_indices, minlength=len(contours)), out=node_offsets[1:])
+        return ContourPack(nodes + origins[contour_indices, np.newaxis], node_offsets)
+    
+    
+    def approximate_contour(self, contour: LineContour) -> CubicContour:
+        return CubicContour(self.approximate_contours(ContourPack.from_arrays([contour.points]))[0])
+
+
+def _find_corners(points: _Floats, offsets: Offsets, min_cos: float) -> npt.NDArray[np.bool_]:
+    """
+    Finds the points of the closed contours (see `close_contours`) where the direction turns
+    by an angle whose cosine is less than `min_cos`.
+    """
+    prev_indices, next_indices = _get_neighbour_indices(offsets, np.arange(len(points)))
+    cosines = (normalize(points - points[prev_indices]) * normalize(points[next_indices] - points)).sum(axis=1)
+    is_corner: npt.NDArray[np.bool_] = cosines < min_cos
+    return is_corner
+
+
+def _get_neighbour_indices(offsets: Offsets, indices: Offsets) -> tuple[Offsets, Offsets]:
+    """
+    Returns the previous and the next point of every point of the closed contours,
+    the start and the repeated end of a contour being the same point.
+    """
+    contour_indices = np.searchsorted(offsets, indices, side='right') - 1
+    starts, ends = offsets[contour_indices], offsets[contour_indices + 1] - 1
+    prev_indices = np.where(indices == starts, ends - 1, indices - 1)
+    next_indices = np.where(indices == ends, starts + 1, indices + 1)
+    return prev_indices, next_indices
+
+
+def _get_tangents(
+        points: _Floats,
+        offsets: Offsets,
+        starts: Offsets,
+        ends: Offsets,
+        is_corner: npt.NDArray[np.bool_]
+) -> tuple[_Floats, _Floats]:
+    """
+    Returns the unit tangents at the starts and the ends of the pieces pointing inside them.
+    At a corner, the tangent is the direction of the piece's edge, otherwise, of the chord between the neighbours.
+    """
+    start_prev_indices, start_next_indices = _get_neighbour_indices(offsets, starts)
+    end_prev_indices, end_next_indices = _get_neighbour_indices(offsets, ends)
+    start_tangents = np.where(
+        is_corner[starts][:, np.newaxis],
+        normalize(points[start_next_indices] - points[starts]),
+        normalize(points[start_next_indices] - points[start_prev_indices])
+    )
+    end_tangents = np.where(
+        is_corner[ends][:, np.newaxis],
+        normalize(points[end_prev_indices] - points[ends]),
+        normalize(points[end_prev_indices] - points[end_next_indices])
+    )
+    return start_tangents, end_tangents
+
+
+class _PieceFitter:
+    """
+    Fits pieces of the closed contours `points` (relative to their origins) with straight segments or cubic curves
+    whose nodes and control points are multiples of `step`.
+    """
+    
+    def __init__(self, points: _Floats, max_distance: float, step: float):
+        self.points = points
+        self.snapped_points: _Floats = np.round(points / step) * step
+        self.max_distance = max_distance
+        self.step = step
+        
+        # the edge from every point to the next one, the last one being unused
+        self.edge_directions: _Floats = np.zeros_like(points)
+        self.edge_directions[:-1] = np.diff(points, axis=0)
+        squared_lengths = np.einsum('ij,ij->i', self.edge_directions, self.edge_directions)
+        self.inverse_edge_lengths = np.divide(1.0, squared_lengths, out=np.zeros_like(squared_lengths), where=squared_lengths > 0)
+        
+        # the chord lengths are summed in fixed point, so that they do not depend on the other contours
+        edge_lengths = np.zeros(len(points))
+        edge_lengths[1:] = np.sqrt(squared_lengths[:-1])
+        self.chord_lengths = np.cumsum(np.rint(edge_lengths * _length_scale).astype(np.int64))
+        self.parameters = np.zeros(len(points))
+    
+    
+    def fit(
+            self,
+            starts: Offsets,
+            ends: Offsets,
+            start_tangents: _Floats,
+            end_tangents: _Floats,
+            max_attempts: int,
+            can_split: bool=True,
+            with_curves: bool=True
+    ) -> tuple[Offsets, Offsets, Offsets, _Floats, _Floats, _Floats, npt.NDArray[np.bool_]]:
+        """
+        Fits the disjoint pieces between `starts` and `ends` with straight segments,
+        or else, if `with_curves`, with cubic curves reparameterized up to `max_attempts` times.
+        The pieces which still do not fit are split at their farthest point if `can_split`, dropped otherwise.
+        Returns the index of the given piece, the start, the end and the tangents of every fitted piece,
+        its node `[ctrl1, ctrl2, end]`, and whether it is straight, sorted by start.
+        """
+        piece_ids = np.arange(len(starts))
+        if len(starts) == 0:
+            return piece_ids, starts, ends, start_tangents, end_tangents, np.zeros((0, 3, 2)), np.zeros(0, dtype=bool)
+        self._set_chord_parameters(starts, ends)
+        attempts = np.zeros(len(starts), dtype=np.intp)
+        
+        fitted: list[tuple[Offsets, Offsets, Offsets, _Floats, _Floats, _Floats, npt.NDArray[np.bool_]]] = []
+        while len(starts) > 0:
+            # the new pieces are tried as straight segments first
+            new_pieces = np.flatnonzero(attempts == 0)
+            is_line, line_nodes, line_farthest_indices = self.fit_lines(starts[new_pieces], ends[new_pieces])
+            lines = new_pieces[is_line]
+            fitted.append((
+                piece_ids[lines], starts[lines], ends[lines],
+                start_tangents[lines], end_tangents[lines], line_nodes[is_line], np.ones(len(lines), dtype=bool)
+            ))
+            is_curve = np.ones(len(starts), dtype=bool)
+            is_curve[lines] = False
+            piece_ids, starts, ends, start_tangents, end_tangents, attempts = (
+                a[is_curve] for a in (piece_ids, starts, ends, start_tangents, end_tangents, attempts)
+            )
+            
+            if with_curves:
+                inner_indices, counts = get_inner_indices(starts, ends)
+                piece_indices = np.repeat(np.arange(len(starts)), counts)
+                ts = self.parameters[inner_indices]
+                curves = self._fit_curves(starts, ends, start_tangents, end_tangents, inner_indices, piece_indices, ts)
+                max_squared_distances, farthest_indices, differences = self._measure_curves(
+                    curves, starts, inner_indices, counts, piece_indices, ts
+                )
+                is_fitted = max_squared_distances <= self.max_distance ** 2
+                nodes = np.stack(curves[1:], axis=1)
+                fitted.append((
+                    piece_ids[is_fitted], starts[is_fitted], ends[is_fitted],
+                    start_tangents[is_fitted], end_tangents[is_fitted], nodes[is_fitted],
+                    np.zeros(np.count_nonzero(is_fitted), dtype=bool)
+                ))
+                
+                # close fits are reparameterized, the others are split or dropped
+                is_close = ~is_fitted & (max_squared_distances <= (4 * self.max_distance) ** 2) & (attempts < max_attempts)
+                is_inner_close = is_close[piece_indices]
+                self.parameters[inner_indices[is_inner_close]] = _reparameterize(
+                    curves, piece_indices[is_inner_close], ts[is_inner_close], differences[is_inner_close]
+                )
+            else:
+                # all the pieces are new
+                farthest_indices = line_farthest_indices[~is_line]
+                is_fitted = is_close = np.zeros(len(starts), dtype=bool)
+            
+            is_split = ~is_fitted & ~is_close & can_split
+            split_indices = farthest_indices[is_split]
+            split_tangents = normalize(self.points[split_indices + 1] - self.points[split_indices - 1])
+            close_count = np.count_nonzero(is_close)
+            starts, ends = (
+                np.concatenate((starts[is_close], starts[is_split], split_indices)),
+                np.concatenate((ends[is_close], split_indices, ends[is_split]))
+            )
+            self._set_chord_parameters(starts[close_count:], ends[close_count:])
+            
+            piece_ids = np.concatenate((piece_ids[is_close], piece_ids[is_split], piece_ids[is_split]))
+            start_tangents = np.concatenate((start_tangents[is_close], start_tangents[is_split], split_tangents))
+            end_tangents = np.concatenate((end_tangents[is_close], -split_tangents, end_tangents[is_split]))
+            attempts = np.concatenate((attempts[is_close] + 1, np.zeros(2 * len(split_indices), dtype=np.intp)))
+        
+        piece_ids, starts, ends, start_tangents, end_tangents, nodes, is_line = (
+            np.concatenate(arrays) for arrays in zip(*fitted)
+        )
+        order = np.argsort(starts)
+        return (
+            piece_ids[order], starts[order], ends[order],
+            start_tangents[order], end_tangents[order], nodes[order], is_line[order]
+        )
+    
+    
+    def fit_lines(self, starts: Offsets, ends: Offsets) -> tuple[npt.NDArray[np.bool_], _Floats, Offsets]:
+        """
+        Checks whether the pieces between `starts` and `ends` fit straight segments.
+        Returns that, the nodes of the segments with the control points at their ends (which are on the grid),
+        and the farthest inner points.
+        Only the inner points are checked: the part of a segment next to an edge of the piece
+        is between the projections of the ends of the edge, or a snapped end of the segment,
+        which are all within `max_distance` of the edge.
+        """
+        inner_indices, counts = get_inner_indices(starts, ends)
+        p0, p3 = self.snapped_points[starts], self.snapped_points[ends]
+        chords = p3 - p0
+        squared_lengths = np.einsum('ij,ij->i', chords, chords)
+        inverse_lengths = np.divide(1.0, squared_lengths, out=np.zeros_like(squared_lengths), where=squared_lengths > 0)
+        
+        offsets = self.points[inner_indices] - np.repeat(p0, counts, axis=0)
+        inner_chords = np.repeat(chords, counts, axis=0)
+        projections = np.einsum('ij,ij->i', offsets, inner_chords) * np.repeat(inverse_lengths, counts)
+        np.clip(projections, 0.0, 1.0, out=projections)
+        offsets -= projections[:, np.newaxis] * inner_chords
+        squared_distances: _Floats = np.einsum('ij,ij->i', offsets, offsets)
+        max_squared_distances, farthest_indices = _find_farthest_inner_points(squared_distances, inner_indices, counts)
+        nodes = np.stack((p0, p3, p3), axis=1)
+        return max_squared_distances <= self.max_distance ** 2, nodes, farthest_indices
+    
+    
+    def _set_chord_parameters(self, starts: Offsets, ends: Offsets) -> None:
+        """
+        Sets the parameters of the inner points of the pieces proportionally to the chord length from the start.
+        """
+        inner_indices, counts = get_inner_indices(starts, ends)
+        piece_starts = np.repeat(starts, counts)
+        lengths = np.repeat(self.chord_lengths[ends] - self.chord_lengths[starts], counts)
+        self.parameters[inner_indices] = np.divide(
+            self.chord_lengths[inner_indices] - self.chord_lengths[piece_starts], lengths,
+            out=np.full(len(inner_indices), 0.5), where=lengths > 0
+        )
+    
+    
+    def _fit_curves(
+            self,
+            starts: Offsets,
+            ends: Offsets,
+            start_tangents: _Floats,
+            end_tangents: _Floats,
+            inner_indices: Offsets,
+            piece_indices: Offsets,
+            ts: _Floats
+    ) -> _Curves:
+        """
+        Finds the control points on the tangents minimizing the squared distances
+        between the inner points and the curve at their parameters `ts`.
+        Falls back to a third of the chord if the solution is degenerate.
+        The control points are rounded to multiples of `step`.
+        """
+        piece_count = len(starts)
+        p0, p3 = self.snapped_points[starts], self.snapped_points[ends]
+        b0, b1, b2, b3 = _get_bernstein(ts)
+        b1, b2 = b1[:, np.newaxis], b2[:, np.newaxis]
+        a1: _Floats = start_tangents[piece_indices] * b1
+        a2: _Floats = end_tangents[piece_indices] * b2
+        rest: _Floats = self.points[inner_indices] - (
+            p0[piece_indices] * (b0[:, np.newaxis] + b1) + p3[piece_indices] * (b2 + b3[:, np.newaxis])
+        )
+        
+        def sum_products(u: _Floats, v: _Floats) -> _Floats:
+            sums = np.bincount(piece_indices, np.einsum('ij,ij->i', u, v), minlength=piece_count)
+            return sums.astype(np.float64, copy=False)
+        
+        c11, c12, c22 = sum_products(a1, a1), sum_products(a1, a2), sum_products(a2, a2)
+        x1, x2 = sum_products(a1, rest), sum_products(a2, rest)
+        determinants = c11 * c22 - c12 * c12
+        chords = np.linalg.norm(p3 - p0, axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            alphas1 = (x1 * c22 - x2 * c12) / determinants
+            alphas2 = (c11 * x2 - c12 * x1) / determinants
+        
+        epsilon = 1e-6 * chords
+        is_degenerate = (
+            ~(np.abs(determinants) > 1e-12) |
+            ~(alphas1 > epsilon) | ~(alphas2 > epsilon) |
+            (alphas1 > 2 * chords) | (alphas2 > 2 * chords)
+        )
+        alphas1[is_degenerate] = chords[is_degenerate] / 3
+        alphas2[is_degenerate] = chords[is_degenerate] / 3
+        ctrls1 = np.round((p0 + alphas1[:, np.newaxis] * start_tangents) / self.step) * self.step
+        ctrls2 = np.round((p3 + alphas2[:, np.newaxis] * end_tangents) / self.step) * self.step
+        return p0, ctrls1, ctrls2, p3
+    
+    
+    def _measure_curves(
+            self,
+            curves: _Curves,
+            starts: Offsets,
+            inner_indices: Offsets,
+            counts: Offsets,
+            piece_indices: Offsets,
+            ts: _Floats
+    ) -> tuple[_Floats, Offsets, _Floats]:
+        """
+        Measures how far the curves are from their pieces: the distance from every inner point to the curve at its parameter,
+        then, for the curves within `max_distance` of all their points,
+        the distance from the curve between the parameters of every two neighbouring points to the edge between them.
+        Returns the maximum squared distance, the farthest inner point,
+        and the differences between the curves and the inner points.
+        """
+        differences = _evaluate(curves, piece_indices, ts)[0] - self.points[inner_indices]
+        squared_distances: _Floats = np.einsum('ij,ij->i', differences, differences)
+        max_squared_distances, farthest_indices = _find_farthest_inner_points(squared_distances, inner_indices, counts)
+        
+        close_pieces = np.flatnonzero(max_squared_distances <= self.max_distance ** 2)
+        if len(close_pieces) > 0:
+            is_inner_close = np.repeat(max_squared_distances <= self.max_distance ** 2, counts)
+            p0, p1, p2, p3 = curves
+            max_squared_distances[close_pieces], farthest_indices[close_pieces] = self._measure_edges(
+                (p0[close_pieces], p1[close_pieces], p2[close_pieces], p3[close_pieces]),
+                starts[close_pieces], inner_indices[is_inner_close],
+                counts[close_pieces], ts[is_inner_close], squared_distances[is_inner_close]
+            )
+        return max_squared_distances, farthest_indices, differences
+    
+    
+    def _measure_edges(
+            self,
+            curves: _Curves,
+            starts: Offsets,
+            inner_indices: Offsets,
+            counts: Offsets,
+            ts: _Floats,
+            squared_distances: _Floats
+    ) -> tuple[_Floats, Offsets]:
+        """
+        Measures the distance from the curves between the parameters of every two neighbouring points to the edge between them.
+        The part of a curve between two parameters is within the convex hull of its control points,
+        whose ends are checked with the points, so the distance is at most that of the farthest inner control point.
+        Returns the maximum squared distance and the farthest inner point,
+        given the `squared_distances` between the inner points and the curves, and counting the edges next to the points.
+        """
+        # the parameters of the points of every piece from 0 at the start to 1 at the end
+        piece_count = len(starts)
+        inner_offsets = np.cumsum(counts) - counts
+        padded_pieces = np.repeat(np.arange(piece_count), counts + 2)
+        padded_starts = inner_offsets + 2 * np.arange(piece_count)
+        padded_ends = padded_starts + counts + 1
+        padded_ts = np.empty(len(padded_pieces))
+        padded_ts[np.arange(len(ts)) + 2 * np.repeat(np.arange(piece_count), counts) + 1] = ts
+        padded_ts[padded_starts] = 0.0
+        padded_ts[padded_ends] = 1.0
+        positions, derivatives = _evaluate(curves, padded_pieces, padded_ts)
+        
+        is_edge_start = np.ones(len(padded_pieces), dtype=bool)
+        is_edge_start[padded_ends] = False
+        edge_lefts = np.flatnonzero(is_edge_start)
+        edge_pieces = padded_pieces[edge_lefts]
+        edge_starts = starts[edge_pieces] + edge_lefts - padded_starts[edge_pieces]
+        steps = ((padded_ts[edge_lefts + 1] - padded_ts[edge_lefts]) / 3)[:, np.newaxis]
+        edge_squared_distances = np.maximum(
+            self._get_squared_edge_distances(edge_starts, positions[edge_lefts] + steps * derivatives[edge_lefts]),
+            self._get_squared_edge_distances(edge_starts, positions[edge_lefts + 1] - steps * derivatives[edge_lefts + 1])
+        )
+        
+        # the inner point `i` of a piece is between its edges `i` and `i + 1`
+        inner_edges = np.arange(len(ts)) + np.repeat(np.arange(piece_count), counts)
+        squared_distances = np.maximum(squared_distances, edge_squared_distances[inner_edges])
+        np.maximum(squared_distances, edge_squared_distances[inner_edges + 1], out=squared_distances)
+        max_squared_distances, farthest_indices = _find_farthest_inner_points(squared_distances, inner_indices, counts)
+        edge_offsets = inner_offsets + np.arange(piece_count)
+        np.maximum(max_squared_distances, np.maximum.reduceat(edge_squared_distances, edge_offsets), out=max_squared_distances)
+        return max_squared_distances, farthest_indices
+    
+    
+    def _get_squared_edge_distances(self, edge_starts: Offsets, positions: _Floats) -> _Floats:
+        """
+        Returns the squared distance from every position to the edge between the points `edge_starts` and `edge_starts + 1`.
+        """
+        offsets = positions - self.points[edge_starts]
+        directions = self.edge_directions[edge_starts]
+        projections = np.einsum('ij,ij->i', offsets, directions) * self.inverse_edge_lengths[edge_starts]
+        np.clip(projections, 0.0, 1.0, out=projections)
+        offsets -= projections[:, np.newaxis] * directions
+        squared_distances: _Floats = np.einsum('ij,ij->i', offsets, offsets)
+        return squared_distances
+
+
+def _merge_pieces(
+        fitter: _PieceFitter,
+        offsets: Offsets,
+        starts: Offsets,
+        ends: Offsets,
+        start_tangents: _Floats,
+        end_tangents: _Floats,
+        nodes: _Floats,
+        is_line: npt.NDArray[np.bool_]
+) -> tuple[Offsets, _Floats]:
+    """
+    Merges the neighbouring fitted pieces of the contours while the merged pieces fit,
+    in rounds pairing the pieces from the first or from the second one of every contour in turn,
+    until neither pairing merges anything.
+    Two straight segments are only merged into a straight segment, a cubic node being longer than two line nodes.
+    Contours are kept with at least two pieces.
+    Returns the starts and the nodes of the merged pieces.
+    """
+    # the pairs are keyed by their start and end, which give the same fit in every round
+    failed_keys: Offsets = np.zeros(0, dtype=np.intp)
+    parity, unchanged_rounds = 0, 0
+    while unchanged_rounds < 2:
+        contour_indices = np.searchsorted(offsets, starts, side='right') - 1
+        positions = np.arange(len(starts)) - np.searchsorted(contour_indices, contour_indices)
+        piece_counts = np.bincount(contour_indices, minlength=len(offsets) - 1)[contour_indices]
+        firsts = np.flatnonzero((positions % 2 == parity) & (positions < piece_counts - 1) & (piece_counts > 2))
+        keys = starts[firsts] * offsets[-1] + ends[firsts + 1]
+        is_new = ~np.isin(keys, failed_keys)
+        firsts, keys = firsts[is_new], keys[is_new]
+        seconds = firsts + 1
+        
+        are_lines = is_line[firsts] & is_line[seconds]
+        line_pairs, curve_pairs = np.flatnonzero(are_lines), np.flatnonzero(~are_lines)
+        are_merged_lines, line_nodes, _ = fitter.fit_lines(starts[firsts[line_pairs]], ends[seconds[line_pairs]])
+        curve_ids, _, _, _, _, curve_nodes, are_curve_lines = fitter.fit(
+            starts[firsts[curve_pairs]], ends[seconds[curve_pairs]],
+            start_tangents[firsts[curve_pairs]], end_tangents[seconds[curve_pairs]], _max_merge_attempts, can_split=False
+        )
+        merged_pairs = np.concatenate((line_pairs[are_merged_lines], curve_pairs[curve_ids]))
+        is_failed = np.ones(len(firsts), dtype=bool)
+        is_failed[merged_pairs] = False
+        failed_keys = np.concatenate((failed_keys, keys[is_failed]))
+        
+        merged_firsts, merged_seconds = firsts[merged_pairs], seconds[merged_pairs]
+        ends[merged_firsts] = ends[merged_seconds]
+        end_tangents[merged_firsts] = end_tangents[merged_seconds]
+        nodes[merged_firsts] = np.concatenate((line_nodes[are_merged_lines], curve_nodes))
+        is_line[merged_firsts] = np.concatenate((np.ones(np.count_nonzero(are_merged_lines), dtype=bool), are_curve_lines))
+        is_kept = np.ones(len(starts), dtype=bool)
+        is_kept[merged_seconds] = False
+        starts, ends, start_tangents, end_tangents, nodes, is_line = (
+            a[is_kept] for a in (starts, ends, start_tangents, end_tangents, nodes, is_line)
+        )
+        
+        unchanged_rounds = 0 if len(merged_pairs) > 0 else unchanged_rounds + 1
+        parity = 1 - parity
+    return starts, nodes
+
+
+def _find_farthest_inner_points(
+        squared_distances: _Floats,
+        inner_indices: Offsets,
+        counts: Offsets
+) -> tuple[_Floats, Offsets]:
+    """
+    Finds the first farthest inner point of every piece given the `squared_distances` of the inner points.
+    Returns the maximum squared distance and the index of the point, zeros for the pieces without inner points.
+    """
+    has_inner = counts > 0
+    inner_offsets = np.cumsum(counts) - counts
+    max_squared_distances = np.zeros(len(counts))
+    max_squared_distances[has_inner] = np.maximum.reduceat(squared_distances, inner_offsets[has_inner])
+    farthest_positions = np.flatnonzero(squared_distances == np.repeat(max_squared_distances, counts))
+    farthest_positions = farthest_positions[np.searchsorted(farthest_positions, inner_offsets[has_inner])]
+    farthest_indices = np.zeros(len(counts), dtype=np.intp)
+    farthest_indices[has_inner] = inner_indices[farthest_positions]
+    return max_squared_distances, farthest_indices
+
+
+def _get_bernstein(ts: _Floats) -> tuple[_Floats, ...]:
+    us = 1 - ts
+    return us ** 3, 3 * us ** 2 * ts, 3 * us * ts ** 2, ts ** 3
+
+
+def _evaluate(curves: _Curves, piece_indices: Offsets, ts: _Floats) -> tuple[_Floats, _Floats]:
+    """
+    Returns the points and the derivatives of the curves of the pieces `piece_indices` at the parameters `ts`.
+    """
+    c1, c2, c3 = (c[piece_indices] for c in _get_power_coefficients(curves))
+    t = ts[:, np.newaxis]
+    positions: _Floats = curves[0][piece_indices] + t * (c1 + t * (c2 + t * c3))
+    derivatives: _Floats = c1 + t * (2 * c2 + 3 * t * c3)
+    return positions, derivatives
+
+
+def _get_power_coefficients(curves: _Curves) -> tuple[_Floats, _Floats, _Floats]:
+    """
+    Returns the coefficients of `t`, `t²` and `t³` of the curves, whose constant is the start point.
+    """
+    p0, p1, p2, p3 = curves
+    return 3 * (p1 - p0), 3 * (p2 - 2 * p1 + p0), p3 - 3 * p2 + 3 * p1 - p0
+
+
+def _reparameterize(
+        curves: _Curves,
+        piece_indices: Offsets,
+        ts: _Floats,
+        differences: _Floats
+) -> _Floats:
+    """
+    Improves the parameters `ts` of the points with a step of Newton's method
+    finding the closest points of the curves, given the `differences` between the curves and the points.
+    """
+    first = _evaluate(curves, piece_indices, ts)[1]
+    _, c2, c3 = _get_power_coefficients(curves)
+    second: _Floats = 2 * c2[piece_indices] + 6 * ts[:, np.newaxis] * c3[piece_indices]
+    numerators = np.einsum('ij,ij->i', differences, first)
+    denominators = np.einsum('ij,ij->i', first, first) + np.einsum('ij,ij->i', differences, second)
+    steps = np.divide(numerators, denominators, out=np.zeros_like(numerators), where=denominators != 0)
+    new_ts: _Floats = np.clip(ts - steps, 0, 1)
+    return new_ts
+
+
+_max_attempts = 2
+_max_merge_attempts = 1
+_cubic_cost = 4.0  # line nodes
+_length_scale = 2.0 ** 24
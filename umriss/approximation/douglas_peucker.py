@@ -4,25 +4,48 @@ import cv2 as cv
 from umriss.contour import LineContour
 from umriss.document import LineDocument
 from umriss.drawing import LineDrawing
+from umriss.packing import ContourPack
 from .abstract import Approximation
+from .simplification import simplify_douglas_peucker
 
 
 class DouglasPeuckerPolygon(Approximation[LineContour]):
     """
     Approximates contours with polygons using the Douglas—Peucker algorithm.
     The maximum distance between the original and the result can be specified.
+    
+    By default, _OpenCV_ is called for every contour.
+    If `vectorized`, all the contours of a page are simplified at once by `simplify_douglas_peucker`,
+    which is faster for pages of many tiny contours (e.g. noise or halftones), but slower for long contours.
     """
-    DrocumentType = LineDocument
+    DocumentType = LineDocument
     DrawingType = LineDrawing
+    ContourType = LineContour
     
     
-    def __init__(self, max_distance: float=1.0):
+    def __init__(self, max_distance: float=1.0, vectorized: bool=False):
         if max_distance <= 0:
             raise ValueError('`max_distance` should be positive')
         self.max_distance = max_distance
+        self.vectorized = vectorized
+    
+    
+    def approximate_contours(self, contours: ContourPack) -> ContourPack:
+        if self.vectorized:
+            return simplify_douglas_peucker(contours, self.max_distance)
+        
+        # converting all the points at once, every contour is a view into them
+        points = contours.points.astype(np.float32)
+        return ContourPack.from_arrays([
+            np.reshape(cv.approxPolyDP(points[start:end], self.max_distance, closed=True), (-1, 2))
+            for start, end in zip(contours.offsets[:-1], contours.offsets[1:])
+        ])
     
     
     def approximate_contour(self, contour: LineContour) -> LineContour:
+        if self.vectorized:
+            return LineContour(simplify_douglas_peucker(ContourPack.from_arrays([contour.points]), self.max_distance)[0])
+        
         points = contour.points.astype(np.float32)
         approximation = cv.approxPolyDP(points, self.max_distance, closed=True)
         return LineContour(np.reshape(approximation, (-1, 2)))
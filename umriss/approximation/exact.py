@@ -1,7 +1,12 @@
+from typing import Sequence
+
 from umriss.contour import LineContour
 from umriss.document import LineDocument
 from umriss.drawing import LineDrawing
+from umriss.glyph import Glyph
+from umriss.packing import ContourPack
 from .abstract import Approximation
+from .contour_cache import ContourCache
 
 
 class Exact(Approximation[LineContour]):
@@ -10,6 +15,20 @@ class Exact(Approximation[LineContour]):
     """
     DocumentType = LineDocument
     DrawingType = LineDrawing
+    ContourType = LineContour
+    
+    
+    def approximate_glyphs(
+            self,
+            glyphs: Sequence[Glyph[LineContour]],
+            contour_cache: ContourCache|None=None
+    ) -> list[Glyph[LineContour]]:
+        # nothing to compute, so the cache is not used
+        return list(glyphs)
+    
+    
+    def approximate_contours(self, contours: ContourPack) -> ContourPack:
+        return contours
     
     
     def approximate_contour(self, contour: LineContour) -> LineContour:
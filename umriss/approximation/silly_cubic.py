@@ -5,6 +5,7 @@ from umriss.document import CubicDocument
 from umriss.drawing import CubicDrawing
 from umriss.utils import roll_prev, roll_next, normalize
 from umriss.types import CubicNodes, Points
+from umriss.packing import ContourPack
 from .abstract import Approximation
 
 
@@ -17,6 +18,37 @@ class SillyCubic(Approximation[CubicContour]):
     """
     DocumentType = CubicDocument
     DrawingType = CubicDrawing
+    ContourType = CubicContour
+    
+    
+    def approximate_contours(self, contours: ContourPack) -> ContourPack:
+        # the number of points of every contour should be even
+        contours = _insert_additional_points(contours)
+        
+        # all the offsets are even now, so even indices are even within every contour
+        halves = ContourPack(contours.points[::2], contours.offsets // 2)
+        prev_indices = halves.get_rolled_indices(1)
+        next_indices = halves.get_rolled_indices(-1)
+        
+        # segment points
+        p_middle = contours.points[::2]
+        p_end = contours.points[1::2]
+        p_start = p_end[prev_indices]
+        
+        # tangent directions
+        dir_start = normalize(p_middle - p_middle[prev_indices])
+        dir_end = normalize(p_middle - p_middle[next_indices])
+        
+        # tangent lengths
+        len_start = np.abs(np.sum(dir_start * (p_middle - p_start), axis=1))
+        len_end = np.abs(np.sum(dir_end * (p_middle - p_end), axis=1))
+        
+        # control points
+        ctrl_start = p_start + dir_start * len_start[:, np.newaxis]
+        ctrl_end = p_end + dir_end * len_end[:, np.newaxis]
+        
+        nodes: CubicNodes = np.stack((ctrl_start, ctrl_end, p_end), axis=1)
+        return ContourPack(nodes, halves.offsets)
     
     
     def approximate_contour(self, contour: LineContour) -> CubicContour:
@@ -34,7 +66,6 @@ class SillyCubic(Approximation[CubicContour]):
         # tangent directions
         dir_start = normalize(p_middle - roll_prev(p_middle))
         dir_end = normalize(p_middle - roll_next(p_middle))
-        print(polygon)
         
         # tangent kengths
         len_start = np.abs(np.sum(dir_start * (p_middle - p_start), axis=1))
@@ -48,6 +79,28 @@ class SillyCubic(Approximation[CubicContour]):
         return CubicContour(nodes)
     
     
+def _insert_additional_points(contours: ContourPack) -> ContourPack:
+    """
+    Vectorized `_insert_additional_point` for every contour with an odd number of points.
+    """
+    lengths = contours.lengths
+    (odd_contours,) = np.nonzero(lengths % 2 != 0)
+    if len(odd_contours) == 0:
+        return contours
+    
+    points = contours.points
+    prev_points = points[contours.get_rolled_indices(1)]
+    segment_lengths = np.linalg.norm(points - prev_points, axis=1)
+    
+    # the first longest segment of every contour
+    point_indices = np.arange(len(points))
+    order = np.lexsort((point_indices, -segment_lengths, contours.get_contour_indices()))
+    longest_segment_indices = order[contours.offsets[odd_contours]]
+    
+    new_points = (points[longest_segment_indices] + prev_points[longest_segment_indices]) / 2
+    return contours.insert(longest_segment_indices, new_points)
+
+
 def _insert_additional_point(polygon: Points) -> Points:
     prev_points = roll_prev(polygon)
     longest_segment_index = np.argmax(np.linalg.norm(polygon - prev_points, axis=1))
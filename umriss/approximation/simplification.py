@@ -0,0 +1,226 @@
+from __future__ import annotations
+import numpy as np
+import numpy.typing as npt
+
+from umriss.packing import ContourPack, Offsets
+from umriss.types import Points
+
+
+_Floats = npt.NDArray[np.float64]
+
+
+def simplify_douglas_peucker(contours: ContourPack, max_distance: float) -> ContourPack:
+    """
+    Simplifies all the `contours` at once using the Douglas—Peucker algorithm.
+    Every level of the recursion is processed for all the segments of all the contours together.
+    
+    A closed contour is split at its lexicographically smallest point and the point farthest from it first.
+    The distances are measured to the segments, not to the infinite lines,
+    so every point of the original contour is within `max_distance` of the result.
+    Only the points of the original contours are kept; a contour keeps at least two points.
+    """
+    if len(contours) == 0:
+        return contours
+    points, offsets = close_contours(contours)
+    is_kept = np.zeros(len(points), dtype=bool)
+    is_kept[offsets[:-1]] = True
+    is_kept[offsets[1:] - 1] = True
+    
+    # the first split of a closed contour is forced, the start and end points being the same
+    starts, ends = offsets[:-1], offsets[1:] - 1
+    is_forced = True
+    while len(starts) > 0:
+        has_inner = ends - starts > 1
+        starts, ends = starts[has_inner], ends[has_inner]
+        if len(starts) == 0:
+            break
+        
+        farthest, squared_distances = _find_farthest_points(points, starts, ends)
+        is_split = np.full(len(starts), True) if is_forced else squared_distances > max_distance ** 2
+        is_kept[farthest[is_split]] = True
+        starts, farthest, ends = starts[is_split], farthest[is_split], ends[is_split]
+        starts, ends = np.concatenate((starts, farthest)), np.concatenate((farthest, ends))
+        is_forced = False
+    
+    return _open_contours(points, offsets, is_kept)
+
+
+def simplify_visvalingam(contours: ContourPack, max_distance: float) -> ContourPack:
+    """
+    Simplifies all the `contours` at once removing the points in the Visvalingam—Whyatt order:
+    a point whose triangle with its neighbours has a smaller area than theirs goes first.
+    Instead of an area threshold, a point is removed only if all the original points
+    between its neighbours are within `max_distance` of the segment joining them,
+    so the same bound as in `simplify_douglas_peucker` holds.
+    
+    All the local minima of the areas are removed together in every round.
+    Equal areas are ordered pseudorandomly, so that straight runs are removed in a few rounds.
+    The lexicographically smallest point of every contour is always kept; a contour keeps at least two points.
+    """
+    if len(contours) == 0:
+        return contours
+    points, offsets = close_contours(contours)
+    is_fixed = np.zeros(len(points), dtype=bool)
+    is_fixed[offsets[:-1]] = True
+    is_fixed[offsets[1:] - 1] = True
+    is_kept = np.ones(len(points), dtype=bool)
+    # a point is blocked if it could not be removed, until one of its neighbours is removed
+    is_blocked = is_fixed.copy()
+    
+    # the fixed points separate the contours, so the neighbours of an unfixed point are in its contour
+    # the ties are broken by the points' indices in their contours, so a contour is simplified the same in any batch
+    contour_indices = np.arange(len(points)) - np.repeat(offsets[:-1], np.diff(offsets))
+    tie_breakers = (contour_indices.astype(np.uint64) * np.uint64(2654435761)) % np.uint64(1 << 32)
+    while True:
+        remaining = np.flatnonzero(is_kept)
+        is_candidate = ~is_blocked[remaining]
+        is_candidate[[0, -1]] = False
+        if not np.any(is_candidate):
+            break
+        positions = np.flatnonzero(is_candidate)
+        indices = remaining[positions]
+        prev_indices = remaining[positions - 1]
+        next_indices = remaining[positions + 1]
+        
+        # the last point between the start and the end of a contour is kept too
+        is_last = is_fixed[prev_indices] & is_fixed[next_indices]
+        is_blocked[indices[is_last]] = True
+        positions, indices = positions[~is_last], indices[~is_last]
+        prev_indices, next_indices = prev_indices[~is_last], next_indices[~is_last]
+        
+        # blocked and fixed points are never smaller than their neighbours
+        areas = np.full(len(remaining), np.inf)
+        areas[positions] = _get_triangle_areas(points[prev_indices], points[indices], points[next_indices])
+        is_minimum = (
+            _is_smaller(areas, tie_breakers[remaining], positions, positions - 1) &
+            _is_smaller(areas, tie_breakers[remaining], positions, positions + 1)
+        )
+        indices, prev_indices, next_indices = indices[is_minimum], prev_indices[is_minimum], next_indices[is_minimum]
+        
+        is_removed = _are_within_distance(points, prev_indices, next_indices, max_distance)
+        is_kept[indices[is_removed]] = False
+        is_blocked[indices[~is_removed]] = True
+        is_blocked[prev_indices[is_removed]] = is_fixed[prev_indices[is_removed]]
+        is_blocked[next_indices[is_removed]] = is_fixed[next_indices[is_removed]]
+    
+    return _open_contours(points, offsets, is_kept)
+
+
+def close_contours(contours: ContourPack) -> tuple[_Floats, Offsets]:
+    """
+    Rolls every contour to start at its lexicographically smallest point and repeats that point at the end.
+    Returns the points (as floats) and the offsets of the closed contours.
+    """
+    points: _Floats = contours.points.astype(np.float64)
+    first_indices = get_first_indices(contours)
+    rolled = points[contours.get_rolled_indices(contours.offsets[:-1] - first_indices)]
+    closed_points = np.insert(rolled, contours.offsets[1:], points[first_indices], axis=0)
+    return closed_points, contours.offsets + np.arange(len(contours.offsets))
+
+
+def get_first_indices(contours: ContourPack) -> Offsets:
+    """
+    Returns the index of the lexicographically smallest point of every contour, the first one if there are several.
+    Every contour should have some points.
+    """
+    points = contours.points.astype(np.float64)
+    starts, lengths = contours.offsets[:-1], contours.lengths
+    min_xs = np.minimum.reduceat(points[:, 0], starts)
+    ys = np.where(points[:, 0] == np.repeat(min_xs, lengths), points[:, 1], np.inf)
+    min_ys = np.minimum.reduceat(ys, starts)
+    first_candidates = np.flatnonzero(ys == np.repeat(min_ys, lengths))
+    first_indices: Offsets = first_candidates[np.searchsorted(first_candidates, starts)]
+    return first_indices
+
+
+def _open_contours(points: Points, offsets: Offsets, is_kept: npt.NDArray[np.bool_]) -> ContourPack:
+    """
+    Removes the repeated end points and the points not kept from the closed contours.
+    """
+    is_kept[offsets[1:] - 1] = False
+    return ContourPack(points, offsets).delete(~is_kept)
+
+
+def _find_farthest_points(points: _Floats, starts: Offsets, ends: Offsets) -> tuple[Offsets, _Floats]:
+    """
+    Finds the first farthest point from the segment between `starts` and `ends`
+    among the points between them, for all the segments at once.
+    Returns its index and its squared distance.
+    """
+    inner_indices, counts = get_inner_indices(starts, ends)
+    squared_distances = get_squared_segment_distances(points, inner_indices, starts, ends, counts)
+    inner_offsets = np.cumsum(counts) - counts
+    max_squared_distances = np.maximum.reduceat(squared_distances, inner_offsets)
+    
+    # the first position of the maximum in every segment
+    farthest_positions = np.flatnonzero(squared_distances == np.repeat(max_squared_distances, counts))
+    farthest_positions = farthest_positions[np.searchsorted(farthest_positions, inner_offsets)]
+    return inner_indices[farthest_positions], max_squared_distances
+
+
+def _are_within_distance(points: _Floats, starts: Offsets, ends: Offsets, max_distance: float) -> npt.NDArray[np.bool_]:
+    """
+    Checks whether all the points between `starts` and `ends` are within `max_distance`
+    of the segments joining them, for all the segments at once.
+    Every segment should have some points between its ends.
+    """
+    inner_indices, counts = get_inner_indices(starts, ends)
+    squared_distances = get_squared_segment_distances(points, inner_indices, starts, ends, counts)
+    is_within: npt.NDArray[np.bool_] = np.logical_and.reduceat(squared_distances <= max_distance ** 2, np.cumsum(counts) - counts)
+    return is_within
+
+
+def get_inner_indices(starts: Offsets, ends: Offsets) -> tuple[Offsets, Offsets]:
+    """
+    Returns the indices of the points strictly between `starts` and `ends`, segment after segment,
+    and their count in every segment.
+    """
+    counts = ends - starts - 1
+    inner_indices: Offsets = np.arange(counts.sum()) + np.repeat(starts + 1 - (np.cumsum(counts) - counts), counts)
+    return inner_indices, counts
+
+
+def get_squared_segment_distances(
+        points: _Floats,
+        inner_indices: Offsets,
+        starts: Offsets,
+        ends: Offsets,
+        counts: Offsets
+) -> _Floats:
+    """
+    Returns the squared distance from every inner point to the segment between its start and end.
+    """
+    directions = points[ends] - points[starts]
+    squared_lengths = np.einsum('ij,ij->i', directions, directions)
+    inverse_lengths = np.divide(1.0, squared_lengths, out=np.zeros_like(squared_lengths), where=squared_lengths > 0)
+    
+    offsets = points[inner_indices] - np.repeat(points[starts], counts, axis=0)
+    directions = np.repeat(directions, counts, axis=0)
+    projections = np.einsum('ij,ij->i', offsets, directions) * np.repeat(inverse_lengths, counts)
+    np.clip(projections, 0.0, 1.0, out=projections)
+    offsets -= projections[:, np.newaxis] * directions
+    squared_distances: _Floats = np.einsum('ij,ij->i', offsets, offsets)
+    return squared_distances
+
+
+def _is_smaller(
+        areas: _Floats,
+        tie_breakers: npt.NDArray[np.uint64],
+        positions: Offsets,
+        other_positions: Offsets
+) -> npt.NDArray[np.bool_]:
+    """
+    Compares the areas at `positions` with the ones at `other_positions`, breaking the ties.
+    """
+    areas, other_areas = areas[positions], areas[other_positions]
+    is_smaller: npt.NDArray[np.bool_] = (
+        (areas < other_areas) | ((areas == other_areas) & (tie_breakers[positions] < tie_breakers[other_positions]))
+    )
+    return is_smaller
+
+
+def _get_triangle_areas(prev_points: Points, points: Points, next_points: Points) -> _Floats:
+    to_prev = prev_points - points
+    to_next = next_points - points
+    areas: _Floats = np.abs(to_prev[:, 0] * to_next[:, 1] - to_prev[:, 1] * to_next[:, 0]) / 2
+    return areas
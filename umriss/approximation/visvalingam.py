@@ -0,0 +1,32 @@
+from umriss.contour import LineContour
+from umriss.document import LineDocument
+from umriss.drawing import LineDrawing
+from umriss.packing import ContourPack
+from .abstract import Approximation
+from .simplification import simplify_visvalingam
+
+
+class VisvalingamPolygon(Approximation[LineContour]):
+    """
+    Approximates contours with polygons removing the points in the Visvalingam—Whyatt order
+    (the points making the smallest triangles with their neighbours first)
+    while the distance between the original and the result does not exceed `max_distance`.
+    All the contours of a page are simplified at once, see `simplify_visvalingam`.
+    """
+    DocumentType = LineDocument
+    DrawingType = LineDrawing
+    ContourType = LineContour
+    
+    
+    def __init__(self, max_distance: float=1.0):
+        if max_distance <= 0:
+            raise ValueError('`max_distance` should be positive')
+        self.max_distance = max_distance
+    
+    
+    def approximate_contours(self, contours: ContourPack) -> ContourPack:
+        return simplify_visvalingam(contours, self.max_distance)
+    
+    
+    def approximate_contour(self, contour: LineContour) -> LineContour:
+        return LineContour(simplify_visvalingam(ContourPack.from_arrays([contour.points]), self.max_distance)[0])
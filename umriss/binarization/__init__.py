@@ -0,0 +1,13 @@
+from .abstract import Binarization
+from .threshold import Threshold, Otsu
+from .local_threshold import LocalThreshold, Niblack, Sauvola
+
+# reexport from inner modules
+__all__ = [
+    'Binarization',
+    'Threshold',
+    'Otsu',
+    'LocalThreshold',
+    'Niblack',
+    'Sauvola',
+]
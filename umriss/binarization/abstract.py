@@ -0,0 +1,36 @@
+from abc import ABC, abstractmethod
+from typing import Iterator
+import numpy as np
+
+from umriss.bitmap import GrayPixels
+
+
+class Binarization(ABC):
+    """
+    Abstract base class for binarization methods.
+    Produces the inverted binary image expected by `cv.findContours`:
+    255 for black pixels, 0 for white ones.
+    Images are processed in horizontal strips, so that the temporary buffers
+    stay bounded by the strip size.
+    """
+    def binarize(self, pixels: GrayPixels, in_place: bool=False, strip_height: int=1024) -> GrayPixels:
+        """
+        Binarizes the whole image.
+        If `in_place` is set and `pixels` are writable, the result overwrites them.
+        """
+        binary = pixels if in_place and pixels.flags.writeable else np.empty_like(pixels)
+        start = 0
+        for strip in self.binarize_strips(pixels, strip_height):
+            end = start + len(strip)
+            binary[start:end] = strip
+            start = end
+        return binary
+    
+    @abstractmethod
+    def binarize_strips(self, pixels: GrayPixels, strip_height: int=1024) -> Iterator[GrayPixels]:
+        """
+        Yields the binarized consecutive strips of `strip_height` rows (the last one can be shorter).
+        Before a strip is yielded, all its source rows have been read,
+        so the caller may overwrite them with the strip.
+        """
+        pass
@@ -0,0 +1,106 @@
+from abc import abstractmethod
+from typing import Iterator
+import numpy as np
+import numpy.typing as npt
+import cv2 as cv
+
+from umriss.bitmap import GrayPixels
+from .abstract import Binarization
+
+
+_Values = npt.NDArray[np.float64]
+
+class LocalThreshold(Binarization):
+    """
+    Abstract base class for adaptive binarization methods
+    whose threshold depends on the mean and the standard deviation of the pixels
+    in a `window_size` by `window_size` window around every pixel
+    (clipped by the image borders).
+    The window statistics are computed with integral images in O(pixels).
+    """
+    def __init__(self, window_size: int):
+        if window_size < 3 or window_size % 2 == 0:
+            raise ValueError('`window_size` should be an odd number >= 3')
+        self.window_size = window_size
+    
+    
+    def binarize_strips(self, pixels: GrayPixels, strip_height: int=1024) -> Iterator[GrayPixels]:
+        height, width = pixels.shape
+        radius = self.window_size // 2
+        
+        # number of pixels in the clipped windows of every column
+        columns = np.arange(width)
+        column_counts = np.minimum(columns + radius + 1, width) - np.maximum(columns - radius, 0)
+        
+        # the source rows above the current strip are carried over,
+        # since the caller may have overwritten them with the binarized strip
+        above = np.zeros((0, width), dtype=np.uint8)
+        for start in range(0, height, strip_height):
+            end = min(start + strip_height, height)
+            block = np.concatenate((above, pixels[start:min(end + radius, height)]))
+            # the strip's rows in the block
+            first, last = len(above), len(above) + end - start
+            
+            rows = np.arange(first, last)
+            row_counts = np.minimum(rows + radius + 1, len(block)) - np.maximum(rows - radius, 0)
+            counts = np.outer(row_counts, column_counts)
+            
+            sums, square_sums = cv.integral2(block, sdepth=cv.CV_64F)
+            means = _get_window_sums(sums, radius, first, last) / counts
+            variances = _get_window_sums(square_sums, radius, first, last) / counts - means ** 2
+            deviations = np.sqrt(np.maximum(variances, 0))
+            
+            thresholds = self.get_thresholds(means, deviations)
+            strip = np.where(block[first:last] <= thresholds, 255, 0).astype(np.uint8)
+            
+            above = block[max(last - radius, 0):last]
+            yield strip
+    
+    
+    @abstractmethod
+    def get_thresholds(self, means: _Values, deviations: _Values) -> _Values:
+        pass
+
+
+def _get_window_sums(integral: _Values, radius: int, start: int, end: int) -> _Values:
+    """
+    Sums of the windows around the pixels of rows `start:end`, clipped by the image borders.
+    Padding the integral image with its edge values makes the clipping implicit,
+    so the sums are computed from plain slices.
+    """
+    size = 2 * radius + 1
+    width = integral.shape[1] - 1
+    padded = cv.copyMakeBorder(integral, radius, radius, radius, radius, cv.BORDER_REPLICATE)
+    column_sums = padded[start + size:end + size] - padded[start:end]
+    window_sums: _Values = column_sums[:, size:] - column_sums[:, :width]
+    return window_sums
+
+
+class Niblack(LocalThreshold):
+    """
+    Niblack's method: the threshold is `mean + k * deviation`.
+    """
+    def __init__(self, window_size: int=25, k: float=-0.2):
+        super().__init__(window_size)
+        self.k = k
+    
+    
+    def get_thresholds(self, means: _Values, deviations: _Values) -> _Values:
+        thresholds: _Values = means + self.k * deviations
+        return thresholds
+
+
+class Sauvola(LocalThreshold):
+    """
+    Sauvola's method: the threshold is `mean * (1 + k * (deviation / dynamic_range - 1))`.
+    Works better than `Niblack` for the light background of scanned documents.
+    """
+    def __init__(self, window_size: int=25, k: float=0.2, dynamic_range: float=128):
+        super().__init__(window_size)
+        self.k = k
+        self.dynamic_range = dynamic_range
+    
+    
+    def get_thresholds(self, means: _Values, deviations: _Values) -> _Values:
+        thresholds: _Values = means * (1 + self.k * (deviations / self.dynamic_range - 1))
+        return thresholds
@@ -0,0 +1,53 @@
+from typing import Iterator
+import numpy as np
+import cv2 as cv
+
+from umriss.bitmap import GrayPixels
+from .abstract import Binarization
+
+
+class Threshold(Binarization):
+    """
+    Pixels darker than or equal to the `threshold` are black.
+    """
+    def __init__(self, threshold: float=128):
+        self.threshold = threshold
+    
+    
+    def binarize_strips(self, pixels: GrayPixels, strip_height: int=1024) -> Iterator[GrayPixels]:
+        threshold = self.get_threshold(pixels, strip_height)
+        for start in range(0, len(pixels), strip_height):
+            _, strip = cv.threshold(np.asarray(pixels[start:start + strip_height]), threshold, 255, cv.THRESH_BINARY_INV)
+            yield np.asarray(strip, dtype=np.uint8)
+    
+    
+    def get_threshold(self, pixels: GrayPixels, strip_height: int) -> float:
+        return self.threshold
+
+
+class Otsu(Threshold):
+    """
+    A global threshold chosen by Otsu's method to maximize the between-class variance
+    of the image histogram. Gives the same result as `cv.THRESH_OTSU`,
+    but the histogram is accumulated strip by strip.
+    """
+    def __init__(self) -> None:
+        super().__init__(0)
+    
+    
+    def get_threshold(self, pixels: GrayPixels, strip_height: int) -> float:
+        histogram = np.zeros(256, dtype=np.int64)
+        for start in range(0, len(pixels), strip_height):
+            histogram += np.bincount(np.asarray(pixels[start:start + strip_height]).ravel(), minlength=256)
+        
+        levels = np.arange(256)
+        probabilities = histogram / max(histogram.sum(), 1)
+        weights = np.cumsum(probabilities)
+        means = np.cumsum(probabilities * levels)
+        total_mean = means[-1]
+        
+        # between-class variance of splitting after every level
+        with np.errstate(divide='ignore', invalid='ignore'):
+            variances = (total_mean * weights - means) ** 2 / (weights * (1 - weights))
+        variances[~np.isfinite(variances)] = 0
+        return float(np.argmax(variances))
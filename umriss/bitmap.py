@@ -1,14 +1,137 @@
-from nptyping import NDArray, Shape, UInt8
+from __future__ import annotations
+import re
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Iterable, Iterator, TypeAlias
+import numpy as np
+import numpy.typing as npt
 import cv2 as cv
 
-
-GrayPixels = NDArray[Shape['* height, * width'], UInt8]
+if TYPE_CHECKING:
+    from nptyping import NDArray, Shape, UInt8
+    GrayPixels = NDArray[Shape['* height, * width'], UInt8]
+else:
+    GrayPixels = npt.NDArray[np.uint8]
 
 
 class Bitmap:
     """
-    Represents a grayscale bitmap image.
+    Represents a grayscale bitmap image, or the given page of a multi-page image (e.g. TIFF).
+    Uncompressed images (binary PGM and 8-bit NumPy `.npy` files) are memory-mapped,
+    so that a tiled tracing (see `Tiled`) reads only the rows it currently needs.
     """
-    def __init__(self, image_file: str):
-        self.pixels: GrayPixels = cv.imread(image_file, cv.IMREAD_GRAYSCALE)
+    def __init__(self, image_file: str, page: int=0):
+        self.pixels: GrayPixels = _read_pixels(image_file) if page == 0 else _read_page_pixels(image_file, page)
         self.height, self.width = self.pixels.shape
+    
+    @classmethod
+    def from_pixels(cls, pixels: GrayPixels) -> Bitmap:
+        bitmap = cls.__new__(cls)
+        bitmap.pixels = pixels
+        bitmap.height, bitmap.width = pixels.shape
+        return bitmap
+
+
+@dataclass(frozen=True)
+class BitmapPage:
+    """
+    A reference to a page of an image file. The page is decoded only by `read`.
+    Cheap to keep and to send to another process.
+    """
+    image_file: str
+    page: int = 0
+    
+    def read(self) -> Bitmap:
+        return Bitmap(self.image_file, self.page)
+
+
+PageSource: TypeAlias = Bitmap|BitmapPage
+"""
+A decoded bitmap or a page to be decoded.
+"""
+
+
+def get_bitmap_pages(image_file: str) -> list[BitmapPage]:
+    """
+    Returns references to all the pages of an image file.
+    Only multi-page formats (e.g. TIFF) have more than one page.
+    """
+    page_count = 1 if image_file.lower().endswith('.npy') else max(cv.imcount(image_file), 1)
+    return [BitmapPage(image_file, page) for page in range(page_count)]
+
+
+def read_bitmaps(image_file: str) -> Iterator[Bitmap]:
+    """
+    Lazily reads the pages of an image file one by one.
+    """
+    for page in get_bitmap_pages(image_file):
+        yield page.read()
+
+
+def get_page_sources(inputs: Iterable[str|PageSource]) -> Iterator[PageSource]:
+    """
+    Expands the input image files into their pages, passing the bitmaps and pages through.
+    """
+    for input in inputs:
+        match input:
+            case str():
+                yield from get_bitmap_pages(input)
+            case Bitmap() | BitmapPage():
+                yield input
+            case _:
+                raise TypeError('Unsupported bitmap input type')
+
+
+def read_page_source(source: PageSource) -> Bitmap:
+    match source:
+        case Bitmap():
+            return source
+        case BitmapPage():
+            return source.read()
+        case _:
+            raise TypeError('Unsupported page source type')
+
+
+def _read_pixels(image_file: str) -> GrayPixels:
+    lower_file = image_file.lower()
+    if lower_file.endswith('.npy'):
+        pixels: GrayPixels = np.load(image_file, mmap_mode='r')
+        if pixels.dtype != np.uint8 or pixels.ndim != 2:
+            raise ValueError('Only two-dimensional `uint8` arrays are supported')
+        return pixels
+    if lower_file.endswith('.pgm'):
+        mapped = _map_pgm(image_file)
+        if mapped is not None:
+            return mapped
+    
+    image = cv.imread(image_file, cv.IMREAD_GRAYSCALE)
+    if image is None:
+        raise ValueError(f'Cannot read image file "{image_file}"')
+    return np.asarray(image, dtype=np.uint8)
+
+
+def _read_page_pixels(image_file: str, page: int) -> GrayPixels:
+    is_read, pages = cv.imreadmulti(image_file, page, 1, flags=cv.IMREAD_GRAYSCALE)
+    if not is_read or len(pages) == 0:
+        raise ValueError(f'Cannot read page {page} of image file "{image_file}"')
+    return np.asarray(pages[0], dtype=np.uint8)
+
+
+_pgm_separator = rb'(?:\s|#[^\r\n]*[\r\n])+'
+_pgm_header = re.compile(
+    rb'P5' + _pgm_separator + rb'(\d+)' + _pgm_separator + rb'(\d+)' + _pgm_separator + rb'(\d+)\s'
+)
+
+def _map_pgm(image_file: str) -> GrayPixels|None:
+    """
+    Memory-maps the pixels of a binary 8-bit PGM file.
+    Returns `None` for other PGM flavours, which are read by OpenCV.
+    """
+    with open(image_file, 'rb') as file:
+        match = _pgm_header.match(file.read(1024))
+    if match is None:
+        return None
+    width, height, max_value = (int(g) for g in match.groups())
+    if max_value > 255:
+        return None
+    pixels: GrayPixels = np.memmap(image_file, np.uint8, 'r', offset=match.end(), shape=(height, width))
+    return pixels
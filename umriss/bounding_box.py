@@ -4,16 +4,27 @@ from .types import Point, Points, Vector
 
 
 class BoundingBox:
+    """
+    Axis-aligned bounding box stored as a single array `[[left, top], [right, bottom]]`.
+    """
+    __slots__ = ('points',)
+    
     def __init__(self, points: Points):
         
         # `cv.boundingRect` rounds floats. Using numpy instead
-        left   = np.min(points[:, 0])
-        right  = np.max(points[:, 0])
-        top    = np.min(points[:, 1])
-        bottom = np.max(points[:, 1])
-        
-        self.points: Points = np.array([[left, top], [right, bottom]])
-        
-        self.origin: Point = self.points[0]
-        self.size: Vector = self.points[1] - self.points[0]
-        self.center: Point = self.origin + self.size / 2
+        self.points: Points = np.array([points.min(axis=0), points.max(axis=0)])
+    
+    @property
+    def origin(self) -> Point:
+        origin: Point = self.points[0]
+        return origin
+    
+    @property
+    def size(self) -> Vector:
+        size: Vector = self.points[1] - self.points[0]
+        return size
+    
+    @property
+    def center(self) -> Point:
+        center: Point = self.origin + self.size / 2
+        return center
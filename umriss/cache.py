@@ -0,0 +1,174 @@
+from __future__ import annotations
+import hashlib
+import os
+import tempfile
+from functools import lru_cache
+from typing import Any
+from zipfile import BadZipFile
+import numpy as np
+
+from .bitmap import Bitmap, BitmapPage, PageSource, read_page_source
+from .packing import PackedDrawing
+from .tracing import Tracing
+from .version import __version__
+
+
+class TraceCache:
+    """
+    An on-disk cache of traced pages (`PackedDrawing`s) in `directory`.
+    A page is keyed by a hash of its image file's bytes (or of the bitmap's pixels),
+    the tracing method with its parameters, and the library version (see `get_cache_key`).
+    When the total size of the cached pages exceeds `max_size` bytes,
+    the least recently used ones are evicted.
+    The total `size` is counted once and then kept up to date with the pages saved by this process,
+    so the pages saved by other processes are counted when the cache is evicted next.
+    
+    The cache can be used from several processes at once:
+    the files are written under temporary names and atomically renamed,
+    and a file removed by another process is just a cache miss.
+    """
+    def __init__(self, directory: str, max_size: int=1 << 30):
+        if max_size < 0:
+            raise ValueError('`max_size` should be >= 0')
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.max_size = max_size
+        self.size: int|None = None
+    
+    
+    def trace_bitmap_packed(self, tracing: Tracing, source: PageSource) -> PackedDrawing:
+        """
+        Returns the cached page if it has been traced with the same `tracing` before.
+        Otherwise, reads and traces the page and caches the result.
+        """
+        key = get_cache_key(tracing, source)
+        packed = self.load(key)
+        if packed is None:
+            packed = tracing.trace_bitmap_packed(read_page_source(source))
+            self.save(key, packed)
+        return packed
+    
+    
+    def load(self, key: str) -> PackedDrawing|None:
+        filename = self._get_filename(key)
+        try:
+            packed = PackedDrawing.load(filename)
+            # the modification time is the last use time
+            os.utime(filename)
+        except (OSError, ValueError, KeyError, BadZipFile):
+            return None
+        return packed
+    
+    
+    def save(self, key: str, packed: PackedDrawing) -> None:
+        """
+        Saves the page and evicts the cache if it has grown over `max_size`.
+        """
+        filename = self._get_filename(key)
+        descriptor, temp_filename = tempfile.mkstemp('.tmp', dir=self.directory)
+        try:
+            with os.fdopen(descriptor, 'wb') as file:
+                packed.save(file)
+            saved_size = os.path.getsize(temp_filename)
+            replaced_size = _get_size_if_exists(filename)
+            os.replace(temp_filename, filename)
+        except BaseException:
+            os.remove(temp_filename)
+            raise
+        
+        if self.size is None:
+            self.evict()
+        else:
+            self.size += saved_size - replaced_size
+            if self.size > self.max_size:
+                self.evict()
+    
+    
+    def evict(self) -> None:
+        """
+        Removes the least recently used pages until the cache fits into `max_size`, and counts its `size`.
+        """
+        entries: list[tuple[float, int, str]] = []
+        with os.scandir(self.directory) as directory_entries:
+            for entry in directory_entries:
+                if entry.name.endswith('.npz'):
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, filename in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            try:
+                os.remove(filename)
+            except FileNotFoundError:
+                pass
+            total_size -= size
+        self.size = total_size
+    
+    
+    def _get_filename(self, key: str) -> str:
+        return os.path.join(self.directory, f'{key}.npz')
+
+
+def get_cache_key(tracing: Tracing, source: PageSource) -> str:
+    """
+    Hashes the page's image file bytes (see `get_file_digest`) and page number, or the bitmap's pixels,
+    together with the tracing class, its parameters, and the library version.
+    """
+    digest = hashlib.sha256()
+    digest.update(f'umriss {__version__}\n{describe_parameters(tracing)}\n'.encode())
+    match source:
+        case Bitmap():
+            digest.update(f'pixels {source.width}×{source.height}\n'.encode())
+            digest.update(np.ascontiguousarray(source.pixels).data)
+        case BitmapPage():
+            digest.update(f'page {source.page}\n'.encode())
+            digest.update(get_file_digest(source.image_file))
+        case _:
+            raise TypeError('Unsupported page source type')
+    return digest.hexdigest()
+
+
+def get_file_digest(image_file: str) -> bytes:
+    """
+    Returns the SHA-256 digest of the file's bytes.
+    A file is hashed once for all its pages, and again only when its size or modification time change.
+    """
+    stat = os.stat(image_file)
+    return _hash_file(os.path.abspath(image_file), stat.st_size, stat.st_mtime_ns)
+
+
+@lru_cache(maxsize=64)
+def _hash_file(image_file: str, size: int, modification_time: int) -> bytes:
+    digest = hashlib.sha256()
+    with open(image_file, 'rb') as file:
+        while chunk := file.read(1 << 20):
+            digest.update(chunk)
+    return digest.digest()
+
+
+def _get_size_if_exists(filename: str) -> int:
+    try:
+        return os.path.getsize(filename)
+    except FileNotFoundError:
+        return 0
+
+
+def describe_parameters(value: Any) -> str:
+    """
+    Describes an object (e.g. a tracing or an approximation) with all its parameters, recursively.
+    """
+    match value:
+        case None | bool() | int() | float() | str():
+            return repr(value)
+        case np.generic():
+            return repr(value.item())
+        case tuple() | list():
+            return f'[{", ".join(describe_parameters(v) for v in value)}]'
+        case _:
+            parameters = ', '.join(f'{name}={describe_parameters(v)}' for name, v in sorted(vars(value).items()))
+            return f'{type(value).__module__}.{type(value).__qualname__}({parameters})'
@@ -1,7 +1,6 @@
 from __future__ import annotations
 from typing import Self
 from abc import ABC, abstractmethod
-from functools import cached_property
 import numpy as np
 import cv2 as cv
 
@@ -14,6 +13,8 @@ class Contour(ABC):
     """
     Base class for contours.
     """
+    __slots__ = ()
+    
     @property
     @abstractmethod
     def bounds(self) -> BoundingBox:
@@ -39,27 +40,42 @@ class Contour(ABC):
 class LineContour(Contour):
     """
     A contour consisting of line segments, i.e. a polygon.
+    The `points` are often a view into a `ContourPack` shared by many contours.
+    The bounds and the signed area are computed when first needed.
     """
+    __slots__ = ('points', 'hash', '_bounds', '_signed_area')
+    
     def __init__(self, points: Points):
         self.points = points
         self.hash: int|None = None
+        self._bounds: BoundingBox|None = None
+        self._signed_area: float|None = None
     
-    @cached_property
+    @property
     def bounds(self) -> BoundingBox:
-        return BoundingBox(self.points)
+        if self._bounds is None:
+            self._bounds = BoundingBox(self.points)
+        return self._bounds
     
-    @cached_property
+    @property
     def signed_area(self) -> float:
-        area: float = cv.contourArea(self.points.astype(np.float32), oriented=True)
-        return -area
+        if self._signed_area is None:
+            area: float = cv.contourArea(self.points.astype(np.float32), oriented=True)
+            self._signed_area = -area
+        return self._signed_area
     
     def __hash__(self) -> int:
         if self.hash is None:
-            self.hash = hash(self.points.tobytes())
+            # adding zero gets rid of negative zeros
+            points = self.standardize().points.astype(np.float64) + 0.0
+            self.hash = hash(points.tobytes())
         return self.hash
     
     def __eq__(self, other: object) -> bool:
-        return isinstance(other, LineContour) and are_equal(self.points, other.points)
+        return (
+            isinstance(other, LineContour)
+            and are_equal(self.standardize().points, other.standardize().points)
+        )
     
     def standardize(self) -> LineContour:
         """
@@ -72,12 +88,80 @@ class LineContour(Contour):
     
     def offset(self, offset: Vector) -> LineContour:
         return LineContour(self.points + offset)
-    
+
 
 
 class CubicContour(Contour):
     """
     A closed cubic Bézier spline.
+    Every node is `[ctrl1, ctrl2, point]`; a segment starts at the point of the previous node.
+    The bounds are computed when first needed.
     """
+    __slots__ = ('nodes', 'hash', '_bounds')
+    
     def __init__(self, nodes: CubicNodes):
         self.nodes = nodes
+        self.hash: int|None = None
+        self._bounds: BoundingBox|None = None
+    
+    @property
+    def bounds(self) -> BoundingBox:
+        """
+        The exact bounds of the curve, not of the control points.
+        """
+        if self._bounds is None:
+            self._bounds = BoundingBox(np.concatenate((self.nodes[:, 2], self._get_extreme_points())))
+        return self._bounds
+    
+    def __hash__(self) -> int:
+        if self.hash is None:
+            # adding zero gets rid of negative zeros
+            nodes = self.standardize().nodes.astype(np.float64) + 0.0
+            self.hash = hash(nodes.tobytes())
+        return self.hash
+    
+    def __eq__(self, other: object) -> bool:
+        return (
+            isinstance(other, CubicContour)
+            and are_equal(self.standardize().nodes, other.standardize().nodes)
+        )
+    
+    def standardize(self) -> CubicContour:
+        """
+        Returns an equivalent contour whose start point (the point of the last node) is lexicographically minimal.
+        Should be used before hashing and comparison.
+        """
+        start_index = lexicographic_argmin(self.nodes[:, 2])
+        nodes = np.roll(self.nodes, -start_index - 1, axis=0)
+        return CubicContour(nodes)
+    
+    def offset(self, offset: Vector) -> CubicContour:
+        return CubicContour(self.nodes + offset)
+    
+    def _get_extreme_points(self) -> Points:
+        """
+        Finds the points inside the segments where the curve is horizontal or vertical.
+        """
+        p0 = np.roll(self.nodes[:, 2], 1, axis=0)
+        p1, p2, p3 = self.nodes[:, 0], self.nodes[:, 1], self.nodes[:, 2]
+        
+        # the derivative divided by 3 is `a t² + b t + c`, for both coordinates
+        a = 3 * (p1 - p2) + p3 - p0
+        b = 2 * (p0 - 2 * p1 + p2)
+        c = p1 - p0
+        is_quadratic = np.abs(a) > 1e-12
+        discriminants = b ** 2 - 4 * a * c
+        roots = np.sqrt(np.maximum(discriminants, 0))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ts = np.stack((
+                np.where(is_quadratic, (-b + roots) / (2 * a), -c / b),
+                np.where(is_quadratic, (-b - roots) / (2 * a), np.nan),
+            ))
+        ts[:, (discriminants < 0) & is_quadratic] = np.nan
+        
+        # the segment and the coordinate of every root inside the segment
+        _, segment_indices, _ = np.nonzero((ts > 0) & (ts < 1))
+        ts = ts[(ts > 0) & (ts < 1)][:, np.newaxis]
+        p0, p1, p2, p3 = (p[segment_indices] for p in (p0, p1, p2, p3))
+        extreme_points: Points = (1 - ts) ** 3 * p0 + 3 * (1 - ts) ** 2 * ts * p1 + 3 * (1 - ts) * ts ** 2 * p2 + ts ** 3 * p3
+        return extreme_points
@@ -0,0 +1,65 @@
+from hashlib import blake2b
+from typing import Sequence
+import numpy as np
+
+from .contour import LineContour
+from .glyph import Glyph
+from .packing import ContourPack, Offsets
+
+
+def get_glyph_fingerprints(glyphs: Sequence[Glyph[LineContour]]) -> list[bytes]:
+    """
+    Computes canonical fingerprints for all the `glyphs` at once.
+    
+    Glyphs consisting of the same contours get the same fingerprint
+    regardless of the contours' start points and order.
+    Every contour is standardized (started from its lexicographically minimal point)
+    and hashed with a 128-bit hash, then, the sorted contour hashes of a glyph are hashed together.
+    """
+    pack = ContourPack.from_arrays([c.points for g in glyphs for c in g.contours])
+    glyph_offsets = np.cumsum([0] + [len(g.contours) for g in glyphs])
+    return get_packed_fingerprints(pack, glyph_offsets)
+
+
+def get_packed_fingerprints(contours: ContourPack, glyph_offsets: Offsets) -> list[bytes]:
+    """
+    Same as `get_glyph_fingerprints` for packed glyphs,
+    the contours of glyph `i` being the ones between `glyph_offsets[i]` and `glyph_offsets[i + 1]`.
+    """
+    contour_digests = _get_contour_digests(contours)
+    
+    fingerprints: list[bytes] = []
+    for start, end in zip(glyph_offsets[:-1].tolist(), glyph_offsets[1:].tolist()):
+        digest = blake2b(digest_size=_digest_size)
+        for contour_digest in sorted(contour_digests[start:end]):
+            digest.update(contour_digest)
+        fingerprints.append(digest.digest())
+    return fingerprints
+
+
+def get_glyph_fingerprint(glyph: Glyph[LineContour]) -> bytes:
+    return get_glyph_fingerprints([glyph])[0]
+
+
+def _get_contour_digests(pack: ContourPack) -> list[bytes]:
+    starts = pack.offsets[:-1]
+    
+    # float64 for all the coordinates, and no negative zeros
+    points = pack.points.astype(np.float64) + 0.0
+    
+    # index of the lexicographically minimal point of every contour
+    order = np.lexsort((points[:, 1], points[:, 0], pack.get_contour_indices()))
+    min_indices = order[starts]
+    
+    # roll every contour to start from its minimal point
+    indices = pack.get_rolled_indices(starts - min_indices)
+    data = memoryview(points[indices].tobytes())
+    
+    point_size = 2 * points.itemsize
+    return [
+        blake2b(data[start * point_size:end * point_size], digest_size=_digest_size).digest()
+        for start, end in zip(starts.tolist(), pack.offsets[1:].tolist())
+    ]
+
+
+_digest_size = 16
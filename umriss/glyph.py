@@ -10,7 +10,7 @@ from .contour import Contour
 
 TContour = TypeVar('TContour', bound=Contour)
 
-@dataclass
+@dataclass(slots=True)
 class Glyph(Generic[TContour]):
     """
     Represents a connected black area in the image defined by its contours.
@@ -26,16 +26,15 @@ class Glyph(Generic[TContour]):
     
     def __hash__(self) -> int:
         if self.hash is None:
-            self.hash = 0
-            for contour in self.contours:
-                self.hash ^= hash(contour)
+            # independent of the contour order; unlike xor, equal contours do not cancel out
+            self.hash = hash(tuple(sorted(hash(c) for c in self.contours)))
         return self.hash
     
     def __eq__(self, other: object) -> bool:
         if not isinstance(other, Glyph) or len(self.contours) != len(other.contours):
             return False;
         self_contours = sorted(self.contours, key=lambda c: hash(c))
-        other_contours = sorted(self.contours, key=lambda c: hash(c))
+        other_contours = sorted(other.contours, key=lambda c: hash(c))
         return all(s == o for s, o in zip(self_contours, other_contours))
     
     def offset(self, offset: Vector) -> Glyph[TContour]:
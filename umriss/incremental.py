@@ -0,0 +1,422 @@
+from __future__ import annotations
+import os
+import tempfile
+from dataclasses import dataclass
+from functools import partial
+from gzip import GzipFile
+from io import TextIOWrapper
+from os import path
+from typing import Iterable, TypeVar
+from zipfile import BadZipFile
+import numpy as np
+import numpy.typing as npt
+
+from .bitmap import PageSource, get_page_sources, read_page_source
+from .cache import TraceCache, describe_parameters, get_cache_key
+from .contour import Contour, LineContour
+from .document import LineDocument
+from .glyph import Glyph, GlyphInstance
+from .packing import ContourPack, PackedDrawing
+from .tracing import Tracing
+from .approximation import Approximation, ContourCache
+from .unification import find_shared_keys, unify_page_glyphs
+from .fingerprint import get_packed_fingerprints
+from .instrumentation import Instrumentation
+from .parallel import map_pages, trace_pages_packed
+from .streaming import approximate_page, approximate_recorded
+from .svg import OutputFormat, SvgWriter, save_shared_svg, save_page_svg
+
+
+TContour = TypeVar('TContour', bound=Contour)
+
+def trace_incremental(
+        input_bitmaps: Iterable[str|PageSource],
+        output_directory: str,
+        tracing: Tracing,
+        approximation: Approximation[TContour],
+        scale: float=1.0,
+        jobs: int|None=1,
+        output_format: OutputFormat=OutputFormat(),
+        cache: TraceCache|None=None,
+        instrumentation: Instrumentation=Instrumentation(),
+        contour_cache: ContourCache|None=None,
+        state_directory: str|None=None
+) -> None:
+    """
+    Does the same as `trace` but updates the output of a previous run in `output_directory`
+    using the `GlyphIndex` saved in `state_directory`, by default the hidden `.umriss` subdirectory of `output_directory`,
+    so that only the SVG files are left to publish besides it.
+    
+    Only the pages whose pixels (or the tracing) changed are traced.
+    The unchanged pages are matched by their pixels, so an inserted or removed page does not change the pages after it;
+    the files of the pages whose numbers changed are moved.
+    The shared glyphs keep their ids; the ids of the glyphs not shared any more are reused by the newly shared ones.
+    Only the page SVGs whose glyph references changed are rewritten, and the shared SVG only if the shared glyphs changed.
+    The traced glyphs of every page are saved in `state_directory` too (see `_get_page_filename`),
+    so the unchanged pages among the rewritten ones are loaded from there rather than traced again.
+    If the approximation, `scale`, `output_format`, or the use of a `contour_cache` changed,
+    the files of the previous run are removed and all the pages are saved again, still without tracing the unchanged ones.
+    Without an index, all the pages are traced and saved.
+    Checking the pages for changes is reported to the `instrumentation` as the `check` stage.
+    """
+    page_sources = list(get_page_sources(input_bitmaps))
+    settings_values = [approximation, scale, output_format.compressed, output_format.compression_level]
+    if contour_cache is not None:
+        # the contours are approximated in their canonical forms, see `ContourCache`
+        settings_values.append('canonical contours')
+    settings = describe_parameters(settings_values)
+    if state_directory is None:
+        state_directory = path.join(output_directory, _state_directory_name)
+    os.makedirs(state_directory, exist_ok=True)
+    index_filename = path.join(state_directory, _index_filename)
+    glyph_index = GlyphIndex.load(index_filename)
+    saved_page_keys = _get_saved_page_keys(state_directory)
+    if glyph_index is None or glyph_index.settings != settings:
+        if glyph_index is not None:
+            # the new files may not replace the old ones, e.g. if their extension changed
+            for filename in glyph_index.filenames:
+                _remove_if_exists(path.join(output_directory, filename))
+        glyph_index = GlyphIndex(settings, [], [], [], [], [])
+    
+    with instrumentation.stage('check'):
+        page_keys = list(map_pages(partial(_get_page_key, tracing), page_sources, jobs))
+    old_page_numbers = _match_pages(glyph_index.page_keys, page_keys)
+    changed_pages = [page_number for page_number in range(len(page_sources)) if page_number not in old_page_numbers]
+    get_pages = partial(
+        _load_or_trace_pages, page_sources, page_keys, saved_page_keys, state_directory, tracing, jobs, cache, instrumentation
+    )
+    
+    traced_pages = get_pages(changed_pages)
+    page_fingerprints = [
+        get_packed_fingerprints(traced_pages[n].contours, traced_pages[n].glyph_offsets) if n in traced_pages
+        else glyph_index.page_fingerprints[old_page_numbers[n]]
+        for n in range(len(page_sources))
+    ]
+    
+    old_shared_indices = _get_shared_indices(glyph_index.shared_fingerprints)
+    shared_fingerprints, added_indices = _assign_shared_indices(glyph_index.shared_fingerprints, find_shared_keys(page_fingerprints))
+    shared_indices = _get_shared_indices(shared_fingerprints)
+    shared_glyphs: list[Glyph[LineContour]|None] = [
+        None if i in added_indices else glyph_index.shared_glyphs[i]
+        for i in range(len(shared_fingerprints))
+    ]
+    
+    # the pages containing glyphs whose shared ids changed are rewritten too
+    changed_fingerprints = {
+        f for f in old_shared_indices.keys() | shared_indices.keys()
+        if old_shared_indices.get(f) != shared_indices.get(f)
+    }
+    rewritten_pages = [
+        page_number for page_number, fingerprints in enumerate(page_fingerprints)
+        if page_number in traced_pages or any(f in changed_fingerprints for f in fingerprints)
+    ]
+    moved_pages = {n: m for n, m in old_page_numbers.items() if n != m and n not in rewritten_pages}
+    is_shared_changed = len(added_indices) > 0 or len(shared_fingerprints) != len(glyph_index.shared_fingerprints)
+    
+    # if the update is interrupted, the next one starts from scratch
+    if path.exists(index_filename):
+        os.remove(index_filename)
+    
+    with SvgWriter(output_directory, output_format, instrumentation) as writer:
+        _move_page_files(moved_pages, writer)
+        for page_number in rewritten_pages:
+            packed = traced_pages.pop(page_number) if page_number in traced_pages else get_pages([page_number])[page_number]
+            with instrumentation.stage('unify', page_number) as record:
+                page = packed.to_drawing()
+                instances = [o for o in page.glyph_occurrences if isinstance(o, GlyphInstance)]
+                fingerprints = page_fingerprints[page_number]
+                
+                # the first occurrence of a newly shared glyph becomes its representative
+                for instance, fingerprint in zip(instances, fingerprints):
+                    shared_index = shared_indices.get(fingerprint)
+                    if shared_index in added_indices and shared_glyphs[shared_index] is None:
+                        shared_glyphs[shared_index] = instance.glyph
+                
+                unified = unify_page_glyphs(page, instances, fingerprints, shared_indices)
+                if instrumentation.is_enabled:
+                    record.count_drawing(unified)
+            
+            approximated = approximate_page(approximation, unified, page_number, instrumentation, contour_cache)
+            save_page_svg(approximated, approximated.pages[0], page_number, writer, scale)
+        
+        for page_number in range(len(page_sources), len(glyph_index.page_keys)):
+            _remove_if_exists(path.join(output_directory, writer.get_filename(f'p{page_number}')))
+        
+        # every newly shared glyph occurs on a rewritten page, so all the glyphs are known here
+        kept_shared_glyphs = [g for g in shared_glyphs if g is not None]
+        if is_shared_changed or len(glyph_index.page_keys) == 0:
+            if len(kept_shared_glyphs) > 0:
+                shared = LineDocument([], kept_shared_glyphs)
+                approximated = approximate_recorded(approximation, shared, None, instrumentation, contour_cache)
+                save_shared_svg(approximated, writer, scale)
+            else:
+                _remove_if_exists(path.join(output_directory, writer.shared_filename))
+        
+        filenames = [writer.get_filename(f'p{page_number}') for page_number in range(len(page_sources))]
+        if len(kept_shared_glyphs) > 0:
+            filenames.append(writer.shared_filename)
+    
+    _remove_stale_page_files(state_directory, saved_page_keys, page_keys)
+    GlyphIndex(settings, page_keys, page_fingerprints, shared_fingerprints, kept_shared_glyphs, filenames).save(index_filename)
+
+
+@dataclass
+class GlyphIndex:
+    """
+    Describes the contents of an output directory for `trace_incremental`:
+    the `settings` the files were saved with, the key (see `_get_page_key`)
+    and the glyph fingerprints of every page, and the shared glyphs with their fingerprints,
+    `None` for an id that is not used any more (its glyph is kept in the shared SVG),
+    and the `filenames` of the saved SVGs.
+    """
+    settings: str
+    page_keys: list[str]
+    page_fingerprints: list[list[bytes]]
+    shared_fingerprints: list[bytes|None]
+    shared_glyphs: list[Glyph[LineContour]]
+    filenames: list[str]
+    
+    
+    @classmethod
+    def load(cls, filename: str) -> GlyphIndex|None:
+        """
+        Returns `None` if the file is missing or unreadable.
+        """
+        try:
+            with np.load(filename, allow_pickle=False) as data:
+                fingerprints = _split_fingerprints(data['fingerprints'])
+                page_offsets = data['page_offsets'].tolist()
+                page_fingerprints = [fingerprints[start:end] for start, end in zip(page_offsets[:-1], page_offsets[1:])]
+                is_shared_used = data['is_shared_used'].tolist()
+                shared_fingerprints = [
+                    f if is_used else None
+                    for f, is_used in zip(_split_fingerprints(data['shared_fingerprints']), is_shared_used)
+                ]
+                contours = [LineContour(points) for points in ContourPack(data['points'], data['offsets'])]
+                glyph_offsets = data['glyph_offsets'].tolist()
+                return cls(
+                    str(data['settings']),
+                    data['page_keys'].tolist(),
+                    page_fingerprints,
+                    shared_fingerprints,
+                    [Glyph[LineContour](contours[start:end]) for start, end in zip(glyph_offsets[:-1], glyph_offsets[1:])],
+                    data['filenames'].tolist()
+                )
+        except (OSError, ValueError, KeyError, BadZipFile):
+            return None
+    
+    
+    def save(self, filename: str) -> None:
+        """
+        Saves the index atomically.
+        """
+        page_offsets = np.zeros(len(self.page_fingerprints) + 1, dtype=np.intp)
+        np.cumsum([len(f) for f in self.page_fingerprints], out=page_offsets[1:])
+        glyph_offsets = np.zeros(len(self.shared_glyphs) + 1, dtype=np.intp)
+        np.cumsum([len(g.contours) for g in self.shared_glyphs], out=glyph_offsets[1:])
+        contours = ContourPack.from_contours([c for g in self.shared_glyphs for c in g.contours])
+        
+        descriptor, temp_filename = tempfile.mkstemp('.tmp', dir=path.dirname(filename) or '.')
+        try:
+            with os.fdopen(descriptor, 'wb') as file:
+                np.savez(
+                    file,
+                    settings=np.array(self.settings),
+                    page_keys=np.array(self.page_keys, dtype=str),
+                    fingerprints=_join_fingerprints([f for fs in self.page_fingerprints for f in fs]),
+                    page_offsets=page_offsets,
+                    shared_fingerprints=_join_fingerprints([f or b'' for f in self.shared_fingerprints]),
+                    is_shared_used=np.array([f is not None for f in self.shared_fingerprints], dtype=bool),
+                    points=contours.points,
+                    offsets=contours.offsets,
+                    glyph_offsets=glyph_offsets,
+                    filenames=np.array(self.filenames, dtype=str)
+                )
+            os.replace(temp_filename, filename)
+        except BaseException:
+            os.remove(temp_filename)
+            raise
+
+
+def _get_page_key(tracing: Tracing, source: PageSource) -> str:
+    """
+    Keys a page by its pixels and the `tracing` (see `get_cache_key`),
+    so that only the changed pages of a multi-page file get new keys.
+    """
+    return get_cache_key(tracing, read_page_source(source))
+
+
+def _get_page_filename(state_directory: str, page_key: str) -> str:
+    """
+    Returns the file the traced glyphs of a page are saved in, named by its key,
+    so that a page keeps its file when its number changes.
+    """
+    return path.join(state_directory, f'{page_key}.npz')
+
+
+def _get_saved_page_keys(state_directory: str) -> set[str]:
+    """
+    Returns the keys of the pages saved in `state_directory`, including the ones of an interrupted run.
+    """
+    with os.scandir(state_directory) as entries:
+        return {
+            entry.name[:-len('.npz')] for entry in entries
+            if entry.name.endswith('.npz') and entry.name != _index_filename
+        }
+
+
+def _remove_stale_page_files(state_directory: str, saved_page_keys: set[str], page_keys: list[str]) -> None:
+    """
+    Removes the saved pages of `state_directory` which are not among the current `page_keys`.
+    """
+    for key in saved_page_keys.difference(page_keys):
+        _remove_if_exists(_get_page_filename(state_directory, key))
+
+
+def _load_or_trace_pages(
+        page_sources: list[PageSource],
+        page_keys: list[str],
+        saved_page_keys: set[str],
+        state_directory: str,
+        tracing: Tracing,
+        jobs: int|None,
+        cache: TraceCache|None,
+        instrumentation: Instrumentation,
+        page_numbers: list[int]
+) -> dict[int, PackedDrawing]:
+    """
+    Returns the traced pages by their numbers.
+    The pages saved by the previous run (see `_get_page_filename`) are loaded,
+    the others are traced and saved.
+    """
+    pages: dict[int, PackedDrawing] = {}
+    for page_number in page_numbers:
+        if page_keys[page_number] in saved_page_keys:
+            try:
+                pages[page_number] = PackedDrawing.load(_get_page_filename(state_directory, page_keys[page_number]))
+            except (OSError, ValueError, KeyError, BadZipFile):
+                pass
+    
+    traced_page_numbers = [n for n in page_numbers if n not in pages]
+    traced_pages = trace_pages_packed(
+        [page_sources[n] for n in traced_page_numbers], tracing, jobs,
+        cache=cache, instrumentation=instrumentation, page_numbers=traced_page_numbers
+    )
+    for page_number, packed in zip(traced_page_numbers, traced_pages):
+        _save_page(_get_page_filename(state_directory, page_keys[page_number]), packed)
+        saved_page_keys.add(page_keys[page_number])
+        pages[page_number] = packed
+    return pages
+
+
+def _save_page(filename: str, packed: PackedDrawing) -> None:
+    """
+    Saves a traced page atomically.
+    """
+    descriptor, temp_filename = tempfile.mkstemp('.tmp', dir=path.dirname(filename) or '.')
+    try:
+        with os.fdopen(descriptor, 'wb') as file:
+            packed.save(file)
+        os.replace(temp_filename, filename)
+    except BaseException:
+        os.remove(temp_filename)
+        raise
+
+
+def _match_pages(old_page_keys: list[str], page_keys: list[str]) -> dict[int, int]:
+    """
+    Matches the pages with the unchanged pages of the previous run by their keys, keeping their numbers if possible.
+    Returns the old number of every matched page by its new number.
+    """
+    old_page_numbers = {
+        page_number: page_number for page_number, key in enumerate(page_keys[:len(old_page_keys)])
+        if old_page_keys[page_number] == key
+    }
+    unmatched_by_key: dict[str, list[int]] = {}
+    for page_number, key in enumerate(old_page_keys):
+        if page_number not in old_page_numbers:
+            unmatched_by_key.setdefault(key, []).append(page_number)
+    
+    for page_number, key in enumerate(page_keys):
+        unmatched = unmatched_by_key.get(key)
+        if page_number not in old_page_numbers and unmatched:
+            old_page_numbers[page_number] = unmatched.pop(0)
+    return old_page_numbers
+
+
+def _move_page_files(moved_pages: dict[int, int], writer: SvgWriter) -> None:
+    """
+    Moves the files of the unchanged pages, `moved_pages` giving the old number of every page by its new number.
+    The compressed files are compressed again, as their gzip headers contain their names.
+    """
+    def get_page_filename(page_number: int) -> str:
+        return path.join(writer.output_directory, writer.get_filename(f'p{page_number}'))
+    
+    # the files are moved away first, as a page can take the number of another moved page
+    temp_filenames = {n: get_page_filename(m) + '.moved' for n, m in moved_pages.items()}
+    for page_number, old_page_number in moved_pages.items():
+        os.replace(get_page_filename(old_page_number), temp_filenames[page_number])
+    
+    for page_number, temp_filename in temp_filenames.items():
+        filename = get_page_filename(page_number)
+        if writer.output_format.compressed:
+            with TextIOWrapper(GzipFile(temp_filename, 'rb'), encoding='utf-8') as source, writer.output_format.open(filename) as file:
+                while chunk := source.read(1 << 20):
+                    file.write(chunk)
+            os.remove(temp_filename)
+        else:
+            os.replace(temp_filename, filename)
+
+
+def _assign_shared_indices(
+        old_shared_fingerprints: list[bytes|None],
+        new_shared_fingerprints: list[bytes]
+) -> tuple[list[bytes|None], set[int]]:
+    """
+    Gives ids to the `new_shared_fingerprints` keeping the ids of the `old_shared_fingerprints`.
+    The ids of the fingerprints not shared any more are reused, the unused ids at the end are dropped.
+    Returns the fingerprint of every id (`None` for an unused one) and the ids given to new fingerprints.
+    """
+    still_shared = set(new_shared_fingerprints)
+    shared_fingerprints = [f if f in still_shared else None for f in old_shared_fingerprints]
+    free_indices = iter([i for i, f in enumerate(shared_fingerprints) if f is None])
+    old_shared = set(old_shared_fingerprints)
+    added_indices: set[int] = set()
+    for fingerprint in new_shared_fingerprints:
+        if fingerprint not in old_shared:
+            index = next(free_indices, len(shared_fingerprints))
+            if index == len(shared_fingerprints):
+                shared_fingerprints.append(fingerprint)
+            else:
+                shared_fingerprints[index] = fingerprint
+            added_indices.add(index)
+    
+    while len(shared_fingerprints) > 0 and shared_fingerprints[-1] is None:
+        shared_fingerprints.pop()
+    return shared_fingerprints, added_indices
+
+
+def _get_shared_indices(shared_fingerprints: list[bytes|None]) -> dict[bytes, int]:
+    return { fingerprint: index for index, fingerprint in enumerate(shared_fingerprints) if fingerprint is not None }
+
+
+def _join_fingerprints(fingerprints: list[bytes]) -> npt.NDArray[np.uint8]:
+    """
+    Packs equally long fingerprints into rows, an empty fingerprint becoming a zero row.
+    """
+    size = max((len(f) for f in fingerprints), default=0)
+    data = b''.join(f.ljust(size, b'\0') for f in fingerprints)
+    return np.frombuffer(data, dtype=np.uint8).reshape(len(fingerprints), size)
+
+
+def _split_fingerprints(rows: npt.NDArray[np.uint8]) -> list[bytes]:
+    return [row.tobytes() for row in rows]
+
+
+def _remove_if_exists(filename: str) -> None:
+    if path.exists(filename):
+        os.remove(filename)
+
+
+_state_directory_name = '.umriss'
+_index_filename = 'index.npz'
@@ -0,0 +1,226 @@
+from __future__ import annotations
+import json
+import sys
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, replace
+from time import perf_counter, process_time
+from types import TracebackType
+from typing import Any, Callable, Iterable, Iterator, Sequence, TextIO
+
+from .contour import Contour, LineContour, CubicContour
+from .document import Document
+from .drawing import Drawing
+from .glyph import Glyph, GlyphInstance
+from .packing import PackedDrawing
+
+if sys.platform != 'win32':
+    import resource
+
+
+@dataclass
+class StageRecord:
+    """
+    Measurements of a pipeline `stage` (e.g. `'load'`, `'trace'`, `'unify'`, `'approximate'`, `'render'`, `'write'`),
+    for a single `page` if it is given.
+    
+    `wall_time` and `cpu_time` (of the whole process) are in seconds.
+    `peak_rss` is the peak resident set size of the process in bytes, if the platform reports it.
+    If `tracemalloc` is enabled, `memory_delta` is the change in the traced memory during the stage,
+    and `memory_peak` is the peak traced memory above the stage's start,
+    `None` if the stage overlapped another one (e.g. the `write` stage in a background thread),
+    as `tracemalloc` has a single peak for the whole process.
+    The counts describe the stage's output, `None` meaning not applicable.
+    `cache_hits` and `cache_misses` are the contours of the `approximate` stage found in a `ContourCache` and approximated.
+    """
+    stage: str
+    page: int|None = None
+    wall_time: float = 0.0
+    cpu_time: float = 0.0
+    peak_rss: int|None = None
+    memory_delta: int|None = None
+    memory_peak: int|None = None
+    glyphs: int|None = None
+    contours: int|None = None
+    points: int|None = None
+    bytes_out: int|None = None
+    cache_hits: int|None = None
+    cache_misses: int|None = None
+    
+    
+    def count_packed(self, packed: PackedDrawing) -> None:
+        self.glyphs = len(packed.glyph_offsets) - 1
+        self.contours = len(packed.contours)
+        self.points = len(packed.contours.points)
+    
+    
+    def count_document(self, document: Document[Any]) -> None:
+        """
+        Counts the glyphs of the `document`'s pages and its shared glyphs, every glyph definition once.
+        """
+        self.count_glyphs([g for p in document.pages for g in _get_defined_glyphs(p)] + document.shared_glyphs)
+    
+    
+    def count_drawing(self, drawing: Drawing[Any]) -> None:
+        self.count_glyphs(list(_get_defined_glyphs(drawing)))
+    
+    
+    def count_glyphs(self, glyphs: Sequence[Glyph[Any]]) -> None:
+        contours = [c for g in glyphs for c in g.contours]
+        self.glyphs = len(glyphs)
+        self.contours = len(contours)
+        self.points = sum(_count_points(c) for c in contours)
+
+
+class Instrumentation:
+    """
+    Measures the pipeline stages (see `stage`) and passes a `StageRecord` of each of them to every one of the `sinks`
+    (e.g. `JsonLinesSink` or `PrintSink`). Without sinks, it is silent.
+    `trace_memory` enables `tracemalloc` measurements, which slow the Python code down considerably.
+    Sinks are called under a lock, as the files can be written in a background thread.
+    """
+    def __init__(self, *sinks: Callable[[StageRecord], None], trace_memory: bool=False):
+        self.sinks = sinks
+        self.trace_memory = trace_memory
+        self._lock = threading.Lock()
+        # whether the stages in progress overlapped another one, by record id
+        self._is_overlapped: dict[int, bool] = {}
+    
+    
+    @property
+    def is_enabled(self) -> bool:
+        return len(self.sinks) > 0
+    
+    
+    @contextmanager
+    def stage(self, name: str, page: int|None=None) -> Iterator[StageRecord]:
+        """
+        Measures the code inside the `with` block. The counts can be set on the yielded record.
+        The record is passed to the sinks only if the block completes.
+        """
+        record = StageRecord(name, page)
+        if not self.is_enabled:
+            yield record
+            return
+        
+        if self.trace_memory:
+            with self._lock:
+                if not tracemalloc.is_tracing():
+                    tracemalloc.start()
+                for key in self._is_overlapped:
+                    self._is_overlapped[key] = True
+                self._is_overlapped[id(record)] = len(self._is_overlapped) > 0
+                start_memory, _ = tracemalloc.get_traced_memory()
+                tracemalloc.reset_peak()
+        start_wall_time = perf_counter()
+        start_cpu_time = process_time()
+        
+        try:
+            yield record
+        finally:
+            if self.trace_memory:
+                with self._lock:
+                    is_overlapped = self._is_overlapped.pop(id(record))
+        
+        record.wall_time = perf_counter() - start_wall_time
+        record.cpu_time = process_time() - start_cpu_time
+        record.peak_rss = get_peak_rss()
+        if self.trace_memory:
+            memory, peak_memory = tracemalloc.get_traced_memory()
+            record.memory_delta = memory - start_memory
+            record.memory_peak = None if is_overlapped else peak_memory - start_memory
+        self.record(record)
+    
+    
+    def record(self, record: StageRecord) -> None:
+        with self._lock:
+            for sink in self.sinks:
+                sink(record)
+    
+    
+    def forward(self, records: Iterable[StageRecord], page: int) -> None:
+        """
+        Passes the `records` made in a worker process to the sinks, setting their `page`.
+        """
+        for record in records:
+            self.record(replace(record, page=page))
+
+
+def get_peak_rss() -> int|None:
+    if sys.platform == 'win32':
+        return None
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak_rss if sys.platform == 'darwin' else peak_rss * 1024
+
+
+class JsonLinesSink:
+    """
+    Writes every record as a JSON object on a separate line into `file`,
+    a file name or an open text file.
+    Should be closed (or used as a context manager) if created with a file name.
+    """
+    def __init__(self, file: str|TextIO):
+        self.is_own_file = isinstance(file, str)
+        self.file: TextIO = open(file, 'w') if isinstance(file, str) else file
+    
+    
+    def __call__(self, record: StageRecord) -> None:
+        self.file.write(json.dumps(asdict(record)) + '\n')
+        self.file.flush()
+    
+    
+    def close(self) -> None:
+        if self.is_own_file:
+            self.file.close()
+    
+    
+    def __enter__(self) -> JsonLinesSink:
+        return self
+    
+    
+    def __exit__(self,
+            exc_type: type[BaseException]|None,
+            exc_value: BaseException|None,
+            traceback: TracebackType|None
+    ) -> None:
+        self.close()
+
+
+class PrintSink:
+    """
+    Prints a short line about every record into `file` (the standard error by default).
+    """
+    def __init__(self, file: TextIO|None=None):
+        self.file = file
+    
+    
+    def __call__(self, record: StageRecord) -> None:
+        page = '' if record.page is None else f' page {record.page}'
+        counts = ''.join(
+            f', {value} {name}' for name, value in
+            [
+                ('glyphs', record.glyphs), ('contours', record.contours), ('points', record.points), ('bytes', record.bytes_out),
+                ('cache hits', record.cache_hits), ('cache misses', record.cache_misses)
+            ]
+            if value is not None
+        )
+        print(f'{record.stage}{page}: {record.wall_time * 1000:.1f} ms{counts}', file=self.file or sys.stderr)
+
+
+def _get_defined_glyphs(drawing: Drawing[Any]) -> Iterator[Glyph[Any]]:
+    for occurrence in drawing.glyph_occurrences:
+        if isinstance(occurrence, GlyphInstance):
+            yield occurrence.glyph
+    yield from drawing.referenced_glyphs
+
+
+def _count_points(contour: Contour) -> int:
+    match contour:
+        case LineContour():
+            return len(contour.points)
+        case CubicContour():
+            return len(contour.nodes)
+        case _:
+            raise TypeError('Unsupported contour type')
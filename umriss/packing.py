@@ -0,0 +1,232 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import IO, Any, Iterable, Iterator, Sequence
+import numpy as np
+import numpy.typing as npt
+
+from .types import Points
+from .contour import Contour, LineContour, CubicContour
+from .drawing import LineDrawing
+from .glyph import Glyph, GlyphInstance
+
+
+Offsets = npt.NDArray[np.intp]
+
+
+class ContourPack:
+    """
+    A ragged array of contours.
+    The points of all the contours are concatenated into a single `points` array,
+    contour `i` being `points[offsets[i]:offsets[i + 1]]`.
+    Compact to store and cheap to send to another process.
+    """
+    __slots__ = ('points', 'offsets')
+    
+    def __init__(self, points: Points, offsets: Offsets):
+        self.points = points
+        self.offsets = offsets
+    
+    
+    @classmethod
+    def from_arrays(cls, arrays: Sequence[Points]) -> ContourPack:
+        lengths = [len(a) for a in arrays]
+        offsets: Offsets = np.zeros(len(arrays) + 1, dtype=np.intp)
+        np.cumsum(lengths, out=offsets[1:])
+        points = np.concatenate(arrays) if len(arrays) > 0 else np.zeros((0, 2))
+        return cls(points, offsets)
+    
+    
+    @classmethod
+    def from_contours(cls, contours: Sequence[Contour]) -> ContourPack:
+        """
+        Packs the points of `LineContour`s or the nodes of `CubicContour`s.
+        """
+        return cls.from_arrays([_get_contour_data(c) for c in contours])
+    
+    
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+    
+    
+    def __getitem__(self, index: int) -> Points:
+        return self.points[self.offsets[index]:self.offsets[index + 1]]
+    
+    
+    def __iter__(self) -> Iterator[Points]:
+        return iter(np.split(self.points, self.offsets[1:-1]))
+    
+    
+    @property
+    def lengths(self) -> Offsets:
+        lengths: Offsets = np.diff(self.offsets)
+        return lengths
+    
+    
+    def get_bounds(self) -> npt.NDArray[Any]:
+        """
+        Returns the bounding box corners `[[left, top], [right, bottom]]` of every contour.
+        """
+        if len(self) == 0:
+            return np.zeros((0, 2, 2), dtype=self.points.dtype)
+        starts = self.offsets[:-1]
+        return np.stack((
+            np.minimum.reduceat(self.points, starts),
+            np.maximum.reduceat(self.points, starts)
+        ), axis=1)
+    
+    
+    def insert(self, indices: Offsets, points: Points) -> ContourPack:
+        """
+        Inserts the `points` before the given point `indices`, like `np.insert`.
+        A point inserted at index `i` belongs to the contour of point `i`.
+        """
+        inserted_counts = np.searchsorted(np.sort(indices), self.offsets, side='left')
+        return ContourPack(np.insert(self.points, indices, points, axis=0), self.offsets + inserted_counts)
+    
+    
+    def delete(self, is_deleted: npt.NDArray[np.bool_]) -> ContourPack:
+        """
+        Removes the points where `is_deleted` is set.
+        """
+        kept_counts = np.zeros(len(self.points) + 1, dtype=np.intp)
+        np.cumsum(~is_deleted, out=kept_counts[1:])
+        return ContourPack(self.points[~is_deleted], kept_counts[self.offsets])
+    
+    
+    def get_contour_indices(self) -> Offsets:
+        """
+        Returns the index of the contour every point belongs to.
+        """
+        return np.repeat(np.arange(len(self)), self.lengths)
+    
+    
+    def get_rolled_indices(self, shift: int|Offsets) -> Offsets:
+        """
+        Returns point indices that roll every contour by `shift` (a number or a number per contour),
+        i.e. `points[indices]` is like `np.roll(contour, shift, axis=0)` applied to every contour.
+        """
+        lengths = self.lengths
+        starts = np.repeat(self.offsets[:-1], lengths)
+        shifts = shift if isinstance(shift, int) else np.repeat(shift, lengths)
+        indices: Offsets = starts + (np.arange(len(self.points)) - starts - shifts) % np.repeat(lengths, lengths)
+        return indices
+
+
+def _get_contour_data(contour: Contour) -> Points:
+    match contour:
+        case LineContour():
+            return contour.points
+        case CubicContour():
+            return contour.nodes
+        case _:
+            raise TypeError('Unsupported contour type')
+
+
+@dataclass
+class PackedDrawing:
+    """
+    A traced page in a compact form: instead of `Glyph` and `LineContour` objects,
+    holds all the contours in a single `ContourPack`.
+    The contours of glyph `i` are the ones between `glyph_offsets[i]` and `glyph_offsets[i + 1]`,
+    its position is `positions[i]`.
+    """
+    width: float
+    height: float
+    positions: Points
+    glyph_offsets: Offsets
+    contours: ContourPack
+    
+    
+    @classmethod
+    def from_glyphs(cls, width: float, height: float, glyphs: Iterable[Glyph[LineContour]]) -> PackedDrawing:
+        """
+        Packs freshly traced glyphs whose contours are in page coordinates.
+        Every glyph is positioned at the center of its outer contour's bounds,
+        and its contours are made relative to that position, like `GlyphInstance.from_glyph` does.
+        """
+        glyph_lengths: list[int] = []
+        arrays: list[Points] = []
+        for glyph in glyphs:
+            glyph_lengths.append(len(glyph.contours))
+            arrays.extend(c.points for c in glyph.contours)
+        
+        glyph_offsets: Offsets = np.zeros(len(glyph_lengths) + 1, dtype=np.intp)
+        np.cumsum(glyph_lengths, out=glyph_offsets[1:])
+        contours = ContourPack.from_arrays(arrays)
+        
+        outer_bounds = contours.get_bounds()[glyph_offsets[:-1]]
+        origins = outer_bounds[:, 0]
+        positions = origins + (outer_bounds[:, 1] - origins) / 2
+        point_counts = np.diff(contours.offsets[glyph_offsets])
+        points = contours.points - np.repeat(positions, point_counts, axis=0)
+        
+        # pixel contours become half-integer, which float32 represents exactly
+        if np.issubdtype(contours.points.dtype, np.integer) and np.abs(points).max(initial=0) < 1 << 22:
+            points = points.astype(np.float32)
+        
+        return cls(width, height, positions, glyph_offsets, ContourPack(points, contours.offsets))
+    
+    
+    @classmethod
+    def from_drawing(cls, drawing: LineDrawing) -> PackedDrawing:
+        """
+        Packs a freshly traced drawing.
+        Only `GlyphInstance` occurrences are supported.
+        """
+        positions: list[Points] = []
+        glyph_lengths: list[int] = []
+        arrays: list[Points] = []
+        for occurrence in drawing.glyph_occurrences:
+            if not isinstance(occurrence, GlyphInstance):
+                raise TypeError('Only glyph instances can be packed')
+            positions.append(occurrence.position)
+            glyph_lengths.append(len(occurrence.glyph.contours))
+            arrays.extend(c.points for c in occurrence.glyph.contours)
+        
+        glyph_offsets: Offsets = np.zeros(len(glyph_lengths) + 1, dtype=np.intp)
+        np.cumsum(glyph_lengths, out=glyph_offsets[1:])
+        return cls(
+            drawing.width, drawing.height,
+            np.array(positions).reshape(-1, 2),
+            glyph_offsets,
+            ContourPack.from_arrays(arrays)
+        )
+    
+    
+    def to_drawing(self) -> LineDrawing:
+        """
+        Unpacks the drawing. Its contours are views into the packed points.
+        """
+        contours = [LineContour(points) for points in self.contours]
+        occurrences = [
+            GlyphInstance[LineContour](position, Glyph[LineContour](contours[start:end]))
+            for position, start, end in zip(self.positions, self.glyph_offsets[:-1].tolist(), self.glyph_offsets[1:].tolist())
+        ]
+        return LineDrawing(self.width, self.height, occurrences)
+    
+    
+    @classmethod
+    def load(cls, file: str|IO[bytes]) -> PackedDrawing:
+        """
+        Reads a drawing written by `save`.
+        Raises `OSError`, `ValueError`, `KeyError`, or `BadZipFile` if the file is missing or unreadable.
+        """
+        with np.load(file, allow_pickle=False) as data:
+            width, height = data['size'].tolist()
+            return cls(
+                width, height,
+                data['positions'],
+                data['glyph_offsets'],
+                ContourPack(data['points'], data['offsets'])
+            )
+    
+    
+    def save(self, file: str|IO[bytes]) -> None:
+        np.savez(
+            file,
+            size=np.array([self.width, self.height]),
+            positions=self.positions,
+            glyph_offsets=self.glyph_offsets,
+            points=self.contours.points,
+            offsets=self.contours.offsets
+        )
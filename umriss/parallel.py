@@ -0,0 +1,141 @@
+from concurrent.futures import Executor, Future
+from collections import deque
+from functools import partial
+from itertools import count
+from typing import Callable, Iterable, Iterator, TypeVar
+
+from .bitmap import PageSource, get_page_sources, read_page_source
+from .cache import TraceCache
+from .drawing import LineDrawing
+from .instrumentation import Instrumentation, StageRecord
+from .packing import PackedDrawing
+from .tracing import Tracing
+
+
+T = TypeVar('T')
+R = TypeVar('R')
+
+def trace_pages(
+        input_bitmaps: Iterable[str|PageSource],
+        tracing: Tracing,
+        jobs: int|None=1,
+        executor: Executor|None=None,
+        cache: TraceCache|None=None,
+        instrumentation: Instrumentation=Instrumentation()
+) -> Iterator[LineDrawing]:
+    """
+    Traces the `input_bitmaps` (image files, all of whose pages are traced, bitmaps, or pages)
+    and yields the traced pages in the input order.
+    The image files are decoded one page at a time.
+    If `jobs` is not 1 (`None` means all the CPU cores), or an `executor` is given,
+    the pages are decoded and traced in worker processes which send back `PackedDrawing`s.
+    If a `cache` is given, the pages traced before are loaded from it instead.
+    The `load` and `trace` stages of every page are reported to the `instrumentation`.
+    """
+    packed_pages = trace_pages_packed(get_page_sources(input_bitmaps), tracing, jobs, executor, cache, instrumentation)
+    for packed in packed_pages:
+        yield packed.to_drawing()
+
+
+def trace_pages_packed(
+        page_sources: Iterable[PageSource],
+        tracing: Tracing,
+        jobs: int|None=1,
+        executor: Executor|None=None,
+        cache: TraceCache|None=None,
+        instrumentation: Instrumentation=Instrumentation(),
+        page_numbers: Iterable[int]|None=None
+) -> Iterator[PackedDrawing]:
+    """
+    Same as `trace_pages` for page sources, yields `PackedDrawing`s.
+    The stages are reported with the given `page_numbers`, by default the page indices.
+    """
+    trace_page = partial(_trace_page_recorded, tracing, cache, instrumentation.is_enabled, instrumentation.trace_memory)
+    page_numbers = count() if page_numbers is None else page_numbers
+    for page_number, (packed, records) in zip(page_numbers, map_pages(trace_page, page_sources, jobs, executor)):
+        instrumentation.forward(records, page_number)
+        yield packed
+
+
+def map_pages(
+        function: Callable[[T], R],
+        items: Iterable[T],
+        jobs: int|None=1,
+        executor: Executor|None=None
+) -> Iterator[R]:
+    """
+    Applies the `function` to the `items` in the current process if `jobs` is 1,
+    or in a pool of `jobs` worker processes, or in the given `executor`.
+    Yields the results in the input order.
+    """
+    if executor is not None:
+        yield from map_ordered(executor, function, items)
+    elif jobs == 1:
+        yield from map(function, items)
+    else:
+        # `multiprocessing` is imported only when needed, as the worker processes import this module too
+        from concurrent.futures import ProcessPoolExecutor
+        
+        with ProcessPoolExecutor(jobs) as pool:
+            yield from map_ordered(pool, function, items)
+
+
+def map_ordered(
+        executor: Executor,
+        function: Callable[[T], R],
+        items: Iterable[T],
+        window: int|None=None
+) -> Iterator[R]:
+    """
+    Like `Executor.map`, but keeps no more than `window` tasks in flight,
+    so the results of a long input do not pile up in memory.
+    By default, the window is twice the number of the executor's workers.
+    """
+    if window is None:
+        window = 2 * getattr(executor, '_max_workers', 1)
+    
+    pending: deque[Future[R]] = deque()
+    for item in items:
+        pending.append(executor.submit(function, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while len(pending) > 0:
+        yield pending.popleft().result()
+
+
+def trace_page_packed(
+        tracing: Tracing,
+        cache: TraceCache|None,
+        source: PageSource,
+        instrumentation: Instrumentation=Instrumentation()
+) -> PackedDrawing:
+    """
+    Reads and traces a page, or loads it from the `cache` if given (which is reported as the `trace` stage).
+    """
+    if cache is not None:
+        with instrumentation.stage('trace') as record:
+            packed = cache.trace_bitmap_packed(tracing, source)
+            record.count_packed(packed)
+        return packed
+    
+    with instrumentation.stage('load'):
+        bitmap = read_page_source(source)
+    with instrumentation.stage('trace') as record:
+        packed = tracing.trace_bitmap_packed(bitmap)
+        record.count_packed(packed)
+    return packed
+
+
+def _trace_page_recorded(
+        tracing: Tracing,
+        cache: TraceCache|None,
+        is_instrumented: bool,
+        trace_memory: bool,
+        source: PageSource
+) -> tuple[PackedDrawing, list[StageRecord]]:
+    """
+    Traces a page, possibly in a worker process, collecting the stage records to be sent back.
+    """
+    records: list[StageRecord] = []
+    instrumentation = Instrumentation(records.append, trace_memory=trace_memory) if is_instrumented else Instrumentation()
+    return trace_page_packed(tracing, cache, source, instrumentation), records
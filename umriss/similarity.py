@@ -0,0 +1,145 @@
+from typing import Sequence
+import numpy as np
+import numpy.typing as npt
+import cv2 as cv
+
+from .types import Points
+from .contour import LineContour
+from .glyph import Glyph, GlyphInstance
+from .drawing import LineDrawing
+from .document import LineDocument
+from .packing import ContourPack
+from .fingerprint import get_glyph_fingerprints
+from .unification import get_glyph_instances, unify_identical_glyphs
+
+
+def unify_similar_glyphs(
+        document: LineDocument,
+        use_shared: bool,
+        max_mismatch: float=0.05,
+        max_size_difference: float=1.0
+) -> LineDocument:
+    """
+    Lossy glyph unification.
+    Replaces similar glyphs with a common representative glyph (see `merge_similar_glyphs`),
+    then, unifies identical glyphs (see `unify_identical_glyphs`).
+    """
+    merged = merge_similar_glyphs(document, max_mismatch, max_size_difference)
+    return unify_identical_glyphs(merged, use_shared)
+
+
+def merge_similar_glyphs(
+        document: LineDocument,
+        max_mismatch: float=0.05,
+        max_size_difference: float=1.0
+) -> LineDocument:
+    """
+    Replaces every glyph with the representative of its cluster of similar glyphs.
+    The most frequent glyphs become representatives.
+    
+    Candidate glyphs are found using a k-d tree of shape descriptors
+    (size, ink area, and ink centroid, in pixels) within `max_size_difference`.
+    A candidate is accepted if, rasterized and aligned by the center,
+    it differs from the representative in no more than `max_mismatch` part of their pixels.
+    """
+    from scipy.spatial import cKDTree
+    
+    instances_by_page = [list(get_glyph_instances(document, page)) for page in document.pages]
+    
+    glyph_by_fingerprint: dict[bytes, Glyph[LineContour]] = dict()
+    count_by_fingerprint: dict[bytes, int] = dict()
+    fingerprints_by_page: list[list[bytes]] = []
+    for instances in instances_by_page:
+        fingerprints = get_glyph_fingerprints([i.glyph for i in instances])
+        fingerprints_by_page.append(fingerprints)
+        for instance, fingerprint in zip(instances, fingerprints):
+            glyph_by_fingerprint.setdefault(fingerprint, instance.glyph)
+            count_by_fingerprint[fingerprint] = count_by_fingerprint.get(fingerprint, 0) + 1
+    
+    # distinct glyphs, the most frequent first
+    fingerprints = sorted(glyph_by_fingerprint, key=lambda f: -count_by_fingerprint[f])
+    glyphs = [glyph_by_fingerprint[f] for f in fingerprints]
+    descriptors = _get_descriptors(glyphs)
+    tree = cKDTree(descriptors)
+    
+    representatives = list(range(len(glyphs)))
+    is_assigned = np.zeros(len(glyphs), dtype=bool)
+    for index, glyph in enumerate(glyphs):
+        if is_assigned[index]:
+            continue
+        is_assigned[index] = True
+        candidates = tree.query_ball_point(descriptors[index], max_size_difference, p=np.inf)
+        for candidate in sorted(candidates):
+            if not is_assigned[candidate] and _are_similar(glyph, glyphs[candidate], max_mismatch):
+                is_assigned[candidate] = True
+                representatives[candidate] = index
+    
+    representative_by_fingerprint = {
+        fingerprint: glyphs[representative]
+        for fingerprint, representative in zip(fingerprints, representatives)
+    }
+    merged_pages = [
+        LineDrawing(page.width, page.height, [
+            GlyphInstance[LineContour](instance.position, representative_by_fingerprint[fingerprint])
+            for instance, fingerprint in zip(instances, page_fingerprints)
+        ])
+        for page, instances, page_fingerprints in zip(document.pages, instances_by_page, fingerprints_by_page)
+    ]
+    return LineDocument(merged_pages)
+
+
+_Descriptors = npt.NDArray[np.float64]
+
+def _get_descriptors(glyphs: Sequence[Glyph[LineContour]]) -> _Descriptors:
+    """
+    Computes a shape descriptor of every glyph:
+    width, height, square root of the ink area, and the ink centroid.
+    All of them are measured in pixels, so that they can be compared to a size difference.
+    """
+    pack = ContourPack.from_arrays([c.points for g in glyphs for c in g.contours])
+    glyph_offsets = np.cumsum([0] + [len(g.contours) for g in glyphs])[:-1]
+    points = pack.points.astype(np.float64)
+    contour_starts = pack.offsets[:-1]
+    
+    # outer contour bounds
+    mins = np.minimum.reduceat(points, contour_starts)[glyph_offsets]
+    maxs = np.maximum.reduceat(points, contour_starts)[glyph_offsets]
+    sizes = maxs - mins
+    
+    # signed area and first moments by the shoelace formula;
+    # holes have the opposite orientation, so they are subtracted
+    next_points = points[pack.get_rolled_indices(-1)]
+    cross = points[:, 0] * next_points[:, 1] - next_points[:, 0] * points[:, 1]
+    moments = (points + next_points) * cross[:, np.newaxis]
+    point_glyph_offsets = pack.offsets[glyph_offsets]
+    areas = np.add.reduceat(cross, point_glyph_offsets) / 2
+    centroids = np.add.reduceat(moments, point_glyph_offsets) / (6 * np.where(areas != 0, areas, 1))[:, np.newaxis]
+    
+    return np.column_stack((sizes, np.sqrt(np.abs(areas)), centroids))
+
+
+def _are_similar(glyph1: Glyph[LineContour], glyph2: Glyph[LineContour], max_mismatch: float) -> bool:
+    size = np.maximum(glyph1.outer_contour.bounds.size, glyph2.outer_contour.bounds.size)
+    width, height = (np.ceil(size).astype(np.int32) + 3)
+    center = np.array([width, height]) / 2
+    raster1 = _rasterize(glyph1, width, height, center)
+    raster2 = _rasterize(glyph2, width, height, center)
+    union = np.count_nonzero(raster1 | raster2)
+    mismatch = np.count_nonzero(raster1 ^ raster2)
+    return mismatch <= max_mismatch * max(union, 1)
+
+
+_subpixel_bits = 3
+
+def _rasterize(glyph: Glyph[LineContour], width: int, height: int, center: Points) -> npt.NDArray[np.uint8]:
+    """
+    Draws a glyph whose contours are relative to its center
+    into a new `width` by `height` raster at the given `center`.
+    """
+    raster = np.zeros((height, width), dtype=np.uint8)
+    polygons = [
+        np.round((c.points + center) * (1 << _subpixel_bits)).astype(np.int32)
+        for c in glyph.contours
+    ]
+    cv.fillPoly(raster, polygons, (1,), shift=_subpixel_bits)
+    return raster
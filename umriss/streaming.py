@@ -0,0 +1,141 @@
+from functools import partial
+from typing import Iterable, Iterator, TypeVar
+
+from .bitmap import PageSource, get_page_sources
+from .cache import TraceCache
+from .contour import Contour, LineContour
+from .document import Document, LineDocument
+from .drawing import LineDrawing
+from .glyph import Glyph, GlyphInstance
+from .tracing import Tracing
+from .approximation import Approximation, ContourCache
+from .unification import find_shared_keys, unify_page_glyphs
+from .fingerprint import get_glyph_fingerprints, get_packed_fingerprints
+from .instrumentation import Instrumentation, StageRecord
+from .parallel import map_pages, trace_pages, trace_page_packed
+from .svg import OutputFormat, SvgWriter, save_shared_svg, save_page_svg
+
+
+TContour = TypeVar('TContour', bound=Contour)
+
+def trace_streaming(
+        input_bitmaps: Iterable[str|PageSource],
+        output_directory: str,
+        tracing: Tracing,
+        approximation: Approximation[TContour],
+        scale: float=1.0,
+        jobs: int|None=1,
+        output_format: OutputFormat=OutputFormat(),
+        cache: TraceCache|None=None,
+        instrumentation: Instrumentation=Instrumentation(),
+        contour_cache: ContourCache|None=None
+) -> None:
+    """
+    Does the same as `trace` but keeps no more than one traced page in memory.
+    
+    The first pass traces the pages and counts their glyph fingerprints (see `get_glyph_fingerprints`)
+    to find out which glyphs occur on several pages and should be shared,
+    keeping only the counts of every distinct fingerprint.
+    The second pass traces the pages again and saves every page right away.
+    The shared glyphs are saved at the end.
+    Image files are read again in the second pass, so only references to their pages are kept.
+    With a `cache`, the second pass loads the pages traced in the first one instead of tracing them again.
+    With a `contour_cache`, the contours repeated on several pages are approximated once.
+    Both passes report the `load` and `trace` stages of every page to the `instrumentation`,
+    the first one also the `fingerprint` stage.
+    """
+    page_sources = list(get_page_sources(input_bitmaps))
+    
+    get_page_fingerprints = partial(_get_page_fingerprints, tracing, cache, instrumentation.is_enabled, instrumentation.trace_memory)
+    # the fingerprints of a page are counted and dropped before the next page is traced
+    shared_fingerprints = find_shared_keys(_forward_records(map_pages(get_page_fingerprints, page_sources, jobs), instrumentation))
+    shared_indices = { fingerprint: index for index, fingerprint in enumerate(shared_fingerprints) }
+    shared_glyphs: list[Glyph[LineContour]|None] = [None] * len(shared_fingerprints)
+    
+    with SvgWriter(output_directory, output_format, instrumentation) as writer:
+        traced_pages = trace_pages(page_sources, tracing, jobs, cache=cache, instrumentation=instrumentation)
+        for page_number, page in enumerate(traced_pages):
+            with instrumentation.stage('unify', page_number) as record:
+                instances = [o for o in page.glyph_occurrences if isinstance(o, GlyphInstance)]
+                fingerprints = get_glyph_fingerprints([i.glyph for i in instances])
+                
+                # the first occurrence of a shared glyph becomes its representative
+                for instance, fingerprint in zip(instances, fingerprints):
+                    index = shared_indices.get(fingerprint)
+                    if index is not None and shared_glyphs[index] is None:
+                        shared_glyphs[index] = instance.glyph
+                
+                unified = unify_page_glyphs(page, instances, fingerprints, shared_indices)
+                if instrumentation.is_enabled:
+                    record.count_drawing(unified)
+            
+            approximated = approximate_page(approximation, unified, page_number, instrumentation, contour_cache)
+            save_page_svg(approximated, approximated.pages[0], page_number, writer, scale)
+        
+        if len(shared_glyphs) > 0:
+            shared = LineDocument([], [g for g in shared_glyphs if g is not None])
+            approximated = approximate_recorded(approximation, shared, None, instrumentation, contour_cache)
+            save_shared_svg(approximated, writer, scale)
+
+
+def approximate_page(
+        approximation: Approximation[TContour],
+        page: LineDrawing,
+        page_number: int,
+        instrumentation: Instrumentation=Instrumentation(),
+        contour_cache: ContourCache|None=None
+) -> Document[TContour]:
+    """
+    Approximates a unified page as a document of its own, the shared glyphs being approximated separately.
+    """
+    return approximate_recorded(approximation, LineDocument([page]), page_number, instrumentation, contour_cache)
+
+
+def approximate_recorded(
+        approximation: Approximation[TContour],
+        document: LineDocument,
+        page_number: int|None,
+        instrumentation: Instrumentation=Instrumentation(),
+        contour_cache: ContourCache|None=None
+) -> Document[TContour]:
+    """
+    Approximates the `document` reporting it as the `approximate` stage,
+    with the hits and misses of the `contour_cache` if it is given.
+    """
+    hits, misses = (0, 0) if contour_cache is None else (contour_cache.hits, contour_cache.misses)
+    with instrumentation.stage('approximate', page_number) as record:
+        approximated = approximation.approximate_document(document, contour_cache)
+        if instrumentation.is_enabled:
+            record.count_document(approximated)
+            if contour_cache is not None:
+                record.cache_hits = contour_cache.hits - hits
+                record.cache_misses = contour_cache.misses - misses
+    return approximated
+
+
+def _forward_records(
+        results: Iterable[tuple[list[bytes], list[StageRecord]]],
+        instrumentation: Instrumentation
+) -> Iterator[list[bytes]]:
+    """
+    Yields the fingerprints of every page, forwarding its stage records to the `instrumentation`.
+    """
+    for page_number, (fingerprints, records) in enumerate(results):
+        instrumentation.forward(records, page_number)
+        yield fingerprints
+
+
+def _get_page_fingerprints(
+        tracing: Tracing,
+        cache: TraceCache|None,
+        is_instrumented: bool,
+        trace_memory: bool,
+        source: PageSource
+) -> tuple[list[bytes], list[StageRecord]]:
+    records: list[StageRecord] = []
+    instrumentation = Instrumentation(records.append, trace_memory=trace_memory) if is_instrumented else Instrumentation()
+    page = trace_page_packed(tracing, cache, source, instrumentation)
+    with instrumentation.stage('fingerprint') as record:
+        fingerprints = get_packed_fingerprints(page.contours, page.glyph_offsets)
+        record.glyphs = len(fingerprints)
+    return fingerprints, records
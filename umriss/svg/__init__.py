@@ -1,28 +1,70 @@
 from typing import TypeVar
-from os import path
 
 from umriss.document import Document, LineDocument, CubicDocument
 from umriss.drawing import Drawing, LineDrawing, CubicDrawing
 from umriss.contour import Contour
+from umriss.instrumentation import Instrumentation
 from .svg_document import SvgDocument
+from .writer import OutputFormat, SvgWriter
+
+
+__all__ = [
+    'save_as_svg',
+    'save_shared_svg',
+    'save_page_svg',
+    # reexport from inner modules
+    'SvgDocument',
+    'OutputFormat',
+    'SvgWriter',
+]
 
 
 TContour = TypeVar('TContour', bound=Contour)
 
-def save_as_svg(document: Document[TContour], output_directory: str, scale: float=1.0) -> None:
-    if len(document.shared_glyphs) > 0:
+def save_as_svg(
+        document: Document[TContour],
+        output_directory: str,
+        scale: float=1.0,
+        output_format: OutputFormat=OutputFormat(),
+        instrumentation: Instrumentation=Instrumentation()
+) -> None:
+    with SvgWriter(output_directory, output_format, instrumentation) as writer:
+        if len(document.shared_glyphs) > 0:
+            save_shared_svg(document, writer, scale)
+        
+        for index, page in enumerate(document.pages):
+            save_page_svg(document, page, index, writer, scale)
+
+
+def save_shared_svg(document: Document[TContour], writer: SvgWriter, scale: float=1.0) -> None:
+    """
+    Saves the `document`'s shared glyphs into the `_.svg` (or `_.svgz`) file.
+    """
+    with writer.instrumentation.stage('render') as record:
         shared_svg = SvgDocument(is_shared=True)
         shared = Drawing[TContour](0, 0, [], document.shared_glyphs)
         _add_drawing(shared_svg, document, shared, scale)
-        filename = path.join(output_directory, '_.svg')
-        shared_svg.save(filename)
-    
-    for index, page in enumerate(document.pages):
-        svg = SvgDocument(page.width, page.height)
+        if writer.instrumentation.is_enabled:
+            record.count_glyphs(document.shared_glyphs)
+    writer.save(shared_svg, '_')
+
+
+def save_page_svg(
+        document: Document[TContour],
+        page: Drawing[TContour],
+        index: int,
+        writer: SvgWriter,
+        scale: float=1.0
+) -> None:
+    """
+    Saves a `page` of the `document` into the `p{index}.svg` (or `.svgz`) file.
+    """
+    with writer.instrumentation.stage('render', index) as record:
+        svg = SvgDocument(page.width, page.height, shared_filename=writer.shared_filename)
         _add_drawing(svg, document, page, scale)
-        
-        filename = path.join(output_directory, f'p{index}.svg')
-        svg.save(filename)
+        if writer.instrumentation.is_enabled:
+            record.count_drawing(page)
+    writer.save(svg, f'p{index}', index)
 
 
 def _add_drawing(svg: SvgDocument, document: Document[TContour], drawing: Drawing[TContour], scale: float) -> None:
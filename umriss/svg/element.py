@@ -1,5 +1,6 @@
 from __future__ import annotations
-from typing import Any
+from io import StringIO
+from typing import Any, TextIO
 
 
 class Element:
@@ -15,12 +16,25 @@ class Element:
     
     
     def render(self, indent: str='') -> str:
+        output = StringIO()
+        self.write(output, indent)
+        return output.getvalue()
+    
+    
+    def write(self, file: TextIO, indent: str='') -> None:
+        """
+        Writes the same text as `render` returns into the `file`
+        element by element, without building the whole text in memory.
+        """
         attributes = ''.join(f' {_attr_name(k)}="{v}"' for k, v in self.attributes.items())
         if len(self.children) > 0:
-            children = ''.join(child.render(indent + ' ') for child in self.children)
-            return f'{indent}<{self.name}{attributes}>\n{children}{indent}</{self.name}>\n'
+            file.write(f'{indent}<{self.name}{attributes}>\n')
+            child_indent = indent + ' '
+            for child in self.children:
+                child.write(file, child_indent)
+            file.write(f'{indent}</{self.name}>\n')
         else:
-            return f'{indent}<{self.name}{attributes} />\n'
+            file.write(f'{indent}<{self.name}{attributes} />\n')
 
 
 def _attr_name(attr: str) -> str:
@@ -1,7 +1,9 @@
+from functools import cache
 from typing import Literal
 import numpy as np
+import numpy.typing as npt
 
-from umriss.types import Point, QuadraticNode, CubicNode
+from umriss.types import Point, Points, QuadraticNode, CubicNode, CubicNodes
 
 
 class PathData:
@@ -14,8 +16,12 @@ class PathData:
     The node-adding methods take absolute coordinates.
     The rendered path data, however, uses relative ones.
     The values are rounded to the specified number of `decimals`.
-    Briefer node types (`h`, `v`, `t`, `s`) are used when possible.
+    Briefer node types (`h`, `v`, `t`, `s`) are used when possible,
+    and straight cubic nodes (with the control points on the segment) are added as line nodes.
     `a`-nodes are not supported.
+    
+    Whole contours can be added at once with `add_line_contour` and `add_cubic_contour`.
+    This is much faster and gives the same result as adding the nodes one by one.
     """
     
     def __init__(self, decimals: int):
@@ -56,7 +62,7 @@ class PathData:
             self._add_node('v', dy)
         else:
             self._add_node('l', dx, dy)
-            
+        
         self.last_point = point
         self.last_quadratic_ctrl = _zero
         self.last_cubic_ctrl = _zero
@@ -77,9 +83,18 @@ class PathData:
     
     
     def add_cubic_node(self, node: CubicNode) -> None:
+        """
+        Adds a cubic node, or a line node if the node is straight
+        (both control points are on the segment up to the rounding).
+        This changes the path data of every cubic approximation, e.g. `SillyCubic`,
+        but not the rendered shape.
+        """
         node = node.round(self.decimals)
         [ctrl1, ctrl2, vector] = node - self.last_point
         
+        if self._are_straight((node - self.last_point)[np.newaxis])[0]:
+            self.add_line_node(node[2])
+            return
         if np.linalg.norm(ctrl1 - self.last_cubic_ctrl) < self.epsilon:
             self._add_node('s', *ctrl2, *vector)
         else:
@@ -90,6 +105,79 @@ class PathData:
         self.last_cubic_ctrl = vector - ctrl2
     
     
+    def add_line_contour(self, points: Points) -> None:
+        """
+        Adds a closed polygon: a move node to the first point,
+        line nodes to the other points, and a close node.
+        """
+        points = points.round(self.decimals)
+        previous = np.concatenate(([self.last_point], points[:-1]))
+        [dx, dy] = (points - previous).T
+        
+        is_horizontal = np.abs(dy) < self.epsilon
+        is_vertical = ~is_horizontal & (np.abs(dx) < self.epsilon)
+        xs = self._format_values(dx)
+        ys = self._format_values(dy)
+        
+        self.nodes.append(f'm{xs[0]},{ys[0]}')
+        self.nodes.extend(
+            'h' + x if h else 'v' + y if v else f'l{x},{y}'
+            for x, y, h, v in zip(xs[1:], ys[1:], is_horizontal[1:].tolist(), is_vertical[1:].tolist())
+        )
+        self.nodes.append('z')
+        
+        self.last_point = points[0]
+        self.last_move_point = points[0]
+        self.last_quadratic_ctrl = _zero
+        self.last_cubic_ctrl = _zero
+    
+    
+    def add_cubic_contour(self, nodes: CubicNodes) -> None:
+        """
+        Adds a closed cubic spline: a move node to the end point of the last node,
+        the cubic nodes (the straight ones as line nodes, like `add_cubic_node`), and a close node.
+        """
+        nodes = nodes.round(self.decimals)
+        start_point = nodes[-1, 2]
+        previous = np.concatenate(([start_point], nodes[:-1, 2]))
+        relative = nodes - previous[:, np.newaxis, :]
+        ctrls1 = relative[:, 0]
+        ctrls2 = relative[:, 1]
+        vectors = relative[:, 2]
+        
+        is_line = self._are_straight(relative)
+        is_horizontal = is_line & (np.abs(vectors[:, 1]) < self.epsilon)
+        is_vertical = is_line & ~is_horizontal & (np.abs(vectors[:, 0]) < self.epsilon)
+        
+        # the reflected control point after a line node is the current point
+        previous_ctrls = np.concatenate(([_zero], (vectors - ctrls2)[:-1]))
+        previous_ctrls[1:][is_line[:-1]] = _zero
+        is_smooth = np.linalg.norm(ctrls1 - previous_ctrls, axis=1) < self.epsilon
+        
+        # all the values are formatted at once, the move vector first
+        formatted = self._format_values(np.concatenate((start_point - self.last_point, relative.reshape(-1))))
+        [mx, my] = formatted[:2]
+        [x1, y1, x2, y2, x, y] = (formatted[2 + i::6] for i in range(6))
+        
+        self.nodes.append(f'm{mx},{my}')
+        self.nodes.extend(
+            'h' + x[i] if horizontal else
+            'v' + y[i] if vertical else
+            f'l{x[i]},{y[i]}' if line else
+            f's{x2[i]},{y2[i]},{x[i]},{y[i]}' if smooth else
+            f'c{x1[i]},{y1[i]},{x2[i]},{y2[i]},{x[i]},{y[i]}'
+            for i, (line, horizontal, vertical, smooth) in enumerate(zip(
+                is_line.tolist(), is_horizontal.tolist(), is_vertical.tolist(), is_smooth.tolist()
+            ))
+        )
+        self.nodes.append('z')
+        
+        self.last_point = start_point
+        self.last_move_point = start_point
+        self.last_quadratic_ctrl = _zero
+        self.last_cubic_ctrl = _zero
+    
+    
     def add_close_node(self) -> None:
         self._add_node('z')
         
@@ -98,6 +186,22 @@ class PathData:
         self.last_cubic_ctrl = _zero
     
     
+    def _are_straight(self, relative_nodes: CubicNodes) -> npt.NDArray[np.bool_]:
+        """
+        Checks whether the cubic nodes (relative to their start points) are straight segments,
+        both control points being on the segment up to the rounding.
+        """
+        relative: npt.NDArray[np.float64] = np.asarray(relative_nodes, dtype=np.float64)
+        ctrls, vectors = relative[:, :2], relative[:, 2:]
+        squared_lengths = np.einsum('ijk,ijk->ij', vectors, vectors)
+        projections = np.einsum('ijk,ijk->ij', ctrls, vectors)
+        np.divide(projections, squared_lengths, out=projections, where=squared_lengths > 0)
+        np.clip(projections, 0.0, 1.0, out=projections)
+        offsets = ctrls - projections[:, :, np.newaxis] * vectors
+        is_straight: npt.NDArray[np.bool_] = np.all(np.einsum('ijk,ijk->ij', offsets, offsets) < (2 * self.epsilon) ** 2, axis=1)
+        return is_straight
+    
+    
     _NodeType = Literal['m', 'h', 'v', 'l', 't', 'q', 's', 'c', 'z']
     
     def _add_node(self, node_type: _NodeType, *values: float) -> None:
@@ -111,6 +215,46 @@ class PathData:
             return formatted.rstrip('0').rstrip('.')
         else:
             return formatted
+    
+    
+    def _format_values(self, values: npt.NDArray[np.float64]) -> list[str]:
+        """
+        Formats an array of values exactly the same way as `_format_value`.
+        """
+        if self.decimals > _max_fraction_table_decimals:
+            return [self._format_value(v) for v in values.tolist()]
+        
+        factor = 10**self.decimals
+        magnitudes = np.abs(np.rint(values * factor)).astype(np.int64)
+        integer_parts, fractions = np.divmod(magnitudes, factor)
+        
+        # `-0` is kept as is to match `str.format`
+        formatted = [
+            '-' + str(integer_part) if is_negative else str(integer_part)
+            for integer_part, is_negative in zip(integer_parts.tolist(), np.signbit(values).tolist())
+        ]
+        
+        # integer values (always the case for `BinarizedExact`) need no fraction part
+        (fraction_indices,) = np.nonzero(fractions)
+        if len(fraction_indices) > 0:
+            fraction_table = _get_fraction_table(self.decimals)
+            for index, fraction in zip(fraction_indices.tolist(), fractions[fraction_indices].tolist()):
+                formatted[index] += fraction_table[fraction]
+        
+        return formatted
+
+
+_max_fraction_table_decimals = 4
+
+@cache
+def _get_fraction_table(decimals: int) -> list[str]:
+    """
+    Formatted fraction parts, e.g. for 2 decimals: `['', '.01', ..., '.1', '.11', ..., '.99']`.
+    """
+    return [
+        f'.{fraction:0{decimals}d}'.rstrip('0').rstrip('.')
+        for fraction in range(10**decimals)
+    ]
 
 
 _zero: Point = np.array([0.0, 0.0])
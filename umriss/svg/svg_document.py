@@ -1,4 +1,4 @@
-from typing import Any, Callable, TypeVar
+from typing import Any, Callable, TextIO, TypeVar
 from umriss.contour import LineContour
 
 from umriss.contour import Contour, CubicContour
@@ -13,14 +13,16 @@ class SvgDocument:
     """
     Generates a simple SVG document with some groups of paths inside.
     
-    Create an `SvgDocument`, add some drawings, then, `render` or `save` it.
+    Create an `SvgDocument`, add some drawings, then, `render`, `write`, or `save` it.
     Drawings can be linear, quadratic, or cubic.
     All the coordinates are rounded to the specified number of `decimals`.
+    References to shared glyphs point into the `shared_filename` file.
     """
     
-    def __init__(self, width: float=0, height: float=0, is_shared=False, decimals: int=2):
+    def __init__(self, width: float=0, height: float=0, is_shared=False, decimals: int=2, shared_filename: str='_.svg'):
         self.is_shared = is_shared
         self.decimals = decimals
+        self.shared_filename = shared_filename
         if is_shared:
             self.svg = Element('svg', xmlns=_xmlns)
         else:
@@ -31,9 +33,17 @@ class SvgDocument:
         return _xml_declaration + self.svg.render()
     
     
+    def write(self, file: TextIO) -> None:
+        """
+        Writes the rendered document into the `file` piece by piece.
+        """
+        file.write(_xml_declaration)
+        self.svg.write(file)
+    
+    
     def save(self, filename: str) -> None:
         with open(filename, 'w') as file:
-            file.write(self.render())
+            self.write(file)
     
     
     def add_line_drawing(self, drawing: LineDrawing, scale: float=1.0) -> None:
@@ -80,7 +90,7 @@ class SvgDocument:
                         add_contour(path_data, contour.offset(occurrence.position), scale)
                     group.add_child(Element('path', d=path_data))
                 case GlyphReference():
-                    href = f'_.svg#s{occurrence.index}' if occurrence.is_shared else f'#r{occurrence.index}'
+                    href = f'{self.shared_filename}#s{occurrence.index}' if occurrence.is_shared else f'#r{occurrence.index}'
                     group.add_child(Element('use',
                         x__href=href,
                         x=self._format_value(occurrence.position[0]),
@@ -94,26 +104,12 @@ class SvgDocument:
     
     def _add_line_contour(self, path_data: PathData, contour: LineContour, scale: float) -> None:
         points = contour.points if scale == 1.0 else scale * contour.points
-        
-        start_point = points[0]
-        path_data.add_move_node(start_point)
-        
-        for point in points[1:]:
-            path_data.add_line_node(point)
-        
-        path_data.add_close_node()
+        path_data.add_line_contour(points)
     
     
     def _add_cubic_contour(self, path_data: PathData, contour: CubicContour, scale: float) -> None:
         nodes = contour.nodes if scale == 1.0 else scale * contour.nodes
-        
-        [_, _, end_point] = nodes[-1]
-        path_data.add_move_node(end_point)
-        
-        for node in nodes:
-            path_data.add_cubic_node(node)
-        
-        path_data.add_close_node()
+        path_data.add_cubic_contour(nodes)
     
     
     def _format_value(self, value: float) -> str:
@@ -0,0 +1,147 @@
+from __future__ import annotations
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from gzip import GzipFile
+from io import BufferedIOBase, StringIO, TextIOWrapper
+from os import linesep, path
+from types import TracebackType
+from typing import TextIO
+
+from umriss.instrumentation import Instrumentation
+from .svg_document import SvgDocument
+
+
+@dataclass(frozen=True)
+class OutputFormat:
+    """
+    Defines how the SVG files are written.
+    
+    If `compressed`, the files are gzip-compressed with the given `compression_level`
+    (0 to 9) while being written and get the `.svgz` extension.
+    If `background`, the files are compressed and written in a worker thread,
+    so that the compression and waiting for the disk overlap with the work going on meanwhile,
+    e.g. tracing the next page.
+    The SVG text is rendered in the calling thread, as rendering holds the GIL,
+    and handed to the worker as a single buffer, which `zlib` compresses without holding the GIL.
+    """
+    compressed: bool = False
+    compression_level: int = 9
+    background: bool = False
+    
+    def __post_init__(self) -> None:
+        if not 0 <= self.compression_level <= 9:
+            raise ValueError('`compression_level` should be between 0 and 9')
+    
+    @property
+    def extension(self) -> str:
+        return '.svgz' if self.compressed else '.svg'
+    
+    
+    def open(self, filename: str) -> TextIO:
+        if self.compressed:
+            return TextIOWrapper(self._open_compressed(filename), encoding='utf-8')
+        else:
+            return open(filename, 'w')
+    
+    
+    def open_binary(self, filename: str) -> BufferedIOBase:
+        if self.compressed:
+            return self._open_compressed(filename)
+        else:
+            return open(filename, 'wb')
+    
+    
+    def _open_compressed(self, filename: str) -> GzipFile:
+        # zero `mtime` makes the output reproducible
+        return GzipFile(filename, 'wb', self.compression_level, mtime=0)
+
+
+class SvgWriter:
+    """
+    Saves `SvgDocument`s into the `output_directory` in the given `output_format`.
+    Should be closed (or used as a context manager) to make sure all the files are written.
+    In the background mode, no more than one document is waiting to be written.
+    Every file is reported to the `instrumentation` as the `write` stage,
+    which includes rendering the SVG text except in the background mode.
+    """
+    
+    def __init__(
+            self,
+            output_directory: str,
+            output_format: OutputFormat=OutputFormat(),
+            instrumentation: Instrumentation=Instrumentation()
+    ):
+        self.output_directory = output_directory
+        self.output_format = output_format
+        self.instrumentation = instrumentation
+        self.executor = ThreadPoolExecutor(1) if output_format.background else None
+        self.pending: Future[None]|None = None
+    
+    
+    @property
+    def shared_filename(self) -> str:
+        """
+        The name of the file containing the shared glyphs, used in references.
+        """
+        return self.get_filename('_')
+    
+    
+    def get_filename(self, name: str) -> str:
+        return name + self.output_format.extension
+    
+    
+    def save(self, svg: SvgDocument, name: str, page: int|None=None) -> None:
+        """
+        Saves the `svg` document as `name` with the format's extension.
+        The `page` number is used for instrumentation only.
+        """
+        filename = path.join(self.output_directory, self.get_filename(name))
+        if self.executor is None:
+            self._write(svg, filename, page)
+        else:
+            # the line endings are translated like in a text file
+            text = StringIO(newline=linesep)
+            svg.write(text)
+            data = text.getvalue().encode('utf-8')
+            self._wait()
+            self.pending = self.executor.submit(self._write_bytes, data, filename, page)
+    
+    
+    def close(self) -> None:
+        self._wait()
+        if self.executor is not None:
+            self.executor.shutdown()
+    
+    
+    def __enter__(self) -> SvgWriter:
+        return self
+    
+    
+    def __exit__(self,
+            exc_type: type[BaseException]|None,
+            exc_value: BaseException|None,
+            traceback: TracebackType|None
+    ) -> None:
+        self.close()
+    
+    
+    def _wait(self) -> None:
+        if self.pending is not None:
+            pending, self.pending = self.pending, None
+            pending.result()
+    
+    
+    def _write(self, svg: SvgDocument, filename: str, page: int|None) -> None:
+        with self.instrumentation.stage('write', page) as record:
+            with self.output_format.open(filename) as file:
+                svg.write(file)
+            if self.instrumentation.is_enabled:
+                record.bytes_out = path.getsize(filename)
+    
+    
+    def _write_bytes(self, data: bytes, filename: str, page: int|None) -> None:
+        with self.instrumentation.stage('write', page) as record:
+            with self.output_format.open_binary(filename) as file:
+                file.write(data)
+            if self.instrumentation.is_enabled:
+                record.bytes_out = path.getsize(filename)
@@ -2,6 +2,7 @@ from .abstract import Tracing
 from .binarized_exact import BinarizedExact
 from .binarized_polygon import BinarizedPolygon
 from .grayscale_polygon import GrayscalePolygon
+from .tiled import Tiled
 
 # reexport from inner modules
 __all__ = [
@@ -9,4 +10,5 @@ __all__ = [
     'BinarizedExact',
     'BinarizedPolygon',
     'GrayscalePolygon',
+    'Tiled',
 ]
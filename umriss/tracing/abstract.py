@@ -4,7 +4,8 @@ from typing import Iterable
 from umriss.bitmap import Bitmap, GrayPixels
 from umriss.contour import LineContour
 from umriss.drawing import LineDrawing
-from umriss.glyph import Glyph, GlyphInstance
+from umriss.glyph import Glyph
+from umriss.packing import PackedDrawing
 
 
 class Tracing(ABC):
@@ -12,12 +13,15 @@ class Tracing(ABC):
     Abstract base class for bitmap tracing algorithms.
     """
     def trace_bitmap(self, bitmap: Bitmap) -> LineDrawing:
+        return self.trace_bitmap_packed(bitmap).to_drawing()
+    
+    def trace_bitmap_packed(self, bitmap: Bitmap) -> PackedDrawing:
+        """
+        Traces the bitmap into a `PackedDrawing`,
+        with the glyphs positioned like `GlyphInstance.from_glyph` does.
+        """
         glyphs = self.get_glyphs(bitmap.pixels)
-        return LineDrawing(
-            bitmap.width,
-            bitmap.height,
-            [GlyphInstance.from_glyph(g) for g in glyphs]
-        )
+        return PackedDrawing.from_glyphs(bitmap.width, bitmap.height, glyphs)
     
     @abstractmethod
     def get_glyphs(self, pixels: GrayPixels) -> Iterable[Glyph[LineContour]]:
@@ -1,80 +1,121 @@
-from typing import Iterator
-from nptyping import NDArray, Shape, Int
+from __future__ import annotations
+from typing import TYPE_CHECKING, Iterator, Sequence
 import numpy as np
 import cv2 as cv
 
-from umriss.types import IntPoint, IntVectors
+from umriss.types import IntPoints, IntVectors
 from umriss.bitmap import GrayPixels
+from umriss.binarization import Binarization, Threshold
 from umriss.contour import LineContour
 from umriss.glyph import Glyph
-from umriss.utils import roll_prev, roll_next
+from umriss.packing import ContourPack
 from .abstract import Tracing
 
+if TYPE_CHECKING:
+    from cv2.typing import MatLike
+    from nptyping import NDArray, Shape, Int
+
 
 class BinarizedExact(Tracing):
     """
-    Binarizes the bitmap using a simple threshold method
+    Binarizes the bitmap using the given `binarization` method (a simple threshold by default)
     and draws an exact contour around the black pixels of the image.
+    If `in_place` is set, the binarized image overwrites the bitmap's pixels
+    (unless they are read-only, e.g. memory-mapped), saving a full-page copy.
     """
+    def __init__(self, binarization: Binarization=Threshold(), in_place: bool=False):
+        self.binarization = binarization
+        self.in_place = in_place
+    
+    
     def get_glyphs(self, pixels: GrayPixels) -> Iterator[Glyph[LineContour]]:
-        _, inv_pixels = cv.threshold(pixels, 128, 255, cv.THRESH_BINARY_INV)
-        cv_contours, [hierarchy] = cv.findContours(inv_pixels, cv.RETR_CCOMP, cv.CHAIN_APPROX_NONE)
+        cv_contours, hierarchies = cv.findContours(self.binarize(pixels), cv.RETR_CCOMP, cv.CHAIN_APPROX_NONE)
+        if len(cv_contours) == 0:
+            return
+        [hierarchy] = hierarchies
+        contours = [LineContour(points) for points in get_exact_contours(cv_contours)]
         
         index = 0
         while index >= 0:
-            outer_contour = _get_exact_contour(cv_contours[index])
-            glyph_contours = [outer_contour]
+            glyph_contours = [contours[index]]
             index, _, child, _ = hierarchy[index]
             
             while child >= 0:
-                inner_contour = _get_exact_contour(cv_contours[child])
-                glyph_contours.append(inner_contour)
+                glyph_contours.append(contours[child])
                 child, _, _, _ = hierarchy[child]
             
             yield Glyph[LineContour](glyph_contours)
+    
+    
+    def binarize(self, pixels: GrayPixels) -> GrayPixels:
+        """
+        Returns the inverted binary image: 255 for black pixels, 0 for white ones.
+        """
+        return self.binarization.binarize(pixels, self.in_place)
 
 
-def _get_exact_contour(cv_contour: NDArray[Shape['*, 1, [x, y]'], Int]) -> LineContour:
+def get_exact_contours(cv_contours: Sequence[MatLike]) -> ContourPack:
     """
-    An OpenCV's contour is an array of the coordinates of the area's outer pixels.
-    This function converts it into the edge line around the area's pixels.
+    An OpenCV's contour is an array of the coordinates of the area's outer pixels (of shape `(n, 1, 2)`).
+    This function converts all the contours of a page into the edge lines around the areas' pixels.
+    Every step is done once for the whole page, the contours being delimited by offsets.
     """
-    contour = cv_contour.reshape(-1, 2)
-    relative = contour - roll_prev(contour)
+    pixel_pack = ContourPack.from_arrays([c.reshape(-1, 2) for c in cv_contours])
+    contours: IntPoints = pixel_pack.points.astype(np.int32, copy=False)
+    starts = pixel_pack.offsets[:-1]
+    relative = contours - contours[pixel_pack.get_rolled_indices(1)]
     
     indices_from = _get_indices(relative, to=False)
-    indices_to = _get_indices(roll_next(relative), to=True)
-    indices_to = (indices_to - indices_from) % 4 + indices_from + 1
+    indices_to = _get_indices(relative[pixel_pack.get_rolled_indices(-1)], to=True)
+    direction_counts = (indices_to - indices_from) % 4 + 1
+    
+    # every pixel contributes `direction_counts` consecutive `_directions` starting from `indices_from`
+    expanded_offsets = np.zeros(len(contours) + 1, dtype=np.intp)
+    np.cumsum(direction_counts, out=expanded_offsets[1:])
+    expanded_starts = np.repeat(expanded_offsets[:-1], direction_counts)
+    direction_indices: _IndexArray = np.repeat(indices_from, direction_counts) + np.arange(expanded_offsets[-1]) - expanded_starts
+    exact_pack = ContourPack(_directions[direction_indices], expanded_offsets[pixel_pack.offsets])
     
-    exact_contour = np.concatenate([
-        _directions[index_from:index_to]
-        for index_from, index_to in zip(indices_from, indices_to)
-    ])
-    exact_contour, start_offset = _simplify_relative(exact_contour)
+    simplified_pack, start_offsets = _simplify_relative(exact_pack)
+    start_offsets += (_directions[indices_from[starts]] @ _offset_transform + 0.5).astype(np.int32)
     
-    start_offset += (_directions[indices_from[0]] @ _offset_transform + 0.5).astype(np.int32)
-    absolute = contour[0] + start_offset + exact_contour.cumsum(axis=0)
+    # cumulative sums restarting at every contour
+    cumsum = simplified_pack.points.cumsum(axis=0)
+    simplified_starts = simplified_pack.offsets[:-1]
+    contour_bases = contours[starts] + start_offsets - (cumsum[simplified_starts] - simplified_pack.points[simplified_starts])
+    absolute = cumsum + np.repeat(contour_bases, simplified_pack.lengths, axis=0)
     
-    return LineContour(absolute)
+    return ContourPack(absolute, simplified_pack.offsets)
 
 
-def _simplify_relative(relative_contour: IntVectors) -> tuple[IntVectors, IntPoint]:
+def _simplify_relative(relative_pack: ContourPack) -> tuple[ContourPack, IntVectors]:
     """
     Combines consecutive contour segments of the same direction.
+    Returns the simplified contours and the offset of every contour's start point.
     """
-    difference = relative_contour - roll_prev(relative_contour)
+    relative_contours = relative_pack.points
+    starts = relative_pack.offsets[:-1]
+    ends = relative_pack.offsets[1:]
+    difference = relative_contours - relative_contours[relative_pack.get_rolled_indices(1)]
+    is_segment_start = difference.any(axis=1)
     
-    (segment_indices,) = np.nonzero(difference.any(axis=1))
-    start_offset = relative_contour[0] * segment_indices[0]
+    (segment_indices,) = np.nonzero(is_segment_start)
+    segment_offsets = np.zeros(len(relative_pack) + 1, dtype=np.intp)
+    np.cumsum(np.add.reduceat(is_segment_start, starts), out=segment_offsets[1:])
+    first_segment_indices = segment_indices[segment_offsets[:-1]]
+    start_offsets = relative_contours[starts] * (first_segment_indices - starts)[:, np.newaxis]
     
-    last_index = len(relative_contour) + segment_indices[0]
-    segment_sizes = np.append(segment_indices[1:], last_index) - segment_indices
-    simplified_contour = relative_contour[segment_indices] * segment_sizes[:, np.newaxis]
+    # the last segment of a contour wraps around to its first segment
+    next_segment_indices = np.roll(segment_indices, -1)
+    next_segment_indices[segment_offsets[1:] - 1] = ends + first_segment_indices - starts
+    segment_sizes = next_segment_indices - segment_indices
+    simplified_contours = relative_contours[segment_indices] * segment_sizes[:, np.newaxis]
     
-    return (simplified_contour, start_offset)
+    return (ContourPack(simplified_contours, segment_offsets), start_offsets)
 
 
-_IndexArray = NDArray[Shape['*'], Int]
+if TYPE_CHECKING:
+    _IndexArray = NDArray[Shape['*'], Int]
 
 def _get_indices(directions: IntVectors, to: bool) -> _IndexArray:
     index_by_direction = _index_by_to_direction if to else _index_by_from_direction
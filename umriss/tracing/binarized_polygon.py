@@ -1,17 +1,20 @@
-from typing import Iterator
+from typing import Iterable, Iterator
 import numpy as np
+import numpy.typing as npt
 
 from umriss.bitmap import GrayPixels
+from umriss.binarization import Binarization, Threshold
 from umriss.contour import LineContour
 from umriss.glyph import Glyph
-from umriss.utils import roll_prev, roll_next, simplify_polygon
+from umriss.packing import ContourPack
+from umriss.utils import simplify_polygons
 from .abstract import Tracing
 from .binarized_exact import BinarizedExact
 
 
 class BinarizedPolygon(Tracing):
     """
-    Binarizes the bitmap using a simple threshold method
+    Binarizes the bitmap using the given `binarization` method (a simple threshold by default)
     and traces it with polygon contours.
     The resulting drawing, when rasterized again into
     a black-and-white bitmap, should match the original bitmap.
@@ -19,7 +22,13 @@ class BinarizedPolygon(Tracing):
     Preserves the symmetries of the original image.
     """
     
-    def __init__(self, max_slope_ratio: int=10, corner_offset: float=0.25):
+    def __init__(
+            self,
+            max_slope_ratio: int=10,
+            corner_offset: float=0.25,
+            binarization: Binarization=Threshold(),
+            in_place: bool=False
+    ):
         if max_slope_ratio < 1:
             raise ValueError('`max_slope_ratio` should be >= 1')
         self.max_slope_ratio = max_slope_ratio
@@ -28,27 +37,44 @@ class BinarizedPolygon(Tracing):
             raise ValueError('`corner_offset` should be between 0 and 0.25')
         self.corner_offset = corner_offset
         
-        self.binarized_exact = BinarizedExact()
+        self.binarized_exact = BinarizedExact(binarization, in_place)
     
     
     def get_glyphs(self, pixels: GrayPixels) -> Iterator[Glyph[LineContour]]:
-        exact_glyphs = self.binarized_exact.get_glyphs(pixels)
+        return self.polygonize_glyphs(self.binarized_exact.get_glyphs(pixels))
+    
+    
+    def polygonize_glyphs(self, exact_glyphs: Iterable[Glyph[LineContour]]) -> Iterator[Glyph[LineContour]]:
+        """
+        Converts glyphs traced by `BinarizedExact` into polygon glyphs.
+        All the contours are polygonized at once.
+        """
+        glyphs = list(exact_glyphs)
+        exact_contours = [c for g in glyphs for c in g.contours]
+        polygons, is_single_pixel = self._polygonize_contours(ContourPack.from_arrays([c.points for c in exact_contours]))
         
-        for glyph in exact_glyphs:
-            contours = [
-                self._polygonize_contour(contour)
-                for contour in glyph.contours
-            ]
-            yield Glyph[LineContour](contours)
+        # single-pixel contours are kept as is
+        contours = iter([
+            exact_contour if is_single else LineContour(points)
+            for exact_contour, is_single, points in zip(exact_contours, is_single_pixel.tolist(), polygons)
+        ])
+        for glyph in glyphs:
+            yield Glyph[LineContour]([next(contours) for _ in glyph.contours])
     
     
-    def _polygonize_contour(self, exact_contour: LineContour) -> LineContour:
-        # We need 4 points and 3 segments between them
-        # TODO: cad matrices or a window be used?
-        pnt_cur = exact_contour.points
-        pnt_prev = roll_prev(pnt_cur)
-        pnt_next = roll_next(pnt_cur)
-        pnt_next_next = roll_next(pnt_next)
+    def _polygonize_contours(self, exact_contours: ContourPack) -> tuple[ContourPack, npt.NDArray[np.bool_]]:
+        """
+        Returns the polygonized contours and whether every contour is a single pixel.
+        A single-pixel contour should be kept as is, its polygonized version is not used.
+        """
+        # We need 4 points and 3 segments between them;
+        # the contours are rolled separately using rolled indices
+        pnt_cur = exact_contours.points
+        prev_indices = exact_contours.get_rolled_indices(1)
+        next_indices = exact_contours.get_rolled_indices(-1)
+        pnt_prev = pnt_cur[prev_indices]
+        pnt_next = pnt_cur[next_indices]
+        pnt_next_next = pnt_next[next_indices]
         seg_prev = pnt_cur - pnt_prev
         seg_next = pnt_next - pnt_cur
         seg_next_next = pnt_next_next - pnt_next
@@ -59,9 +85,10 @@ class BinarizedPolygon(Tracing):
         dir_next = (seg_next / len_next[:, np.newaxis]).astype(np.int32)
         dir_next_next = (seg_next_next / len_next_next[:, np.newaxis]).astype(np.int32)
         
-        # single-pixel contour is returned as is
-        if len(pnt_cur) <= 4 and (len_next == 1).all():
-            return LineContour(pnt_cur)
+        # single-pixel contours have up to 4 unit segments
+        long_segment_counts = np.zeros(len(pnt_cur) + 1, dtype=np.intp)
+        np.cumsum(len_next != 1, out=long_segment_counts[1:])
+        is_single_pixel = (exact_contours.lengths <= 4) & (np.diff(long_segment_counts[exact_contours.offsets]) == 0)
         
         # most new vertices will be at the segment centers
         seg_points = (pnt_cur + pnt_next) / 2
@@ -75,7 +102,7 @@ class BinarizedPolygon(Tracing):
             is_semi_prev = is_convex * (len_prev > 1) * (len_next == 1) * (len_next_next == 1)
             is_semi_next = is_convex * (len_prev == 1) * (len_next == 1) * (len_next_next > 1)
             is_semi_none = is_convex * (len_prev == 1) * (len_next == 1) * (len_next_next == 1)
-            is_semi_none = is_semi_none * (1 - roll_next(is_semi_none)) * (1 - roll_prev(is_semi_none))
+            is_semi_none = is_semi_none * (1 - is_semi_none[next_indices]) * (1 - is_semi_none[prev_indices])
             is_semi = is_semi_prev + is_semi_next + is_semi_none
             semi_prev_offest = -dir_next * (is_semi_prev * (0.5 - self.corner_offset))[:, np.newaxis]
             semi_next_offest = dir_next * (is_semi_next * (0.5 - self.corner_offset))[:, np.newaxis]
@@ -103,7 +130,6 @@ class BinarizedPolygon(Tracing):
         # insert new points
         indices_to_add = np.concatenate((corner_indices, indices_to_add))
         points_to_add = np.concatenate((corner_points, points_to_add))
-        seg_points = np.insert(seg_points, indices_to_add, points_to_add, axis=0)
+        polygons = ContourPack(seg_points, exact_contours.offsets).insert(indices_to_add, points_to_add)
         
-        simplified = simplify_polygon(seg_points)
-        return LineContour(simplified)
+        return simplify_polygons(polygons), is_single_pixel
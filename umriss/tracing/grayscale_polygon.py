@@ -1,10 +1,7 @@
-from dataclasses import dataclass
-from enum import Enum, auto
-from functools import cached_property
-from typing import Iterable, Iterator
+from bisect import bisect_right
+from typing import Iterable, Iterator, Sequence
 import numpy as np
 import cv2 as cv
-import skimage as si
 
 from umriss.bitmap import GrayPixels
 from umriss.contour import LineContour
@@ -31,29 +28,62 @@ class GrayscalePolygon(Tracing):
             LineContour(simplify_polygon(c))
             for c in _get_contours(pixels, self.threshold, width, height)
         ]
-        outer_contours = (c for c in contours if c.signed_area > 0)
-        inner_contours = set(c for c in contours if c.signed_area < 0)
+        outer_contours = sorted((c for c in contours if c.signed_area > 0), key=lambda c: c.signed_area)
+        inner_contours = [c for c in contours if c.signed_area < 0]
+        inner_contours_by_outer, free_inner_contours = _assign_inner_contours(outer_contours, inner_contours)
         
-        for outer_contour in sorted(outer_contours, key=lambda c: c.signed_area):
-            outer_points = outer_contour.points.astype(np.float32)
-            glyph_contours = [
-                c for c in inner_contours
-                if cv.pointPolygonTest(outer_points, c.points[0], False) >= 0
-            ]
-            inner_contours.difference_update(glyph_contours)
-            glyph_contours.insert(0, outer_contour)
-            yield Glyph[LineContour](glyph_contours)
+        for outer_contour, glyph_inner_contours in zip(outer_contours, inner_contours_by_outer):
+            yield Glyph[LineContour]([outer_contour, *glyph_inner_contours])
         
-        if len(inner_contours) > 0:
+        if len(free_inner_contours) > 0:
             canvas = LineContour(_get_corners(width, height))
-            glyph_contours = [canvas]
-            glyph_contours.extend(inner_contours)
-            yield Glyph[LineContour](glyph_contours)
-            
+            yield Glyph[LineContour]([canvas, *free_inner_contours])
+
+
+def _assign_inner_contours(
+        outer_contours: Sequence[LineContour],
+        inner_contours: Sequence[LineContour]
+) -> tuple[list[list[LineContour]], list[LineContour]]:
+    """
+    Assigns every inner contour to the first of the `outer_contours` containing its first point.
+    Returns the inner contours of every outer contour and the ones not contained in any of them,
+    both in the original order.
+    
+    Only the inner contours whose first points are in the outer contour's bounding box are tested.
+    They are found by binary search in the first points sorted by x.
+    """
+    first_points = np.array([c.points[0] for c in inner_contours], dtype=np.float32).reshape(-1, 2)
+    x_order = np.argsort(first_points[:, 0], kind='stable')
+    sorted_xs = first_points[x_order, 0]
+    is_assigned = np.zeros(len(inner_contours), dtype=bool)
+    
+    inner_contours_by_outer: list[list[LineContour]] = []
+    for outer_contour in outer_contours:
+        # `cv.pointPolygonTest` works with float32 points, so do the bounds
+        outer_points = outer_contour.points.astype(np.float32)
+        (left, top), (right, bottom) = outer_points.min(axis=0), outer_points.max(axis=0)
+        start = np.searchsorted(sorted_xs, left, side='left')
+        end = np.searchsorted(sorted_xs, right, side='right')
+        candidates = x_order[start:end]
+        ys = first_points[candidates, 1]
+        candidates = np.sort(candidates[(ys >= top) & (ys <= bottom) & ~is_assigned[candidates]])
+        
+        glyph_indices = [
+            index for index in candidates.tolist()
+            if cv.pointPolygonTest(outer_points, first_points[index], False) >= 0
+        ]
+        is_assigned[glyph_indices] = True
+        inner_contours_by_outer.append([inner_contours[i] for i in glyph_indices])
+    
+    free_inner_contours = [c for c, is_c_assigned in zip(inner_contours, is_assigned.tolist()) if not is_c_assigned]
+    return inner_contours_by_outer, free_inner_contours
 
 
 def _get_contours(pixels: GrayPixels, threshold: float, width: int, height: int) -> list[Points]:
-        contours = si.measure.find_contours(pixels.T, threshold, positive_orientation='high')
+        # `skimage` takes long to import, so only `GrayscalePolygon` imports it, when it is used
+        from skimage.measure import find_contours
+        
+        contours = find_contours(pixels.T, threshold, positive_orientation='high')
         contours = (c + 0.5 for c in contours)
         return _connect_open_contours(contours, width, height)
 
@@ -68,75 +98,115 @@ def _connect_open_contours(contours: Iterable[Points], width: int, height: int)
     > (The closed-ness of a contours can be tested by checking whether
     > the beginning point is the same as the end point.)
     
-    TODO: refactor
+    The edge points (the ends of the open contours and the image corners) are sorted by angle around the center.
+    A single sweep goes around them: from the start of a contour to its end,
+    then through the corners to the start of the next contour, until it returns to the first start of the chain.
+    Every next point is found directly using lookup tables instead of scanning all the edge points.
     """
-    center = np.array([width / 2, height / 2])
-    
-    @dataclass
-    class EdgePoint:
-        point: Point
-        contour: Points | None = None
-        is_start: bool = False
-        
-        @cached_property
-        def angle(self) -> float:
-            angle: float = np.arctan2(*(self.point - center))
-            return angle
-    
-    edge_points = [EdgePoint(corner) for corner in _get_corners(width, height)]
     closed_contours: list[Points] = []
-    open_contour_starts = set()
-    
+    open_contours: list[Points] = []
     for contour in contours:
-        start = contour[0]
-        end = contour[-1]
-        if np.all(start == end):
+        if np.all(contour[0] == contour[-1]):
             closed_contours.append(contour[:-1])
         else:
-            open_contour_starts.add(tuple(start))
-            edge_points.append(EdgePoint(start, contour, is_start=True))
-            edge_points.append(EdgePoint(end, contour, is_start=False))
-    
-    edge_points.sort(key=lambda ep: ep.angle)
-    
-    def to_edge(point: Point) -> Points:
-        x, y = point
-        if x < 1: x = 0
-        elif x > width - 1: x = width
-        if y < 1: y = 0
-        elif y > height - 1: y = height
-        return np.array([[x, y]])
-    
-    class State(Enum):
-        FIND_FIRST = auto()
-        FIND_NEXT = auto()
-        FIND_END = auto()
-        STOP = auto()
-    
-    current_contour = []
-    state = State.FIND_FIRST if len(open_contour_starts) > 0 else State.STOP
-    
-    while state != State.STOP:
-        for ep in edge_points:
-            match state, ep:
-                case State.FIND_FIRST | State.FIND_NEXT, EdgePoint(p, c, True) if c is not None and tuple(p) in open_contour_starts:
-                    current_contour.append(to_edge(p))
-                    current_contour.append(c)
-                    open_contour_starts.remove(tuple(p))
-                    state = State.FIND_END
-                case State.FIND_NEXT, EdgePoint(p, None):
-                    current_contour.append(np.array([p]))
-                case State.FIND_NEXT, EdgePoint(p, c, True) if np.array_equal(p, current_contour[1][0]):
-                    closed_contours.append(np.concatenate(current_contour))
-                    current_contour = []
-                    state = State.FIND_FIRST if len(open_contour_starts) > 0 else State.STOP
-                case State.FIND_END, EdgePoint(p, c, False) if np.array_equal(p, current_contour[-1][-1]):
-                    current_contour.append(to_edge(p))
-                    state = State.FIND_NEXT
+            open_contours.append(contour)
+    if len(open_contours) == 0:
+        return closed_contours
+    
+    # the corners, then the start and the end of every open contour
+    corners = _get_corners(width, height)
+    contour_ends = np.array([[c[0], c[-1]] for c in open_contours]).reshape(-1, 2)
+    edge_points = np.concatenate((corners, contour_ends))
+    contour_indices = np.concatenate((np.full(len(corners), -1), np.arange(len(contour_ends)) // 2))
+    is_start = np.concatenate((np.zeros(len(corners), dtype=bool), np.arange(len(contour_ends)) % 2 == 0))
+    
+    offsets = edge_points - np.array([width / 2, height / 2])
+    order = np.argsort(np.arctan2(offsets[:, 0], offsets[:, 1]), kind='stable')
+    edge_points = edge_points[order]
+    contour_indices = contour_indices[order].tolist()
+    is_start = is_start[order].tolist()
+    edge_point_count = len(edge_points)
+    keys = [tuple(p) for p in edge_points.tolist()]
+    
+    # positions of the start points, and of the other points, by their coordinates
+    start_positions: dict[tuple[float, float], list[int]] = {}
+    other_positions: dict[tuple[float, float], list[int]] = {}
+    for position, (key, is_p_start) in enumerate(zip(keys, is_start)):
+        (start_positions if is_p_start else other_positions).setdefault(key, []).append(position)
+    corner_positions = [p for p, c in enumerate(contour_indices) if c < 0]
+    
+    # the first open start at or after every position (or `edge_point_count`), with path compression
+    next_open_start = [p if is_p_start else p + 1 for p, is_p_start in enumerate(is_start)] + [edge_point_count]
+    
+    def find_open_start(position: int) -> int:
+        root = position
+        while next_open_start[root] != root:
+            root = next_open_start[root]
+        while next_open_start[position] != root:
+            next_open_start[position], position = root, next_open_start[position]
+        return root
+    
+    def find_next_open_start(position: int) -> int|None:
+        next_position = find_open_start(position + 1)
+        if next_position == edge_point_count:
+            next_position = find_open_start(0)
+        return None if next_position == edge_point_count else next_position
+    
+    def find_next(positions: list[int], position: int) -> int:
+        index = bisect_right(positions, position)
+        return positions[index] if index < len(positions) else positions[0]
+    
+    def distance(position: int, next_position: int) -> int:
+        return (next_position - position - 1) % edge_point_count
+    
+    def start_contour(position: int) -> None:
+        for start_position in start_positions[keys[position]]:
+            next_open_start[start_position] = start_position + 1
+        current_contour.append(_to_edge(edge_points[position], width, height))
+        current_contour.append(open_contours[contour_indices[position]])
+    
+    current_contour: list[Points] = []
+    chain_start = find_next_open_start(-1)
+    while chain_start is not None:
+        chain_start_positions = start_positions[keys[chain_start]]
+        position = chain_start
+        start_contour(position)
+        while True:
+            # the end of the current contour
+            position = find_next(other_positions[tuple(current_contour[-1][-1].tolist())], position)
+            current_contour.append(_to_edge(edge_points[position], width, height))
+            
+            # the start of the next contour or the start of the chain, and the corners before it
+            next_start = find_next_open_start(position)
+            next_chain_start = find_next(chain_start_positions, position)
+            is_closed = next_start is None or distance(position, next_chain_start) < distance(position, next_start)
+            next_position = next_chain_start if is_closed or next_start is None else next_start
+            current_contour.extend(
+                np.array([edge_points[p]])
+                for p in sorted(corner_positions, key=lambda p: distance(position, p))
+                if distance(position, p) < distance(position, next_position)
+            )
+            position = next_position
+            if is_closed:
+                break
+            start_contour(position)
+        
+        closed_contours.append(np.concatenate(current_contour))
+        current_contour = []
+        chain_start = find_next_open_start(position)
     
     return closed_contours
 
 
+def _to_edge(point: Point, width: int, height: int) -> Points:
+    x, y = point
+    if x < 1: x = 0
+    elif x > width - 1: x = width
+    if y < 1: y = 0
+    elif y > height - 1: y = height
+    return np.array([[x, y]])
+
+
 def _get_corners(width: int, height: int) -> Points:
     return np.array([
         [0, 0],
@@ -0,0 +1,331 @@
+from typing import TYPE_CHECKING, Iterator
+import numpy as np
+import cv2 as cv
+
+from umriss.types import IntVectors
+from umriss.bitmap import GrayPixels
+from umriss.contour import LineContour
+from umriss.glyph import Glyph
+from .abstract import Tracing
+from .binarized_exact import BinarizedExact, get_exact_contours
+from .binarized_polygon import BinarizedPolygon
+
+if TYPE_CHECKING:
+    from cv2.typing import MatLike
+
+
+# the first pixel of a glyph or a hole as (y, x), by which `cv.findContours` orders them
+_Key = tuple[int, int]
+_KeyedGlyph = tuple[_Key, Glyph[LineContour]]
+
+
+class Tiled(Tracing):
+    """
+    Traces a large bitmap in horizontal strips of `strip_height` rows
+    using a binarized `tracing` (`BinarizedExact` or `BinarizedPolygon`).
+    
+    Every strip is traced on its own. The glyphs touching a border between strips
+    are stitched from the contours of their parts in the strips (see `_Stitching`).
+    The strips are binarized one by one (see `Binarization.binarize_strips`),
+    so, with a memory-mapped bitmap (see `Bitmap`), only a strip and the last row of the previous one are in memory.
+    The result is the same as tracing the whole bitmap, including the glyph order and the contours' start points.
+    """
+    def __init__(self, tracing: Tracing, strip_height: int=1024):
+        match tracing:
+            case BinarizedExact():
+                self.binarized_exact = tracing
+            case BinarizedPolygon():
+                self.binarized_exact = tracing.binarized_exact
+            case _:
+                raise TypeError('Only binarized tracings can be tiled')
+        self.tracing = tracing
+        
+        if strip_height < 1:
+            raise ValueError('`strip_height` should be >= 1')
+        self.strip_height = strip_height
+    
+    
+    def get_glyphs(self, pixels: GrayPixels) -> Iterator[Glyph[LineContour]]:
+        exact_glyphs = self._get_exact_glyphs(pixels)
+        if isinstance(self.tracing, BinarizedPolygon):
+            return self.tracing.polygonize_glyphs(exact_glyphs)
+        return iter(exact_glyphs)
+    
+    
+    def _get_exact_glyphs(self, pixels: GrayPixels) -> list[Glyph[LineContour]]:
+        height = len(pixels)
+        binarization = self.binarized_exact.binarization
+        keyed_glyphs: list[_KeyedGlyph] = []
+        stitching = _Stitching()
+        
+        start = 0
+        previous_row: GrayPixels|None = None
+        for strip in binarization.binarize_strips(pixels, self.strip_height):
+            end = start + len(strip)
+            if previous_row is not None:
+                stitching.add_border(start, previous_row, strip[0])
+            border_ys = [y for y, is_border in [(start, start > 0), (end, end < height)] if is_border]
+            keyed_glyphs.extend(_trace_strip(strip, start, border_ys, stitching))
+            # a copy does not keep the strip alive
+            previous_row = strip[-1].copy()
+            start = end
+        keyed_glyphs.extend(stitching.stitch())
+        
+        # `cv.findContours` lists the glyphs in the reverse order of their first pixels
+        keyed_glyphs.sort(key=lambda kg: kg[0], reverse=True)
+        return [glyph for _, glyph in keyed_glyphs]
+
+
+def _trace_strip(inv_pixels: GrayPixels, start: int, border_ys: list[int], stitching: '_Stitching') -> list[_KeyedGlyph]:
+    """
+    Traces the binarized rows from `start`.
+    Returns the glyphs not touching the borders at `border_ys`, every glyph keyed by its first pixel,
+    and adds the other glyphs to the `stitching`.
+    """
+    cv_contours, hierarchies = cv.findContours(inv_pixels, cv.RETR_CCOMP, cv.CHAIN_APPROX_NONE, offset=(0, start))
+    if len(cv_contours) == 0:
+        return []
+    [hierarchy] = hierarchies
+    exact_pack = get_exact_contours(cv_contours)
+    exact_points: IntVectors = exact_pack.points.astype(np.int64, copy=False)
+    exact_contours = np.split(exact_points, exact_pack.offsets[1:-1])
+    
+    keyed_glyphs: list[_KeyedGlyph] = []
+    index = 0
+    while index >= 0:
+        outer_contour = exact_contours[index]
+        hole_indices: list[int] = []
+        child = hierarchy[index][2]
+        while child >= 0:
+            hole_indices.append(child)
+            child = hierarchy[child][0]
+        
+        if np.isin(outer_contour[:, 1], border_ys).any():
+            stitching.add_part(outer_contour, [(_get_key(cv_contours[i]), exact_contours[i].copy()) for i in hole_indices], border_ys)
+        else:
+            glyph = Glyph[LineContour]([LineContour(exact_contours[i]) for i in [index] + hole_indices])
+            keyed_glyphs.append((_get_key(cv_contours[index]), glyph))
+        index = hierarchy[index][0]
+    return keyed_glyphs
+
+
+def _get_key(cv_contour: 'MatLike') -> _Key:
+    x, y = cv_contour[0, 0]
+    return int(y), int(x)
+
+
+class _Stitching:
+    """
+    Stitches the exact contours of the glyphs touching the borders between strips.
+    
+    The outer contour of a glyph's part in a strip is cut into paths at the borders, dropping its edges along them,
+    as the rows beyond a border are unknown to the strip. The edges along a border are found
+    from the rows on both its sides instead. The paths and the border edges meeting at a point are joined
+    keeping the diagonal neighbours connected, like `cv.findContours` does, so the closed paths
+    are the outer contours and the holes of whole glyphs. A glyph's parts are the ones whose paths it joins.
+    """
+    def __init__(self) -> None:
+        # the paths between border points with the part every one comes from, -1 for the border edges
+        self.paths: list[IntVectors] = []
+        self.path_parts: list[int] = []
+        # the holes of every part which do not touch the borders, keyed by their first pixels
+        self.part_holes: list[list[tuple[_Key, IntVectors]]] = []
+    
+    
+    def add_part(self, outer_contour: IntVectors, holes: list[tuple[_Key, IntVectors]], border_ys: list[int]) -> None:
+        """
+        Adds the outer contour of a glyph's part touching the borders at `border_ys`, and its holes.
+        """
+        part = len(self.part_holes)
+        self.part_holes.append(holes)
+        next_points = np.roll(outer_contour, -1, axis=0)
+        is_border = (outer_contour[:, 1] == next_points[:, 1]) & np.isin(outer_contour[:, 1], border_ys)
+        
+        # the contour is rolled to start with the first path
+        first = np.flatnonzero(~is_border & np.roll(is_border, 1))[0]
+        points = np.roll(outer_contour, -first, axis=0)
+        is_kept = ~np.roll(is_border, -first)
+        closed_points = np.concatenate((points, points[:1]))
+        changes = np.diff(is_kept, prepend=False, append=False).nonzero()[0]
+        for path_start, path_end in zip(changes[::2], changes[1::2]):
+            self.paths.append(closed_points[path_start:path_end + 1])
+            self.path_parts.append(part)
+    
+    
+    def add_border(self, y: int, upper_row: GrayPixels, lower_row: GrayPixels) -> None:
+        """
+        Adds the edges along the border at `y` between the binarized rows above and below it.
+        The edges below the black pixels run to the right, the edges above them to the left,
+        like the edges of the exact contours.
+        """
+        is_upper_black, is_lower_black = upper_row > 0, lower_row > 0
+        for is_black, direction in [(is_upper_black & ~is_lower_black, 1), (is_lower_black & ~is_upper_black, -1)]:
+            changes = np.diff(is_black, prepend=False, append=False).nonzero()[0]
+            for left, right in zip(changes[::2].tolist(), changes[1::2].tolist()):
+                xs = [left, right][::direction]
+                self.paths.append(np.array([[xs[0], y], [xs[1], y]], dtype=np.int64))
+                self.path_parts.append(-1)
+    
+    
+    def stitch(self) -> list[_KeyedGlyph]:
+        """
+        Joins the paths into the contours of whole glyphs. Returns the glyphs keyed by their first pixels.
+        """
+        path_indices_by_start: dict[tuple[int, int], list[int]] = {}
+        for index, path in enumerate(self.paths):
+            path_indices_by_start.setdefault((int(path[0, 0]), int(path[0, 1])), []).append(index)
+        
+        is_joined = [False] * len(self.paths)
+        part_roots = list(range(len(self.part_holes)))
+        contours_by_part: list[list[IntVectors]] = [[] for _ in self.part_holes]
+        for first in range(len(self.paths)):
+            if is_joined[first]:
+                continue
+            path_indices: list[int] = []
+            index = first
+            while not is_joined[index]:
+                is_joined[index] = True
+                path_indices.append(index)
+                index = self._get_next_path(index, path_indices_by_start)
+            
+            parts = [self.path_parts[i] for i in path_indices if self.path_parts[i] >= 0]
+            root = _find_root(part_roots, parts[0])
+            for part in parts[1:]:
+                part_root = _find_root(part_roots, part)
+                if part_root != root:
+                    part_roots[part_root] = root
+                    contours_by_part[root].extend(contours_by_part[part_root])
+                    contours_by_part[part_root] = []
+            contours_by_part[root].append(_join_paths([self.paths[i] for i in path_indices]))
+        
+        keyed_glyphs: list[_KeyedGlyph] = []
+        holes_by_root: dict[int, list[tuple[_Key, IntVectors]]] = {}
+        for part, holes in enumerate(self.part_holes):
+            holes_by_root.setdefault(_find_root(part_roots, part), []).extend(holes)
+        for root, contours in enumerate(contours_by_part):
+            if len(contours) > 0:
+                keyed_glyphs.append(_get_stitched_glyph(contours, holes_by_root[root]))
+        return keyed_glyphs
+    
+    
+    def _get_next_path(self, index: int, path_indices_by_start: dict[tuple[int, int], list[int]]) -> int:
+        """
+        Returns the path following the path at `index`.
+        Where two paths start at the end point (the black pixels touching diagonally there),
+        the one turning away from the black pixel of the path's last edge is taken.
+        """
+        path = self.paths[index]
+        next_indices = path_indices_by_start[(int(path[-1, 0]), int(path[-1, 1]))]
+        if len(next_indices) == 1:
+            return next_indices[0]
+        dx, dy = np.sign(path[-1] - path[-2])
+        return next(i for i in next_indices if tuple(np.sign(self.paths[i][1] - self.paths[i][0])) == (-dy, dx))
+
+
+def _find_root(roots: list[int], part: int) -> int:
+    while roots[part] != part:
+        roots[part] = roots[roots[part]]
+        part = roots[part]
+    return part
+
+
+def _join_paths(paths: list[IntVectors]) -> IntVectors:
+    """
+    Joins the paths of a closed contour, dropping the points inside straight edges.
+    """
+    points = np.concatenate([path[:-1] for path in paths])
+    to_points = points - np.roll(points, 1, axis=0)
+    from_points = np.roll(points, -1, axis=0) - points
+    is_corner = to_points[:, 0] * from_points[:, 1] != to_points[:, 1] * from_points[:, 0]
+    joined: IntVectors = points[is_corner]
+    return joined
+
+
+def _get_stitched_glyph(contours: list[IntVectors], holes: list[tuple[_Key, IntVectors]]) -> _KeyedGlyph:
+    """
+    Makes a glyph of its stitched contours and the holes of its parts.
+    Like the exact contours, the outer contour has a negative signed area and the holes positive ones.
+    """
+    edge_starts = np.concatenate(contours + [h for _, h in holes])
+    edge_ends = np.concatenate([np.roll(c, -1, axis=0) for c in contours + [h for _, h in holes]])
+    
+    outer_key: _Key|None = None
+    outer_contour: IntVectors|None = None
+    holes = holes.copy()
+    for contour in contours:
+        is_hole = _get_double_area(contour) > 0
+        key, rolled = _roll_to_start(contour, is_hole, edge_starts, edge_ends)
+        if is_hole:
+            holes.append((key, rolled))
+        else:
+            outer_key, outer_contour = key, rolled
+    assert outer_key is not None and outer_contour is not None
+    
+    # `cv.findContours` lists the holes in the reverse order of their first pixels
+    holes.sort(key=lambda kh: kh[0], reverse=True)
+    return outer_key, Glyph[LineContour]([LineContour(outer_contour)] + [LineContour(h) for _, h in holes])
+
+
+def _get_double_area(contour: IntVectors) -> int:
+    next_points = np.roll(contour, -1, axis=0)
+    return int(np.sum(contour[:, 0] * next_points[:, 1] - next_points[:, 0] * contour[:, 1]))
+
+
+def _roll_to_start(contour: IntVectors, is_hole: bool, edge_starts: IntVectors, edge_ends: IntVectors) -> tuple[_Key, IntVectors]:
+    """
+    Rolls a stitched contour to start where `get_exact_contours` starts the contour found by `cv.findContours`.
+    Returns its first pixel, the top left one for an outer contour, or the one left of the top left white pixel for a hole.
+    
+    `cv.findContours` follows a contour from the first pixel's first black neighbour clockwise from the left
+    (from the right for a hole), and `get_exact_contours` starts it after the first corner
+    on the first pixel's edges following that neighbour's edges.
+    The colours of the neighbours are told by the edges of all the glyph's contours, given by `edge_starts` and `edge_ends`.
+    """
+    top = int(contour[:, 1].min())
+    left = int(contour[contour[:, 1] == top, 0].min())
+    x, y = (left - 1, top) if is_hole else (left, top)
+    
+    is_east = not _has_edge(edge_starts, edge_ends, (x + 1, y), 1)
+    is_south = not _has_edge(edge_starts, edge_ends, (x, y + 1), 0)
+    is_south_east = is_east != _has_edge(edge_starts, edge_ends, (x + 1, y + 1), 0)
+    is_south_west = is_south != _has_edge(edge_starts, edge_ends, (x, y + 1), 1)
+    is_west = not _has_edge(edge_starts, edge_ends, (x, y), 1)
+    if is_hole:
+        neighbours = [(is_south_east, (0, -1)), (is_south, (0, -1)), (is_south_west, (1, 0)), (is_west, (1, 0))]
+    else:
+        neighbours = [(is_east, (-1, 0)), (is_south_east, (0, -1)), (is_south, (0, -1)), (is_south_west, (1, 0))]
+    direction = next((d for is_black, d in neighbours if is_black), (0, 1))
+    corner_x, corner_y = _first_edge_corners[direction]
+    point = np.array([x + corner_x, y + corner_y])
+    
+    # the edge containing the first pixel's first edge
+    next_points = np.roll(contour, -1, axis=0)
+    axis = 0 if direction[1] == 0 else 1
+    sign = direction[axis]
+    [index] = np.flatnonzero(
+        (contour[:, 1 - axis] == point[1 - axis]) & (next_points[:, 1 - axis] == point[1 - axis]) &
+        ((point[axis] - contour[:, axis]) * sign >= 0) & ((next_points[:, axis] - point[axis]) * sign >= 1)
+    )
+    corner = index if (contour[index] == point).all() else index + 1
+    return (y, x), np.roll(contour, -(corner + 1), axis=0)
+
+
+def _has_edge(edge_starts: IntVectors, edge_ends: IntVectors, point: tuple[int, int], axis: int) -> bool:
+    """
+    Checks whether a unit edge from `point` along the `axis` lies on one of the edges.
+    """
+    other = 1 - axis
+    return bool(np.any(
+        (edge_starts[:, other] == point[other]) & (edge_ends[:, other] == point[other]) &
+        (np.minimum(edge_starts[:, axis], edge_ends[:, axis]) <= point[axis]) &
+        (np.maximum(edge_starts[:, axis], edge_ends[:, axis]) >= point[axis] + 1)
+    ))
+
+
+# the corner of a pixel where its first edge starts in `get_exact_contours`, by the edge's direction
+_first_edge_corners = {
+    (0, 1): (0, 0),
+    (1, 0): (0, 1),
+    (0, -1): (1, 1),
+    (-1, 0): (1, 0),
+}
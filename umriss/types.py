@@ -1,20 +1,28 @@
-from nptyping import NDArray, Shape, Int, Number
+from typing import TYPE_CHECKING, Any
+import numpy.typing as npt
 
-
-IntPoint = NDArray[Shape['[x, y]'], Int]
-IntPoints = NDArray[Shape['*, [x, y]'], Int]
-
-IntVector = NDArray[Shape['[x, y]'], Int]
-IntVectors = NDArray[Shape['*, [x, y]'], Int]
-
-Point = NDArray[Shape['[x, y]'], Number]
-Points = NDArray[Shape['*, [x, y]'], Number]
-
-Vector = NDArray[Shape['[x, y]'], Number]
-Vectors = NDArray[Shape['*, [x, y]'], Number]
-
-QuadraticNode = NDArray[Shape['[ctrl1, ctrl2, point], [x, y]'], Number]
-QuadraticNodes = NDArray[Shape['*, [ctrl1, ctrl2, point], [x, y]'], Number]
-
-CubicNode = NDArray[Shape['[ctrl1, ctrl2, point], [x, y]'], Number]
-CubicNodes = NDArray[Shape['*, [ctrl1, ctrl2, point], [x, y]'], Number]
+if TYPE_CHECKING:
+    from nptyping import NDArray, Shape, Int, Number
+    
+    IntPoint = NDArray[Shape['[x, y]'], Int]
+    IntPoints = NDArray[Shape['*, [x, y]'], Int]
+    
+    IntVector = NDArray[Shape['[x, y]'], Int]
+    IntVectors = NDArray[Shape['*, [x, y]'], Int]
+    
+    Point = NDArray[Shape['[x, y]'], Number]
+    Points = NDArray[Shape['*, [x, y]'], Number]
+    
+    Vector = NDArray[Shape['[x, y]'], Number]
+    Vectors = NDArray[Shape['*, [x, y]'], Number]
+    
+    QuadraticNode = NDArray[Shape['[ctrl1, ctrl2, point], [x, y]'], Number]
+    QuadraticNodes = NDArray[Shape['*, [ctrl1, ctrl2, point], [x, y]'], Number]
+    
+    CubicNode = NDArray[Shape['[ctrl1, ctrl2, point], [x, y]'], Number]
+    CubicNodes = NDArray[Shape['*, [ctrl1, ctrl2, point], [x, y]'], Number]
+else:
+    # the shapes are only checked statically, `nptyping` is not needed at runtime
+    IntPoint = IntPoints = IntVector = IntVectors = npt.NDArray[Any]
+    Point = Points = Vector = Vectors = npt.NDArray[Any]
+    QuadraticNode = QuadraticNodes = CubicNode = CubicNodes = npt.NDArray[Any]
@@ -1,79 +1,116 @@
-from typing import Iterable
+from typing import Iterable, Mapping, Sequence
 from collections import defaultdict
-from itertools import groupby
 
 from .contour import LineContour
 from .drawing import  LineDrawing
 from .glyph import Glyph, GlyphOccurrence, GlyphInstance, GlyphReference
 from .document import LineDocument
+from .fingerprint import get_glyph_fingerprints
 
 
 def unify_identical_glyphs(document: LineDocument, use_shared: bool) -> LineDocument:
-    glyph_instances = list(_get_glyph_instances(document))
+    """
+    Replaces repeating glyphs with references.
+    Glyphs are considered identical if their canonical fingerprints are equal.
+    Glyphs occurring on several pages become shared if `use_shared` is set.
+    """
+    instances_by_page = [list(get_glyph_instances(document, page)) for page in document.pages]
+    fingerprints_by_page = [get_glyph_fingerprints([i.glyph for i in instances]) for instances in instances_by_page]
     
-    shared_by_glyph: dict[Glyph[LineContour], list[tuple[int, GlyphInstance[LineContour]]]] = defaultdict(list)
+    shared_glyphs: list[Glyph[LineContour]] = []
+    shared_indices: dict[bytes, int] = dict()
     
     if use_shared:
-        for page_number, instance in glyph_instances:
-            shared_by_glyph[instance.glyph].append((page_number, instance))
+        glyph_by_fingerprint: dict[bytes, Glyph[LineContour]] = dict()
+        for instances, fingerprints in zip(instances_by_page, fingerprints_by_page):
+            for instance, fingerprint in zip(instances, fingerprints):
+                glyph_by_fingerprint.setdefault(fingerprint, instance.glyph)
+        
+        shared_fingerprints = find_shared_keys(fingerprints_by_page)
+        shared_glyphs = [glyph_by_fingerprint[f] for f in shared_fingerprints]
+        shared_indices = { fingerprint: index for index, fingerprint in enumerate(shared_fingerprints) }
     
-    multipage_glyphs = (
-        (glyph, instances) for glyph, instances in shared_by_glyph.items()
-        if len(set(p for p, _ in instances)) > 1
-    )
-    shared_glyphs = [glyph for glyph, _ in sorted(multipage_glyphs, key=lambda i: -len(i[1]))]
-    shared_indices = { glyph: index for index, glyph in enumerate(shared_glyphs) }
+    unified_pages = [
+        unify_page_glyphs(page, instances, fingerprints, shared_indices)
+        for page, instances, fingerprints in zip(document.pages, instances_by_page, fingerprints_by_page)
+    ]
+    
+    return LineDocument(unified_pages, shared_glyphs)
+
+
+def find_shared_keys(keys_by_page: Iterable[Sequence[bytes]]) -> list[bytes]:
+    """
+    Takes the glyph keys (e.g. fingerprints) of every page.
+    Returns the keys occurring on more than one page, the most frequent first.
+    """
+    count_by_key: dict[bytes, int] = dict()
+    page_count_by_key: dict[bytes, int] = dict()
+    last_page_by_key: dict[bytes, int] = dict()
     
-    unified_pages: list[LineDrawing] = []
+    for page_number, keys in enumerate(keys_by_page):
+        for key in keys:
+            count_by_key[key] = count_by_key.get(key, 0) + 1
+            if last_page_by_key.get(key) != page_number:
+                last_page_by_key[key] = page_number
+                page_count_by_key[key] = page_count_by_key.get(key, 0) + 1
+    
+    multipage_keys = (key for key, page_count in page_count_by_key.items() if page_count > 1)
+    return sorted(multipage_keys, key=lambda k: -count_by_key[k])
+
+
+def unify_page_glyphs(
+        page: LineDrawing,
+        instances: Sequence[GlyphInstance[LineContour]],
+        keys: Sequence[bytes],
+        shared_indices: Mapping[bytes, int]
+) -> LineDrawing:
+    """
+    Replaces the page's glyph `instances` with references
+    to the shared glyphs whose indices are given by `shared_indices`
+    and to the page's own referenced glyphs for the glyphs repeating on the page.
+    The `keys` (e.g. fingerprints) identify the glyphs of the `instances`.
+    """
+    by_key: dict[bytes, list[GlyphInstance[LineContour]]] = defaultdict(list)
+    for instance, key in zip(instances, keys):
+        if not key in shared_indices:
+            by_key[key].append(instance)
     
-    instances_by_page = (
-        (document.pages[page_number], list(instance for _, instance in instances))
-        for page_number, instances in groupby(glyph_instances, lambda i: i[0])
+    repeating_glyphs = (
+        (key, instances) for key, instances in by_key.items()
+        if len(instances) > 1
     )
-    for page, instances in instances_by_page:
-        by_glyph: dict[Glyph[LineContour], list[GlyphInstance[LineContour]]] = defaultdict(list)
-        for instance in instances:
-            if not instance.glyph in shared_indices:
-                by_glyph[instance.glyph].append(instance)
-        
-        repeating_glyphs = (
-            (glyph, instances) for glyph, instances in by_glyph.items()
-            if len(instances) > 1
-        )
-        referenced_glyphs = [glyph for glyph, _ in repeating_glyphs]
-        # referenced_glyphs = [glyph for glyph, _ in sorted(repeating_glyphs, key=lambda i: -len(i[1]))]
-        refernced_indices = { glyph: index for index, glyph in enumerate(referenced_glyphs) }
-        
-        occurrences: list[GlyphOccurrence[LineContour]] = []
-        for instance in instances:
-            shared_index = shared_indices.get(instance.glyph)
-            if shared_index is None:
-                page_index = refernced_indices.get(instance.glyph)
-                if page_index is None:
-                    occurrences.append(instance)
-                else:
-                    occurrences.append(GlyphReference[LineContour](instance.position, page_index, is_shared=False))
+    referenced_keys = [key for key, _ in repeating_glyphs]
+    referenced_glyphs = [by_key[key][0].glyph for key in referenced_keys]
+    refernced_indices = { key: index for index, key in enumerate(referenced_keys) }
+    
+    occurrences: list[GlyphOccurrence[LineContour]] = []
+    for instance, key in zip(instances, keys):
+        shared_index = shared_indices.get(key)
+        if shared_index is None:
+            page_index = refernced_indices.get(key)
+            if page_index is None:
+                occurrences.append(instance)
             else:
-                occurrences.append(GlyphReference[LineContour](instance.position, shared_index, is_shared=True))
-        
-        unified_pages.append(LineDrawing(page.width, page.height, occurrences, referenced_glyphs))
+                occurrences.append(GlyphReference[LineContour](instance.position, page_index, is_shared=False))
+        else:
+            occurrences.append(GlyphReference[LineContour](instance.position, shared_index, is_shared=True))
     
-    return LineDocument(unified_pages, shared_glyphs)
+    return LineDrawing(page.width, page.height, occurrences, referenced_glyphs)
 
 
-def _get_glyph_instances(document: LineDocument) -> Iterable[tuple[int, GlyphInstance[LineContour]]]:
-    for page_number, page in enumerate(document.pages):
-        for occurrence in page.glyph_occurrences:
-            match occurrence:
-                case GlyphInstance():
-                    instance = occurrence
-                case GlyphReference():
-                    if occurrence.is_shared:
-                        glyph = document.shared_glyphs[occurrence.index]
-                    else:
-                        glyph = page.referenced_glyphs[occurrence.index]
-                    instance = GlyphInstance[LineContour](occurrence.position, glyph)
-                case _:
-                    raise TypeError('Unsupported glyph occurrence type')
-            
-            yield (page_number, instance)
+def get_glyph_instances(document: LineDocument, page: LineDrawing) -> Iterable[GlyphInstance[LineContour]]:
+    """
+    Yields the glyphs of a `document`'s `page` as glyph instances, resolving the references.
+    """
+    for occurrence in page.glyph_occurrences:
+        match occurrence:
+            case GlyphInstance():
+                yield occurrence
+            case GlyphReference():
+                if occurrence.is_shared:
+                    glyph = document.shared_glyphs[occurrence.index]
+                else:
+                    glyph = page.referenced_glyphs[occurrence.index]
+                yield GlyphInstance[LineContour](occurrence.position, glyph)
+            case _:
+                raise TypeError('Unsupported glyph occurrence type')
@@ -1,9 +1,13 @@
-from typing import TypeVar
+from __future__ import annotations
+from typing import TYPE_CHECKING, TypeVar
 import numpy.typing as npt
 import numpy as np
 
 from .types import Points, Vectors
 
+if TYPE_CHECKING:
+    from .packing import ContourPack
+
 
 T = TypeVar('T', bound=np.generic)
 
@@ -63,3 +67,20 @@ def combine_same_direction_segments(polygon: Points, epsilon: float=_epsilon) ->
     dir_diff = np.linalg.norm(dir_next - dir_prev, axis=1)
     indices = np.nonzero(dir_diff <= epsilon)
     return np.delete(polygon, indices, axis=0)
+
+
+def simplify_polygons(polygons: ContourPack, epsilon: float=_epsilon) -> ContourPack:
+    """
+    `simplify_polygon` for all the `polygons` at once.
+    """
+    # zero length segments
+    points = polygons.points
+    len_prev = np.linalg.norm(points - points[polygons.get_rolled_indices(1)], axis=1)
+    polygons = polygons.delete(len_prev <= epsilon)
+    
+    # consecutive segments of the same direction
+    points = polygons.points
+    dir_prev = normalize(points - points[polygons.get_rolled_indices(1)])
+    dir_next = normalize(points[polygons.get_rolled_indices(-1)] - points)
+    dir_diff = np.linalg.norm(dir_next - dir_prev, axis=1)
+    return polygons.delete(dir_diff <= epsilon)